@@ -0,0 +1,274 @@
+import numpy as np
+from .Image_to_Signals import RepeatedSignals
+
+# Largest side of a dose map, larger patterns are binned by an integer number of DAC steps per pixel
+MAX_DOSE_SIZE = 2048
+
+# Number of samples (or points of a path) accumulated at once
+CHUNK_SAMPLES = 2 ** 22
+
+# Dose delivered while the beam jumps between two distant points, in samples, spread along the jump:
+# the deflection settles within about one sample period
+TRANSIT_SAMPLES = 1.0
+
+# Extent of the Gaussian beam profile around the pattern, in standard deviations
+GAUSSIAN_EXTENT = 4
+
+
+class DoseMap:
+    """
+    A 2-D histogram of the dose delivered by a pattern, in samples per pixel.
+
+    Attributes:
+    - dose (numpy.ndarray): The dose of every pixel (float64), the first row at the highest voltage_y.
+    - left (float): The voltage_x of the first column.
+    - top (float): The voltage_y of the first row.
+    - pixel (float): The voltage between two pixels, a whole number of DAC steps.
+    - binning (int): Number of DAC steps per pixel, 1 at the resolution of the DAC.
+    - samples (int): Number of samples accumulated.
+    """
+
+    def __init__(self, dose, left, top, pixel, binning, samples):
+        self.dose = dose
+        self.left = left
+        self.top = top
+        self.pixel = pixel
+        self.binning = binning
+        self.samples = samples
+
+    def extent(self):
+        """
+        Returns:
+        - tuple of float: The voltages of the (left, right, bottom, top) pixels.
+        """
+
+        height, width = self.dose.shape
+        return (self.left, self.left + (width - 1) * self.pixel,
+                self.top - (height - 1) * self.pixel, self.top)
+
+    def peak(self):
+        """
+        Returns:
+        - float: The highest dose of a pixel, in samples.
+        """
+
+        return float(self.dose.max()) if self.dose.size else 0.0
+
+
+class _Histogram:
+    """
+    Accumulator of the dose on the grid of the DAC, binned to at most 'max_size' pixels per side.
+    """
+
+    def __init__(self, low, high, max_size):
+        """
+        Parameters:
+        - low (numpy.ndarray): The lowest (x, y) positions of the pattern, in DAC steps.
+        - high (numpy.ndarray): The highest (x, y) positions of the pattern, in DAC steps.
+        - max_size (int): The largest side of the histogram.
+        """
+
+        self.binning = max(1, int(np.ceil((high - low + 1).max() / max_size)))
+        self.left = int(low[0])
+        self.top = int(high[1])
+        self.width = int((high[0] - low[0]) // self.binning) + 1
+        self.height = int((high[1] - low[1]) // self.binning) + 1
+        self.dose = np.zeros(self.width * self.height, dtype=np.float64)
+
+    def add(self, x, y, weights=None):
+        pixels = ((self.top - y) // self.binning) * self.width + (x - self.left) // self.binning
+        self.dose += np.bincount(pixels, weights=weights, minlength=len(self.dose))
+
+    def add_transit(self, x, y, transit_samples):
+        """
+        Spreads the dose of the jumps between consecutive positions along the straight line between them.
+        """
+
+        if transit_samples <= 0 or len(x) < 2:
+            return
+
+        dx, dy = np.diff(x), np.diff(y)
+        steps = np.maximum(np.abs(dx), np.abs(dy))
+        jumps = np.flatnonzero(steps > 1)
+        if len(jumps) == 0:
+            return
+
+        # Positions strictly between the ends of every jump
+        between = steps[jumps] - 1
+        jump = np.repeat(jumps, between)
+        index = np.arange(1, len(jump) + 1) - np.repeat(np.cumsum(between) - between, between)
+        fraction = index / steps[jump]
+        self.add(x[jump] + np.rint(fraction * dx[jump]).astype(np.int64),
+                 y[jump] + np.rint(fraction * dy[jump]).astype(np.int64),
+                 np.repeat(transit_samples / between, between))
+
+    def dose_map(self, sensitivity, samples):
+        return DoseMap(self.dose.reshape(self.height, self.width), self.left * sensitivity,
+                       self.top * sensitivity, self.binning * sensitivity, self.binning, samples)
+
+
+def _signal_block(signals, start, stop):
+    if isinstance(signals, (tuple, list)):  # Separate LR and UD signals
+        return np.vstack([signals[0][start:stop], signals[1][start:stop]])
+    if hasattr(signals, "chunk"):
+        return signals.chunk(start, stop)
+    return signals[:, start:stop]
+
+
+def simulate_path(voltage_pairs, dwell, sensitivity, transit_samples=TRANSIT_SAMPLES, max_size=MAX_DOSE_SIZE,
+                  progress=None):
+    """
+    Accumulates the dose of a beam path, every point receiving its dwell count and every jump between two distant
+    points 'transit_samples' spread along the jump.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates, in the order of the path.
+    - dwell (int or numpy.ndarray): Number of samples of every point.
+    - sensitivity (float): The step of the DAC, in volts.
+    - transit_samples (float): Dose of a jump, in samples.
+    - max_size (int): The largest side of the dose map, larger patterns being binned.
+    - progress (callable, optional): Called with the fraction of the path accumulated, interrupting the
+      simulation if it raises an exception.
+
+    Returns:
+    - DoseMap: The dose delivered by the path.
+    """
+
+    try:
+        voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+        dwell = np.broadcast_to(np.asarray(dwell, dtype=np.int64), (len(voltage_pairs),))
+        if len(voltage_pairs) == 0:
+            return DoseMap(np.zeros((0, 0)), 0.0, 0.0, sensitivity, 1, 0)
+
+        codes = np.rint(voltage_pairs / sensitivity).astype(np.int64)
+        histogram = _Histogram(codes.min(axis=0), codes.max(axis=0), max_size)
+
+        # Chunks overlap by one point, so that the jumps between two chunks are accumulated
+        for start in range(0, len(codes), CHUNK_SAMPLES):
+            if progress is not None:
+                progress(start / len(codes))
+            stop = min(start + CHUNK_SAMPLES, len(codes))
+            histogram.add(codes[start:stop, 0], codes[start:stop, 1], dwell[start:stop])
+            histogram.add_transit(codes[max(0, start - 1):stop, 0], codes[max(0, start - 1):stop, 1],
+                                  transit_samples)
+
+        return histogram.dose_map(sensitivity, int(dwell.sum()))
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't simulate the dose of the path : {e}")
+
+
+def simulate_signals(signals, sensitivity, transit_samples=TRANSIT_SAMPLES, max_size=MAX_DOSE_SIZE,
+                     chunk_samples=CHUNK_SAMPLES, progress=None):
+    """
+    Accumulates the dose delivered by the LR and UD signals, one sample at a time.
+
+    The signals are read chunk by chunk, twice: to find the extent of the pattern, then to accumulate the dose, so
+    signals of 10^8 samples or more are simulated without being held in memory. Lazy signals are simulated from
+    their points and dwell counts, without generating their samples.
+
+    Parameters:
+    - signals (numpy.ndarray, tuple or Image_to_Signals.RepeatedSignals): The 2 x M signals, the (LR_signal,
+      UD_signal) pair, or the lazy descriptor of the signals.
+    - sensitivity (float): The step of the DAC, in volts.
+    - transit_samples (float): Dose of a jump between two distant samples, in samples.
+    - max_size (int): The largest side of the dose map, larger patterns being binned.
+    - chunk_samples (int): Number of samples read at once.
+    - progress (callable, optional): Called with the fraction of the simulation done, interrupting it if it
+      raises an exception.
+
+    Returns:
+    - DoseMap: The dose delivered by the signals.
+    """
+
+    try:
+        if isinstance(signals, RepeatedSignals):
+            return simulate_path(signals.voltage_pairs, signals.samples_per_pixel, sensitivity, transit_samples,
+                                 max_size, progress)
+
+        total_samples = signals.shape[1] if hasattr(signals, "shape") else len(signals[0])
+        if total_samples == 0:
+            return DoseMap(np.zeros((0, 0)), 0.0, 0.0, sensitivity, 1, 0)
+        starts = range(0, total_samples, chunk_samples)
+
+        # First pass, the extent of the pattern
+        low = np.full(2, np.iinfo(np.int64).max)
+        high = np.full(2, np.iinfo(np.int64).min)
+        for start in starts:
+            if progress is not None:
+                progress(start / total_samples / 4)
+            codes = np.rint(_signal_block(signals, start, start + chunk_samples) / sensitivity).astype(np.int64)
+            low = np.minimum(low, codes.min(axis=1))
+            high = np.maximum(high, codes.max(axis=1))
+
+        # Second pass, the dose of every sample and of the jumps, the last sample of a chunk starting the next one
+        histogram = _Histogram(low, high, max_size)
+        previous = None
+        for start in starts:
+            if progress is not None:
+                progress(0.25 + 0.75 * start / total_samples)
+            codes = np.rint(_signal_block(signals, start, start + chunk_samples) / sensitivity).astype(np.int64)
+
+            # Runs of samples at the same position are accumulated at once
+            run_starts = np.flatnonzero(np.concatenate([[True], np.any(codes[:, 1:] != codes[:, :-1], axis=0)]))
+            run_lengths = np.diff(np.append(run_starts, codes.shape[1]))
+            codes = codes[:, run_starts]
+            histogram.add(codes[0], codes[1], run_lengths)
+            if previous is not None:
+                codes = np.hstack([previous, codes])
+            histogram.add_transit(codes[0], codes[1], transit_samples)
+            previous = codes[:, -1:]
+
+        return histogram.dose_map(sensitivity, total_samples)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't simulate the dose of the signals : {e}")
+
+
+def _gaussian_samples(length, sigma_pixels):
+    """
+    A Gaussian of unit sum sampled on 'length' pixels, centered on the first one and wrapped around the end.
+    """
+
+    distance = np.minimum(np.arange(length), length - np.arange(length))
+    samples = np.exp(-distance ** 2 / (2 * sigma_pixels ** 2))
+    return samples / samples.sum()
+
+
+def gaussian_blur(dose_map, sigma):
+    """
+    Convolves a dose map with a Gaussian beam profile, by multiplying their Fourier transforms.
+
+    The map is padded by GAUSSIAN_EXTENT standard deviations, so the dose spread around the pattern is kept and
+    doesn't wrap around the borders. The profile is normalized: the total dose is unchanged.
+
+    Parameters:
+    - dose_map (DoseMap): The dose of the pattern.
+    - sigma (float): The standard deviation of the beam profile, in volts.
+
+    Returns:
+    - DoseMap: The dose map convolved with the beam profile, larger than the original by the padding.
+    """
+
+    try:
+        sigma_pixels = sigma / dose_map.pixel
+        if sigma_pixels <= 0 or dose_map.dose.size == 0:
+            return dose_map
+
+        pad = int(np.ceil(GAUSSIAN_EXTENT * sigma_pixels))
+        dose = np.pad(dose_map.dose, pad)
+        height, width = dose.shape
+
+        # Fourier transform of the Gaussian sampled on the pixels and normalized, one axis at a time. Sampling it
+        # keeps it positive even narrower than a pixel, where its analytic transform would ring below zero
+        profile_y = np.fft.fft(_gaussian_samples(height, sigma_pixels)).real[:, None]
+        profile_x = np.fft.rfft(_gaussian_samples(width, sigma_pixels)).real[None, :]
+
+        blurred = np.fft.irfft2(np.fft.rfft2(dose) * profile_y * profile_x, s=dose.shape)
+        np.maximum(blurred, 0, out=blurred)  # Rounding errors of the transforms
+
+        return DoseMap(blurred, dose_map.left - pad * dose_map.pixel, dose_map.top + pad * dose_map.pixel,
+                       dose_map.pixel, dose_map.binning, dose_map.samples)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't convolve the dose with the beam profile : {e}")
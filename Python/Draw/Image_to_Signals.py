@@ -3,6 +3,45 @@ from PIL import Image
 import numpy as np
 
 
+def voltage_coordinates(width, height, voltage_range, sensitivity):
+    """
+    Computes the voltages of the columns and rows of an image, keeping its aspect ratio and centering it within
+    the voltage range.
+
+    Parameters:
+    - width (int): Width of the image in pixels.
+    - height (int): Height of the image in pixels.
+    - voltage_range (float): The maximum range of voltage values for the output coordinates.
+    - sensitivity (float): The smallest change in voltage represented in the output, determining the granularity.
+
+    Returns:
+    - tuple of numpy.ndarray: The voltage_x of every column (increasing) and the voltage_y of every row
+      (decreasing, the first row being the top of the image).
+    """
+
+    aspect_ratio = width / height
+
+    # Determine the voltage ranges that maintain the image aspect ratio
+    if width > height:
+        voltage_range_x = voltage_range
+        voltage_range_y = voltage_range / aspect_ratio
+    else:
+        voltage_range_y = voltage_range
+        voltage_range_x = voltage_range * aspect_ratio
+
+    # Create grids for voltage coordinates, adjusting the starting point
+    x_coords = np.arange(-voltage_range_x/2, voltage_range_x/2, sensitivity)[:width]
+    y_coords = np.arange(voltage_range_y/2, -voltage_range_y/2, -sensitivity)[:height]
+
+    # Adjust the coordinates so the image center aligns with the voltage center
+    offset_x = (voltage_range_x - (width - 1) * sensitivity) / 2
+    offset_y = (voltage_range_y - (height - 1) * sensitivity) / 2
+    x_coords += offset_x
+    y_coords -= offset_y  # Subtract because y-coords are decreasing
+
+    return x_coords, y_coords
+
+
 def Image_to_voltage_pairs(image_path, voltage_range, sensitivity):
     """
     Converts an image into a list of voltage coordinates based on pixel transparency.
@@ -18,7 +57,8 @@ def Image_to_voltage_pairs(image_path, voltage_range, sensitivity):
     - sensitivity (float): The smallest change in voltage represented in the output, determining the granularity.
 
     Returns:
-    - list of tuple: A list of (voltage_x, voltage_y) tuples for non-transparent pixels.
+    - numpy.ndarray: An N x 2 array of (voltage_x, voltage_y) coordinates for non-transparent pixels, row by row
+      from the top of the image and left to right.
 
     The function supports images with transparency (e.g., RGBA format), where only non-transparent pixels
     are converted into voltage coordinates.
@@ -27,40 +67,20 @@ def Image_to_voltage_pairs(image_path, voltage_range, sensitivity):
     try:
         image = Image.open(image_path)
         width, height = image.size
-        aspect_ratio = width / height
+        x_coords, y_coords = voltage_coordinates(width, height, voltage_range, sensitivity)
 
-        # Determine the voltage ranges that maintain the image aspect ratio
-        if width > height:
-            voltage_range_x = voltage_range
-            voltage_range_y = voltage_range / aspect_ratio
-        else:
-            voltage_range_y = voltage_range
-            voltage_range_x = voltage_range * aspect_ratio
-
-        # Create grids for voltage coordinates, adjusting the starting point
-        x_coords = np.arange(-voltage_range_x/2, voltage_range_x/2, sensitivity)[:width]
-        y_coords = np.arange(voltage_range_y/2, -voltage_range_y/2, -sensitivity)[:height]
-
-        # Adjust the coordinates so the image center aligns with the voltage center
-        offset_x = (voltage_range_x - (width - 1) * sensitivity) / 2
-        offset_y = (voltage_range_y - (height - 1) * sensitivity) / 2
-        x_coords += offset_x
-        y_coords -= offset_y  # Subtract because y-coords are decreasing
-
-        non_transparent_coords = []
-
-        # Collect non-transparent pixel coordinates
-        for y in range(height):
-            for x in range(width):
-                pixel = image.getpixel((x, y))
-                # Check if pixel is non-transparent (assuming RGBA)
-                if len(pixel) == 4 and pixel[3] > 0:
-                    voltage_x = x_coords[x]
-                    voltage_y = y_coords[y]
-                    non_transparent_coords.append((voltage_x, voltage_y))
-
-        # Sort the coordinates to go row by row, left to right
-        non_transparent_coords.sort(key=lambda coord: (-coord[1], coord[0]))
+        # Only images with transparency (e.g., RGBA format) have non-transparent pixels
+        if "A" not in image.getbands() and "transparency" not in image.info:
+            return np.empty((0, 2), dtype=np.float64)
+
+        # Mask of the non-transparent pixels, computed on the whole alpha channel at once
+        alpha = np.asarray(image.convert("RGBA"))[:, :, 3]
+        rows, columns = np.nonzero(alpha)
+
+        # np.nonzero returns the pixels row by row, left to right, so the coordinates don't need to be sorted
+        non_transparent_coords = np.empty((len(rows), 2), dtype=np.float64)
+        non_transparent_coords[:, 0] = x_coords[columns]
+        non_transparent_coords[:, 1] = y_coords[rows]
 
         return non_transparent_coords
 
@@ -68,6 +88,196 @@ def Image_to_voltage_pairs(image_path, voltage_range, sensitivity):
         raise Exception(f"\nCouldn't generate voltage pairs : {e}")
 
 
+def Image_to_dose_map(image_path, voltage_range, sensitivity):
+    """
+    Converts a grayscale image into voltage coordinates and relative doses, to mill a relief.
+
+    The dose of a pixel is its intensity, from 0 for black to 1 for white, multiplied by its opacity when the
+    image has transparency. Pixels receiving no dose are left out. The coordinates have the same geometry as
+    the ones of 'Image_to_voltage_pairs'.
+
+    Parameters:
+    - image_path (str): Path to the image file.
+    - voltage_range (float): The maximum range of voltage values for the output coordinates.
+    - sensitivity (float): The smallest change in voltage represented in the output, determining the granularity.
+
+    Returns:
+    - tuple of numpy.ndarray: An N x 2 array of (voltage_x, voltage_y) coordinates, row by row from the top of
+      the image and left to right, and the N doses between 0 and 1.
+    """
+
+    try:
+        image = Image.open(image_path)
+        width, height = image.size
+        x_coords, y_coords = voltage_coordinates(width, height, voltage_range, sensitivity)
+
+        # Intensity and opacity of every pixel, computed on the whole image at once
+        gray = np.asarray(image.convert("LA"), dtype=np.float64)
+        doses = gray[:, :, 0] / 255
+        if "A" in image.getbands() or "transparency" in image.info:
+            doses *= gray[:, :, 1] / 255
+
+        rows, columns = np.nonzero(doses)
+
+        coordinates = np.empty((len(rows), 2), dtype=np.float64)
+        coordinates[:, 0] = x_coords[columns]
+        coordinates[:, 1] = y_coords[rows]
+
+        return coordinates, doses[rows, columns]
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the dose map : {e}")
+
+
+def dwell_counts(doses, samples_per_pixel):
+    """
+    Converts relative doses into dwell times, the number of samples each coordinate is held.
+
+    Parameters:
+    - doses (numpy.ndarray): The doses between 0 and 1.
+    - samples_per_pixel (int): Number of samples of a full dose.
+
+    Returns:
+    - numpy.ndarray: The number of samples of every coordinate (int64), some of them can be 0.
+    """
+
+    return np.rint(np.asarray(doses) * samples_per_pixel).astype(np.int64)
+
+
+class RepeatedSignals:
+    """
+    Lazy description of the Left-Right (LR) and Up-Down (UD) signals of a set of voltage coordinates, each
+    coordinate being held during the same number of samples or during its own dwell count.
+
+    The signals are only generated when they are needed, entirely with 'materialize' or by blocks of samples
+    with 'chunk', so that a writer streaming the samples to the card never holds the complete signals in memory.
+    """
+
+    def __init__(self, voltage_pairs, samples_per_pixel):
+        """
+        Parameters:
+        - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+        - samples_per_pixel (int or numpy.ndarray): Number of samples each voltage value should be held, the same
+          for all of them or one count per coordinate.
+        """
+
+        self.voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+
+        if np.ndim(samples_per_pixel) == 0:
+            self.samples_per_pixel = int(samples_per_pixel)
+            self._ends = None
+            self.total_samples = len(self.voltage_pairs) * self.samples_per_pixel
+        else:
+            self.samples_per_pixel = np.asarray(samples_per_pixel, dtype=np.int64)
+            self._ends = np.cumsum(self.samples_per_pixel)  # Index following the last sample of each coordinate
+            self.total_samples = int(self._ends[-1]) if len(self._ends) else 0
+
+        self.shape = (2, self.total_samples)
+
+    def __len__(self):
+        """
+        Returns:
+        - int: The number of samples per channel.
+        """
+
+        return self.total_samples
+
+    def chunk(self, start, stop):
+        """
+        Generates a block of samples of both signals.
+
+        Parameters:
+        - start (int): Index of the first sample of the block.
+        - stop (int): Index following the last sample of the block.
+
+        Returns:
+        - numpy.ndarray: A C-contiguous float64 array of shape (2, stop - start).
+        """
+
+        start = max(0, start)
+        stop = min(stop, self.total_samples)
+        if stop <= start:
+            return np.empty((2, 0), dtype=np.float64)
+
+        if self._ends is None:
+            first_pixel = start // self.samples_per_pixel
+            last_pixel = -(-stop // self.samples_per_pixel)
+            samples = self.samples_per_pixel
+            offset = first_pixel * self.samples_per_pixel
+        else:
+            first_pixel = int(np.searchsorted(self._ends, start, side='right'))
+            last_pixel = int(np.searchsorted(self._ends, stop - 1, side='right')) + 1
+            samples = self.samples_per_pixel[first_pixel:last_pixel]
+            offset = int(self._ends[first_pixel] - samples[0])
+
+        signals = pairs_to_signals(self.voltage_pairs[first_pixel:last_pixel], samples)
+
+        return np.ascontiguousarray(signals[:, start - offset:stop - offset])
+
+    def point_at(self, sample):
+        """
+        Parameters:
+        - sample (int): Index of a sample of the signals.
+
+        Returns:
+        - int: Index of the voltage coordinate output at this sample.
+        """
+
+        if self._ends is None:
+            return int(sample) // self.samples_per_pixel
+        return int(np.searchsorted(self._ends, sample, side='right'))
+
+    def materialize(self):
+        """
+        Returns:
+        - numpy.ndarray: The complete signals, as a C-contiguous float64 array of shape (2, samples).
+        """
+
+        return pairs_to_signals(self.voltage_pairs, self.samples_per_pixel)
+
+
+def pairs_to_signals(voltage_pairs, samples_per_pixel, lazy=False):
+    """
+    Generates the Left-Right (LR) and Up-Down (UD) signals from an array of voltage coordinates.
+
+    Each coordinate is repeated a specified number of times to simulate the duration each voltage is held
+    during a scanning process, the same for all of them or one dwell count per coordinate (dose map). Both
+    signals are written into one 2 x M buffer, which can be given as-is to an AnalogMultiChannelWriter, without
+    building intermediate Python lists.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - samples_per_pixel (int or numpy.ndarray): Number of samples each voltage value should be held,
+                               corresponding to the duration a voltage level is maintained, or an array of N
+                               dwell counts.
+    - lazy (bool): If True, returns a RepeatedSignals descriptor instead of generating the samples.
+
+    Returns:
+    - numpy.ndarray or RepeatedSignals: A C-contiguous float64 array of shape (2, M), M being the total number of
+      samples, the LR signal in the first row and the UD signal in the second one, or its lazy descriptor.
+    """
+
+    try:
+        if lazy:
+            return RepeatedSignals(voltage_pairs, samples_per_pixel)
+
+        voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+        points_number = len(voltage_pairs)
+
+        # Variable dwell, every coordinate is repeated its own number of times
+        if np.ndim(samples_per_pixel) > 0:
+            return np.ascontiguousarray(np.repeat(voltage_pairs.T, samples_per_pixel, axis=1))
+
+        # Every voltage is broadcast to its samples through a reshaped view of the output buffer
+        signals = np.empty((2, points_number * samples_per_pixel), dtype=np.float64)
+        signals.reshape(2, points_number, samples_per_pixel)[...] = voltage_pairs.T[:, :, None]
+
+        return signals
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the signals from the voltage pairs : {e}")
+
+
 def pairs_to_signal(voltage_pairs, samples_per_pixel):
     """
     Generates Left-Right (LR) and Up-Down (UD) signals from a list of voltage coordinates.
@@ -77,35 +287,18 @@ def pairs_to_signal(voltage_pairs, samples_per_pixel):
     the duration each voltage is held during a scanning process.
 
     Parameters:
-    - voltage_pairs (list of tuple): A list of (voltage_x, voltage_y) tuples representing voltage coordinates.
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
     - samples_per_pixel (int): Number of samples each voltage value should be held, corresponding to the
                                duration a voltage level is maintained.
 
     Returns:
     - tuple of numpy.ndarray: A tuple containing two 1D numpy arrays for the LR and UD signals respectively.
-
-    This method is useful in applications requiring precise control of output signals, such as in scanning
-    microscopy or other applications involving precise voltage control.
+      They are the rows of the buffer returned by 'pairs_to_signals', not copies.
     """
 
-    try:
-        # Initializing lists to store signals
-        signal_lr = []
-        signal_ud = []
+    signals = pairs_to_signals(voltage_pairs, samples_per_pixel)
 
-        for point in voltage_pairs:
-            # Generation of constant values for each point during the defined time
-            signal_lr.extend([point[0]] * samples_per_pixel)
-            signal_ud.extend([point[1]] * samples_per_pixel)
-
-        # Converting lists into 1D numpy arrays
-        signal_lr = np.array(signal_lr)
-        signal_ud = np.array(signal_ud)
-
-        return signal_lr, signal_ud
-
-    except Exception as e:
-        raise Exception(f"\nCouldn't generate the signals from the voltage pairs : {e}")
+    return signals[0], signals[1]
 
 
 if __name__ == '__main__':
@@ -121,10 +314,10 @@ if __name__ == '__main__':
 
     voltage_pairs = Image_to_voltage_pairs(image_path, voltage_range, sensitivity)
 
-    signal_lr, signal_ud = pairs_to_signal(voltage_pairs, samples_per_pixel)
+    signal_lr, signal_ud = pairs_to_signals(voltage_pairs, samples_per_pixel)
 
-    # Unzip the list of coordinates
-    x_vals, y_vals = zip(*voltage_pairs)
+    # Split the coordinates
+    x_vals, y_vals = voltage_pairs[:, 0], voltage_pairs[:, 1]
     plt.figure(figsize=(10, 6))
     plt.scatter(x_vals, y_vals, s=1)  # s=1 sets the size of each point
     plt.title('Voltage Coordinates for Non-Transparent Pixels')
@@ -0,0 +1,430 @@
+import numpy as np
+
+# Size in pixels of the blocks of the spatial index used by the nearest neighbour tour
+INDEX_BLOCK_SIZE = 32
+
+# Neighbours checked first by the nearest neighbour tour, the closest ones first
+NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# Number of pixels visited by the nearest neighbour tour between two progress reports
+PROGRESS_INTERVAL = 65536
+
+
+def grid_indices(voltage_pairs, step):
+    """
+    Converts voltage coordinates into integer positions on the grid of the DAC.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - step (float): The voltage between two neighbouring pixels.
+
+    Returns:
+    - tuple of numpy.ndarray: The rows (from the highest voltage_y) and the columns (from the lowest voltage_x).
+    """
+
+    x = voltage_pairs[:, 0]
+    y = voltage_pairs[:, 1]
+    columns = np.rint((x - x.min()) / step).astype(np.int64)
+    rows = np.rint((y.max() - y) / step).astype(np.int64)
+
+    return rows, columns
+
+
+def raster_order(rows, columns):
+    """
+    Row by row, left to right, like the image.
+
+    Returns:
+    - numpy.ndarray: The indices of the points in their new order.
+    """
+
+    return np.lexsort((columns, rows))
+
+
+def serpentine_order(rows, columns):
+    """
+    Row by row, one row out of two from right to left, so the beam doesn't fly back at the end of each row.
+    The direction alternates between the rows which contain points.
+
+    Returns:
+    - numpy.ndarray: The indices of the points in their new order.
+    """
+
+    order = np.lexsort((columns, rows))
+    sorted_rows = rows[order]
+
+    # Rank of the row among the rows containing points
+    rank = np.zeros(len(order), dtype=np.int64)
+    rank[1:] = np.cumsum(sorted_rows[1:] != sorted_rows[:-1])
+
+    key = np.where(rank % 2 == 1, -columns[order], columns[order])
+    return order[np.lexsort((key, sorted_rows))]
+
+
+def nearest_neighbour_order(rows, columns, progress=None):
+    """
+    Greedy tour going each time to the closest point not visited yet, starting from the first point of the image.
+
+    The 8 neighbouring pixels are checked first, which is enough inside filled areas. Otherwise the closest point
+    is searched with a spatial index of the blocks of INDEX_BLOCK_SIZE pixels containing points: only the blocks
+    which can contain a closer point than the farthest corner of the closest non-empty block are searched. The
+    index only holds the pixels and the blocks containing points, so its size doesn't depend on the extent of the
+    pattern. Points sharing the same pixel are visited together.
+
+    Parameters:
+    - progress (callable, optional): Called every PROGRESS_INTERVAL pixels with the fraction of the tour done.
+      The tour is interrupted if it raises an exception.
+
+    Returns:
+    - numpy.ndarray: The indices of the points in their new order.
+    """
+
+    points_number = len(rows)
+    if points_number == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Points sharing a pixel are grouped in cells, in their original order, numbered from the top left pixel
+    width = int(columns.max()) + 1
+    cells, cell_of_point = np.unique(rows * width + columns, return_inverse=True)
+    cell_rows, cell_columns = cells // width, cells % width
+
+    # Pixel -> cell not visited yet
+    owner = dict(zip(cells.tolist(), range(len(cells))))
+
+    # Blocks containing cells, with their cells not visited yet in the order of the cells
+    block = INDEX_BLOCK_SIZE
+    block_width = width // block + 1
+    blocks, block_of_cell = np.unique((cell_rows // block) * block_width + cell_columns // block,
+                                      return_inverse=True)
+    index = _BlockIndex(blocks // block_width * block, blocks % block_width * block,
+                        np.argsort(block_of_cell, kind='stable'), np.bincount(block_of_cell), cell_rows,
+                        cell_columns)
+
+    tour = np.empty(len(cells), dtype=np.int64)
+    current = 0
+    for position in range(len(cells)):
+        tour[position] = current
+        row, column = int(cell_rows[current]), int(cell_columns[current])
+        del owner[row * width + column]
+        index.visit(current, block_of_cell[current])
+
+        if position == len(cells) - 1:
+            break
+
+        if progress is not None and position % PROGRESS_INTERVAL == 0:
+            progress(position / len(cells))
+
+        current = -1
+        for d_row, d_column in NEIGHBOURS:
+            c = column + d_column
+            if 0 <= c < width:
+                current = owner.get((row + d_row) * width + c, -1)
+                if current >= 0:
+                    break
+
+        if current < 0:
+            current = index.closest(row, column)
+
+    # Expand the cells into their points, in their original order
+    points_order = np.argsort(cell_of_point, kind='stable')
+    first_point = np.searchsorted(cell_of_point[points_order], np.arange(len(cells)))
+    points_per_cell = np.diff(np.append(first_point, points_number))
+
+    starts = np.repeat(first_point[tour], points_per_cell[tour])
+    offsets = np.arange(points_number) - np.repeat(np.cumsum(points_per_cell[tour]) - points_per_cell[tour],
+                                                   points_per_cell[tour])
+    return points_order[starts + offsets]
+
+
+class _BlockIndex:
+    """
+    Spatial index of 'nearest_neighbour_order': the blocks containing cells, and the cells of every block.
+    """
+
+    def __init__(self, first_rows, first_columns, cells_by_block, cells_per_block, cell_rows, cell_columns):
+        """
+        Parameters:
+        - first_rows, first_columns (numpy.ndarray): The top left pixel of every block containing cells.
+        - cells_by_block (numpy.ndarray): The cells sorted by block, in their order inside a block.
+        - cells_per_block (numpy.ndarray): Number of cells of every block.
+        - cell_rows, cell_columns (numpy.ndarray): The pixel of every cell.
+        """
+
+        self.first_rows, self.first_columns = first_rows, first_columns
+        self.last_rows, self.last_columns = first_rows + INDEX_BLOCK_SIZE - 1, first_columns + INDEX_BLOCK_SIZE - 1
+        self.cells_by_block = cells_by_block
+        self.block_starts = np.cumsum(cells_per_block) - cells_per_block
+        self.block_sizes = cells_per_block
+        self.counts = cells_per_block.copy()  # Cells not visited yet in every block
+        self.visited = np.zeros(len(cell_rows), dtype=bool)
+        self.cell_rows, self.cell_columns = cell_rows, cell_columns
+
+    def visit(self, cell, block):
+        self.visited[cell] = True
+        self.counts[block] -= 1
+
+    def block_cells(self, block):
+        """
+        Returns:
+        - numpy.ndarray: The cells of a block not visited yet, in their order.
+        """
+
+        start = self.block_starts[block]
+        cells = self.cells_by_block[start:start + self.block_sizes[block]]
+        return cells[~self.visited[cells]]
+
+    def closest(self, row, column):
+        """
+        Finds the closest cell not visited yet, the first one in the order of the cells between equidistant cells.
+        """
+
+        blocks = np.flatnonzero(self.counts)
+
+        # Smallest and largest distance between the point and each non-empty block
+        first_rows, first_columns = self.first_rows[blocks], self.first_columns[blocks]
+        last_rows, last_columns = self.last_rows[blocks], self.last_columns[blocks]
+        lower = np.hypot(np.maximum(0, np.maximum(first_rows - row, row - last_rows)),
+                         np.maximum(0, np.maximum(first_columns - column, column - last_columns)))
+        upper = np.hypot(np.maximum(np.abs(row - first_rows), np.abs(row - last_rows)),
+                         np.maximum(np.abs(column - first_columns), np.abs(column - last_columns)))
+
+        best_cell, best_distance = -1, np.inf
+        for block in blocks[lower <= upper.min()]:
+            cells = self.block_cells(block)
+            distances = np.hypot(self.cell_rows[cells] - row, self.cell_columns[cells] - column)
+            closest = np.argmin(distances)
+            cell = int(cells[closest])
+            if distances[closest] < best_distance or (distances[closest] == best_distance and cell < best_cell):
+                best_cell, best_distance = cell, distances[closest]
+
+        return best_cell
+
+
+def connected_components(rows, columns):
+    """
+    Labels the 8-connected groups of pixels (islands) of a pattern.
+
+    The points are grouped in horizontal runs of consecutive pixels, the runs of neighbouring rows which touch
+    each other are merged with a union-find, so the work is proportional to the number of runs and not of pixels.
+
+    Returns:
+    - tuple: The label of every point (numpy.ndarray) and the number of components (int).
+    """
+
+    points_number = len(rows)
+    if points_number == 0:
+        return np.empty(0, dtype=np.int64), 0
+
+    order = np.lexsort((columns, rows))
+    sorted_rows, sorted_columns = rows[order], columns[order]
+
+    # Horizontal runs of consecutive pixels (a pixel appearing twice continues its run)
+    run_start = np.ones(points_number, dtype=bool)
+    run_start[1:] = (sorted_rows[1:] != sorted_rows[:-1]) | (sorted_columns[1:] > sorted_columns[:-1] + 1)
+    starts = np.flatnonzero(run_start)
+    ends = np.append(starts[1:], points_number) - 1
+    run_rows, first_columns, last_columns = sorted_rows[starts], sorted_columns[starts], sorted_columns[ends]
+
+    # Runs of the next row overlapping each run once extended by one pixel on both sides (8-connectivity)
+    stride = int(columns.max()) + 3
+    first_keys = run_rows * stride + first_columns + 1
+    last_keys = run_rows * stride + last_columns + 1
+    low = np.searchsorted(last_keys, (run_rows + 1) * stride + first_columns, 'left')
+    high = np.searchsorted(first_keys, (run_rows + 1) * stride + last_columns + 2, 'right')
+    links = np.maximum(high - low, 0)
+    linked_runs = np.repeat(np.arange(len(starts)), links)
+    other_runs = np.repeat(low, links) + np.arange(links.sum()) - np.repeat(np.cumsum(links) - links, links)
+
+    # Union-find over the runs
+    parent = list(range(len(starts)))
+
+    def find(run):
+        while parent[run] != run:
+            parent[run] = parent[parent[run]]
+            run = parent[run]
+        return run
+
+    for first, second in zip(linked_runs.tolist(), other_runs.tolist()):
+        root_first, root_second = find(first), find(second)
+        if root_first != root_second:
+            parent[max(root_first, root_second)] = min(root_first, root_second)
+
+    roots = np.array([find(run) for run in range(len(starts))])
+    run_labels = np.unique(roots, return_inverse=True)[1]
+
+    labels = np.empty(points_number, dtype=np.int64)
+    labels[order] = np.repeat(run_labels, ends - starts + 1)
+
+    return labels, int(run_labels.max()) + 1
+
+
+def components_order(rows, columns):
+    """
+    Writes the islands of the pattern one after the other, each of them with a serpentine path. The next island
+    is the one starting the closest to the end of the previous one, starting with the island of the first point of
+    the image.
+
+    Returns:
+    - numpy.ndarray: The indices of the points in their new order.
+    """
+
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    labels, components_number = connected_components(rows, columns)
+
+    # Serpentine inside every island, an island has no empty row so the direction follows the row parity
+    first_row = np.full(components_number, np.iinfo(np.int64).max)
+    np.minimum.at(first_row, labels, rows)
+    key = np.where((rows - first_row[labels]) % 2 == 1, -columns, columns)
+    order = np.lexsort((key, rows, labels))
+
+    # Range of every island in 'order'
+    bounds = np.searchsorted(labels[order], np.arange(components_number + 1))
+    entries, exits = order[bounds[:-1]], order[bounds[1:] - 1]
+
+    # Greedy ordering of the islands
+    remaining = np.ones(components_number, dtype=bool)
+    current = int(labels[np.lexsort((columns, rows))[0]])
+    islands = []
+    while True:
+        islands.append(current)
+        remaining[current] = False
+        if not remaining.any():
+            break
+        candidates = np.flatnonzero(remaining)
+        distances = np.hypot(rows[entries[candidates]] - rows[exits[current]],
+                             columns[entries[candidates]] - columns[exits[current]])
+        current = int(candidates[np.argmin(distances)])
+
+    return np.concatenate([order[bounds[island]:bounds[island + 1]] for island in islands])
+
+
+def drawing_order(rows, columns):
+    """
+    In the order of the coordinates, like the lines of a vector pattern followed as they were drawn.
+
+    Returns:
+    - numpy.ndarray: The indices of the points in their new order.
+    """
+
+    return np.arange(len(rows))
+
+
+# Strategies fast enough to be compared for every pattern, the nearest neighbour tour visiting the pixels one by one
+QUICK_STRATEGIES = ("raster", "serpentine", "components", "drawing")
+
+# Available path strategies
+PATH_STRATEGIES = {
+    "raster": raster_order,
+    "serpentine": serpentine_order,
+    "nearest_neighbour": nearest_neighbour_order,
+    "components": components_order,
+    "drawing": drawing_order,
+}
+
+
+def path_order(voltage_pairs, strategy, step, progress=None):
+    """
+    Computes the order of the voltage coordinates of a pattern which reduces the jumps of the beam between them,
+    so that values attached to the coordinates (like their dwell counts) can follow the same order.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - strategy (str): One of PATH_STRATEGIES: "raster", "serpentine", "nearest_neighbour", "components"
+      or "drawing".
+    - step (float): The voltage between two neighbouring pixels.
+    - progress (callable, optional): Called with the fraction of the path ordered during the long strategies,
+      interrupting them if it raises an exception.
+
+    Returns:
+    - numpy.ndarray: The indices of the coordinates in the order of the path.
+    """
+
+    try:
+        if strategy not in PATH_STRATEGIES:
+            raise ValueError(f"Unknown path strategy '{strategy}', available strategies are "
+                             f"{', '.join(PATH_STRATEGIES)}")
+
+        voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+        if len(voltage_pairs) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        rows, columns = grid_indices(voltage_pairs, step)
+        if strategy == "nearest_neighbour":
+            return nearest_neighbour_order(rows, columns, progress)
+        return PATH_STRATEGIES[strategy](rows, columns)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't order the beam path : {e}")
+
+
+def order_path(voltage_pairs, strategy, step):
+    """
+    Reorders the voltage coordinates of a pattern to reduce the jumps of the beam between them.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - strategy (str): One of PATH_STRATEGIES: "raster", "serpentine", "nearest_neighbour", "components"
+      or "drawing".
+    - step (float): The voltage between two neighbouring pixels.
+
+    Returns:
+    - numpy.ndarray: The N x 2 array of voltage coordinates in the order of the path.
+    """
+
+    voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+    return voltage_pairs[path_order(voltage_pairs, strategy, step)]
+
+
+def jump_length(voltage_pairs, step):
+    """
+    Measures the jumps of a path, the moves between two points which aren't neighbouring pixels.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of voltage coordinates, in the order of the path.
+    - step (float): The voltage between two neighbouring pixels.
+
+    Returns:
+    - tuple: The total length of the jumps in volts (float) and their number (int).
+    """
+
+    moves = np.hypot(np.diff(voltage_pairs[:, 0]), np.diff(voltage_pairs[:, 1]))
+    jumps = moves > step * np.sqrt(2) * (1 + 1e-6)
+
+    return float(moves[jumps].sum()), int(np.count_nonzero(jumps))
+
+
+def compare_strategies(voltage_pairs, step, strategies=None, progress=None):
+    """
+    Measures the jumps of every path strategy for a pattern, to choose the fastest one.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of voltage coordinates.
+    - step (float): The voltage between two neighbouring pixels.
+    - strategies (iterable of str, optional): The strategies to compare, QUICK_STRATEGIES by default.
+    - progress (callable, optional): Called with the fraction of the comparison done, interrupting it if it
+      raises an exception.
+
+    Returns:
+    - dict: For every strategy, the total length of the jumps in volts and their number.
+    """
+
+    try:
+        voltage_pairs = np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+        strategies = list(strategies or QUICK_STRATEGIES)
+
+        jumps = {}
+        for index, strategy in enumerate(strategies):
+            strategy_progress = None
+            if progress is not None:
+                progress(index / len(strategies))
+                strategy_progress = lambda fraction, index=index: progress((index + fraction) / len(strategies))
+
+            order = path_order(voltage_pairs, strategy, step, strategy_progress)
+            jumps[strategy] = jump_length(voltage_pairs[order], step)
+
+        return jumps
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't compare the path strategies : {e}")
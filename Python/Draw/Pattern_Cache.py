@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+
+# Directory of the cache, which can be moved with the FIB_PATTERN_CACHE environment variable
+CACHE_ENVIRONMENT_VARIABLE = "FIB_PATTERN_CACHE"
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".fib_pattern_cache")
+
+# Size limit of the cache, the least recently used patterns are removed above it
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Name of the file describing an entry, next to its arrays
+METADATA_FILE = "metadata.json"
+
+# Version of the layout of the entries, part of the keys so that old entries are never read
+CACHE_VERSION = 2
+
+_cache_lock = threading.Lock()
+
+
+def cache_directory():
+    """
+    Returns:
+    - str: The directory of the cache, created if needed.
+    """
+
+    directory = os.environ.get(CACHE_ENVIRONMENT_VARIABLE, DEFAULT_CACHE_DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def image_hash(image_path):
+    """
+    Hashes the bytes of an image file, so that a pattern is found again whatever the name or the location of its file.
+
+    Parameters:
+    - image_path (str): Path to the image file.
+
+    Returns:
+    - str: The SHA-256 digest of the file, in hexadecimal.
+    """
+
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps([CACHE_VERSION, *parts]).encode()).hexdigest()
+
+
+def voltage_map_key(image_path, voltage_range, bits_number, dose, vector_mode=None):
+    """
+    Key of the voltage map of an image, from the content of the image and the parameters of the conversion.
+
+    Parameters:
+    - image_path (str): Path to the image file, or to a vector pattern.
+    - voltage_range (float): The voltage range of the outputs.
+    - bits_number (int): The resolution of the DAC, in bits.
+    - dose (bool): True for a grayscale dose map, False for a binary mask.
+    - vector_mode (str, optional): The mode of a vector pattern, "outline" or "fill", None for an image.
+
+    Returns:
+    - str: The key of the voltage map.
+    """
+
+    return _key("voltage map", image_hash(image_path), float(voltage_range), int(bits_number), bool(dose),
+                vector_mode)
+
+
+def pattern_key(voltage_pairs, dwell, bits_number):
+    """
+    Key of a pattern generated without image file, from its coordinates and its dwell counts.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): The N x 2 voltage coordinates of the pattern.
+    - dwell (numpy.ndarray): The N dwell counts of the coordinates.
+    - bits_number (int): The resolution of the DAC, in bits.
+
+    Returns:
+    - str: The key of the voltage map of the pattern.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(voltage_pairs, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(dwell, dtype=np.int64).tobytes())
+    return _key("pattern", digest.hexdigest(), int(bits_number))
+
+
+def signals_key(map_key, strategy, iterations):
+    """
+    Key of the signals of a voltage map.
+
+    Parameters:
+    - map_key (str): The key of the voltage map, from `voltage_map_key`.
+    - strategy (str): The beam path strategy.
+    - iterations (int): The number of samples per point, scaled by the doses for a dose map.
+
+    Returns:
+    - str: The key of the signals.
+    """
+
+    return _key("signals", map_key, str(strategy), int(iterations))
+
+
+def load(key):
+    """
+    Loads an entry of the cache, its arrays being memory-mapped instead of read, and marks it as recently used.
+    A damaged entry is removed and reported as missing.
+
+    Parameters:
+    - key (str): The key of the entry.
+
+    Returns:
+    - tuple: A dict of read-only memory-mapped arrays and the dict of metadata, or None if the entry is missing.
+    """
+
+    directory = os.path.join(cache_directory(), key)
+    if not os.path.isdir(directory):
+        return None
+
+    try:
+        with open(os.path.join(directory, METADATA_FILE)) as file:
+            metadata = json.load(file)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                  for name in metadata["arrays"]}
+
+        os.utime(directory)  # The modification time of the entries orders their eviction
+        return arrays, metadata["values"]
+
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        return None
+
+
+def store(key, arrays, values=None):
+    """
+    Stores an entry in the cache, then removes the least recently used entries if the cache is too large.
+
+    The entry is written in a temporary directory and renamed, so that an interrupted write never leaves a
+    partial entry behind.
+
+    Parameters:
+    - key (str): The key of the entry.
+    - arrays (dict): The arrays of the entry, saved as .npy files. None values are skipped.
+    - values (dict, optional): Metadata of the entry, which must be JSON serializable.
+    """
+
+    try:
+        root = cache_directory()
+        directory = os.path.join(root, key)
+        if os.path.isdir(directory):
+            return
+
+        arrays = {name: array for name, array in arrays.items() if array is not None}
+        temporary = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(temporary, f"{name}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(temporary, METADATA_FILE), "w") as file:
+                json.dump({"arrays": list(arrays), "values": values or {}}, file)
+            os.replace(temporary, directory)
+
+        except Exception:
+            shutil.rmtree(temporary, ignore_errors=True)
+            if not os.path.isdir(directory):  # Another thread may have stored the same entry meanwhile
+                raise
+
+        evict(CACHE_MAX_BYTES, keep=key)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't store the pattern in the cache : {e}")
+
+
+def _entry_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def evict(max_bytes=CACHE_MAX_BYTES, keep=None):
+    """
+    Removes the least recently used entries until the cache is smaller than 'max_bytes'.
+    Entries which can't be removed, like memory-mapped files on Windows, are skipped.
+
+    Parameters:
+    - max_bytes (int): The size limit of the cache.
+    - keep (str, optional): Key of an entry never removed, like the one just stored.
+
+    Returns:
+    - int: The size of the cache in bytes.
+    """
+
+    with _cache_lock:
+        root = cache_directory()
+        entries = [entry for entry in os.scandir(root) if entry.is_dir() and not entry.name.startswith(".")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        sizes = {entry.name: _entry_size(entry.path) for entry in entries}
+        total = sum(sizes.values())
+
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            try:
+                shutil.rmtree(entry.path)
+                total -= sizes[entry.name]
+            except OSError:
+                pass
+
+        return total
+
+
+def clear():
+    """
+    Removes every entry of the cache.
+    """
+
+    evict(0)
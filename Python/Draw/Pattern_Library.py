@@ -0,0 +1,211 @@
+import numpy as np
+from .Vector_Patterns import outline_codes
+
+
+def _grid(value, sensitivity):
+    return np.rint(np.asarray(value, dtype=np.float64) / sensitivity)
+
+
+def _pattern(codes, sensitivity, dwell):
+    """
+    Builds a pattern from positions on the grid of the DAC.
+
+    Returns:
+    - tuple of numpy.ndarray: The N x 2 voltage coordinates (float64) and the N dwell counts (int64).
+    """
+
+    codes = np.asarray(codes, dtype=np.float64).reshape(-1, 2)
+    dwell = np.broadcast_to(np.asarray(dwell, dtype=np.int64), (len(codes),)).copy()
+    if np.any(dwell < 0):
+        raise ValueError("The dwell counts can't be negative")
+    return codes * sensitivity, dwell
+
+
+def dot(center, sensitivity, dwell=1):
+    """
+    A single point.
+
+    Parameters:
+    - center (tuple of float): The (voltage_x, voltage_y) of the point.
+    - sensitivity (float): The step of the DAC, in volts.
+    - dwell (int): Number of samples of the point.
+
+    Returns:
+    - tuple of numpy.ndarray: The 1 x 2 voltage coordinates and the dwell count.
+    """
+
+    try:
+        return _pattern(_grid(center, sensitivity), sensitivity, dwell)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the dot : {e}")
+
+
+def line(start, end, sensitivity, dwell=1):
+    """
+    A straight line from 'start' to 'end', one DAC step at a time.
+
+    Parameters:
+    - start (tuple of float): The (voltage_x, voltage_y) of the first point.
+    - end (tuple of float): The (voltage_x, voltage_y) of the last point.
+    - sensitivity (float): The step of the DAC, in volts.
+    - dwell (int or numpy.ndarray): Number of samples of every point.
+
+    Returns:
+    - tuple of numpy.ndarray: The N x 2 voltage coordinates, from 'start' to 'end', and their dwell counts.
+    """
+
+    try:
+        vertices = np.array([_grid(start, sensitivity), _grid(end, sensitivity)])
+        return _pattern(outline_codes([vertices], [False]), sensitivity, dwell)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the line : {e}")
+
+
+def rectangle(center, width, height, sensitivity, filled=True, dwell=1):
+    """
+    A rectangle aligned with the axes, filled row by row from the top or outlined clockwise from its top left
+    corner.
+
+    Parameters:
+    - center (tuple of float): The (voltage_x, voltage_y) of the center of the rectangle.
+    - width (float): The width of the rectangle, in volts.
+    - height (float): The height of the rectangle, in volts.
+    - sensitivity (float): The step of the DAC, in volts.
+    - filled (bool): True for the inside of the rectangle, False for its outline.
+    - dwell (int or numpy.ndarray): Number of samples of every point.
+
+    Returns:
+    - tuple of numpy.ndarray: The N x 2 voltage coordinates and their dwell counts.
+    """
+
+    try:
+        center = _grid(center, sensitivity)
+        columns = max(1, int(round(width / sensitivity)))
+        rows = max(1, int(round(height / sensitivity)))
+        left = center[0] - (columns - 1) // 2
+        top = center[1] + rows // 2
+
+        if filled:
+            codes = np.empty((rows, columns, 2))
+            codes[:, :, 0] = left + np.arange(columns)
+            codes[:, :, 1] = (top - np.arange(rows))[:, None]
+        else:
+            right, bottom = left + columns - 1, top - rows + 1
+            vertices = np.array([[left, top], [right, top], [right, bottom], [left, bottom]])
+            codes = outline_codes([vertices], [True])
+
+        return _pattern(codes, sensitivity, dwell)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the rectangle : {e}")
+
+
+def circle(center, radius, sensitivity, filled=True, dwell=1):
+    """
+    A disk filled row by row from the top, or a circle outlined from its rightmost point.
+
+    Parameters:
+    - center (tuple of float): The (voltage_x, voltage_y) of the center.
+    - radius (float): The radius, in volts.
+    - sensitivity (float): The step of the DAC, in volts.
+    - filled (bool): True for the disk, False for the circle.
+    - dwell (int or numpy.ndarray): Number of samples of every point.
+
+    Returns:
+    - tuple of numpy.ndarray: The N x 2 voltage coordinates and their dwell counts.
+    """
+
+    try:
+        center = _grid(center, sensitivity)
+        radius = radius / sensitivity
+
+        if filled:
+            # Half width of every row, the points within the radius
+            offsets = np.arange(np.floor(radius), -np.floor(radius) - 1, -1)
+            half_widths = np.floor(np.sqrt(np.maximum(0, radius ** 2 - offsets ** 2)) + 1e-9).astype(np.int64)
+            lengths = 2 * half_widths + 1
+            row = np.repeat(np.arange(len(offsets)), lengths)
+            column = np.arange(len(row)) - np.repeat(np.cumsum(lengths) - lengths, lengths) - half_widths[row]
+            codes = np.column_stack([center[0] + column, center[1] + offsets[row]])
+        else:
+            angles = np.linspace(0, 2 * np.pi, max(4, int(np.ceil(2 * np.pi * radius))), endpoint=False)
+            vertices = center + radius * np.column_stack([np.cos(angles), np.sin(angles)])
+            codes = outline_codes([vertices], [True])
+
+        return _pattern(codes, sensitivity, dwell)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't generate the circle : {e}")
+
+
+def step_and_repeat(pattern, columns, rows, pitch_x, pitch_y=None, sensitivity=None, serpentine=True):
+    """
+    Repeats a feature on a grid of 'columns' x 'rows' copies, centered on the feature.
+
+    The copies are generated at once by broadcasting the feature over the offsets of the grid, so the time depends
+    on the number of points written and not on the size of the field. The copies are ordered row by row from the
+    top, one row out of two from right to left when 'serpentine' is True, so that the beam moves to the closest copy.
+
+    Parameters:
+    - pattern (tuple of numpy.ndarray): The voltage coordinates and the dwell counts of the feature.
+    - columns (int): Number of copies along voltage_x.
+    - rows (int): Number of copies along voltage_y.
+    - pitch_x (float): Distance between two columns, in volts.
+    - pitch_y (float, optional): Distance between two rows, in volts, 'pitch_x' by default.
+    - sensitivity (float, optional): The step of the DAC, the offsets being rounded to a whole number of steps.
+    - serpentine (bool): Alternate the direction of the rows.
+
+    Returns:
+    - tuple of numpy.ndarray: The voltage coordinates and the dwell counts of the array.
+    """
+
+    try:
+        voltage_pairs, dwell = pattern
+        pitch_y = pitch_x if pitch_y is None else pitch_y
+
+        offset_x = (np.arange(columns) - (columns - 1) / 2) * pitch_x
+        offset_y = ((rows - 1) / 2 - np.arange(rows)) * pitch_y
+        if sensitivity is not None:
+            offset_x = np.rint(offset_x / sensitivity) * sensitivity
+            offset_y = np.rint(offset_y / sensitivity) * sensitivity
+
+        offsets = np.empty((rows, columns, 2))
+        offsets[:, :, 0] = offset_x
+        offsets[:, :, 1] = offset_y[:, None]
+        if serpentine:
+            offsets[1::2] = offsets[1::2, ::-1]
+
+        array = (offsets.reshape(-1, 1, 2) + np.asarray(voltage_pairs)[None, :, :]).reshape(-1, 2)
+        return array, np.tile(np.asarray(dwell, dtype=np.int64), rows * columns)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't repeat the pattern : {e}")
+
+
+def translate(pattern, offset):
+    """
+    Moves a pattern by an offset (voltage_x, voltage_y), in volts.
+
+    Returns:
+    - tuple of numpy.ndarray: The voltage coordinates and the dwell counts of the moved pattern.
+    """
+
+    voltage_pairs, dwell = pattern
+    return np.asarray(voltage_pairs) + np.asarray(offset, dtype=np.float64), dwell
+
+
+def combine(*patterns):
+    """
+    Concatenates patterns, written one after the other in the given order.
+
+    Returns:
+    - tuple of numpy.ndarray: The voltage coordinates and the dwell counts of all the patterns.
+    """
+
+    if not patterns:
+        return np.empty((0, 2), dtype=np.float64), np.empty(0, dtype=np.int64)
+    return (np.concatenate([np.asarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+                            for voltage_pairs, _ in patterns]),
+            np.concatenate([np.asarray(dwell, dtype=np.int64) for _, dwell in patterns]))
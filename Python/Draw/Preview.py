@@ -0,0 +1,117 @@
+from PyQt6.QtGui import QImage
+import numpy as np
+
+# Gray level of the background of the previews
+BACKGROUND_LEVEL = 0
+
+
+def preview_size(voltage_pairs, max_width, max_height, step=None):
+    """
+    Size of a preview of voltage coordinates fitting in a widget, keeping the aspect ratio of the pattern.
+    A pattern smaller than the widget is previewed at its own resolution, so it has no holes between its pixels.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - max_width (int): Width of the widget in pixels.
+    - max_height (int): Height of the widget in pixels.
+    - step (float, optional): The voltage between two neighbouring pixels of the pattern.
+
+    Returns:
+    - tuple of int: The width and the height of the preview.
+    """
+
+    span_x = np.ptp(voltage_pairs[:, 0]) if len(voltage_pairs) else 0
+    span_y = np.ptp(voltage_pairs[:, 1]) if len(voltage_pairs) else 0
+    if span_x <= 0 or span_y <= 0:
+        return max_width, max_height
+
+    scale = min(max_width / span_x, max_height / span_y)
+    if step is not None:
+        scale = min(scale, 1 / step)
+    return max(1, int(round(span_x * scale)) + 1), max(1, int(round(span_y * scale)) + 1)
+
+
+def rasterize_pairs(voltage_pairs, width, height, weights=None):
+    """
+    Rasterizes voltage coordinates straight into a grayscale image, instead of drawing every point.
+
+    The coordinates are binned into the pixels of the image with np.bincount. Without weights, the gray level of
+    a pixel is the number of points it contains relative to the densest pixel, with weights (the doses of a dose
+    map) it is their mean.
+
+    Parameters:
+    - voltage_pairs (numpy.ndarray): An N x 2 array of (voltage_x, voltage_y) coordinates.
+    - width (int): Width of the image.
+    - height (int): Height of the image.
+    - weights (numpy.ndarray, optional): A weight between 0 and 1 for every coordinate.
+
+    Returns:
+    - numpy.ndarray: The C-contiguous uint8 image of shape (height, width), the highest voltage_y at the top.
+    """
+
+    try:
+        image = np.full((height, width), BACKGROUND_LEVEL, dtype=np.uint8)
+        if len(voltage_pairs) == 0:
+            return image
+
+        x = voltage_pairs[:, 0]
+        y = voltage_pairs[:, 1]
+        span_x = max(np.ptp(x), np.finfo(np.float64).tiny)
+        span_y = max(np.ptp(y), np.finfo(np.float64).tiny)
+
+        columns = np.rint((x - x.min()) / span_x * (width - 1)).astype(np.intp)
+        rows = np.rint((y.max() - y) / span_y * (height - 1)).astype(np.intp)
+        pixels = rows * width + columns
+
+        counts = np.bincount(pixels, minlength=width * height)
+        if weights is None:
+            levels = counts * (255 / counts.max())
+        else:
+            levels = np.bincount(pixels, weights=weights, minlength=width * height) * 255 / np.maximum(counts, 1)
+
+        covered = counts > 0
+        image.reshape(-1)[covered] = np.clip(np.rint(levels[covered]), 1, 255).astype(np.uint8)
+
+        return image
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't rasterize the voltage map : {e}")
+
+
+def dose_image(dose):
+    """
+    Converts a dose map into a grayscale image, the highest dose being white.
+
+    Parameters:
+    - dose (numpy.ndarray): The dose of every pixel, the first row at the top.
+
+    Returns:
+    - numpy.ndarray: The C-contiguous uint8 image of the same shape.
+    """
+
+    try:
+        image = np.full(dose.shape, BACKGROUND_LEVEL, dtype=np.uint8)
+        peak = dose.max() if dose.size else 0
+        if peak > 0:
+            covered = dose > 0
+            image[covered] = np.clip(np.rint(dose[covered] * (255 / peak)), 1, 255).astype(np.uint8)
+
+        return image
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't render the dose map : {e}")
+
+
+def to_qimage(image):
+    """
+    Wraps a grayscale uint8 image into a QImage, without encoding it.
+
+    Parameters:
+    - image (numpy.ndarray): A C-contiguous uint8 image of shape (height, width).
+
+    Returns:
+    - QImage: A QImage owning a copy of the pixels, so the array can be released.
+    """
+
+    height, width = image.shape
+    return QImage(image.data, width, height, image.strides[0], QImage.Format.Format_Grayscale8).copy()
@@ -0,0 +1,737 @@
+import math
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+
+# Extensions of the vector patterns, the other files are read as images
+SVG_EXTENSIONS = (".svg",)
+POLYGON_EXTENSIONS = (".txt", ".poly")
+
+# Modes of the conversion: the beam follows the lines of the shapes, or scans their inside
+OUTLINE = "outline"
+FILL = "fill"
+VECTOR_MODES = (OUTLINE, FILL)
+
+# Fill rules of the shapes, as defined by SVG
+NONZERO = "nonzero"
+EVENODD = "evenodd"
+
+# SVG elements whose content is never drawn directly
+SVG_SKIPPED_ELEMENTS = {"defs", "clipPath", "mask", "symbol", "marker", "pattern", "linearGradient",
+                        "radialGradient", "style", "script", "title", "desc", "metadata", "text"}
+
+# Distance between a cubic Bezier curve and its control points on a quarter of ellipse
+QUARTER_ELLIPSE = 4 / 3 * (math.sqrt(2) - 1)
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+
+
+def is_vector_file(file_path):
+    """
+    Parameters:
+    - file_path (str): Path to a pattern file.
+
+    Returns:
+    - bool: True if the file is a vector pattern (SVG or polygon list), False for an image.
+    """
+
+    return os.path.splitext(file_path)[1].lower() in SVG_EXTENSIONS + POLYGON_EXTENSIONS
+
+
+def _numbers(text):
+    return [float(number) for number in _NUMBER.findall(text or "")]
+
+
+def _length(text, default=0.0):
+    """
+    Reads an SVG length, the units being ignored: the coordinates of the drawing are its user units.
+    """
+
+    numbers = _numbers(text)
+    return numbers[0] if numbers else default
+
+
+class _PathData:
+    """
+    Reader of the 'd' attribute of an SVG path. The flags of the arcs are read separately from the numbers,
+    since SVG allows writing them without separators ("a1 1 0 00.5.5").
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def _skip(self):
+        while self.position < len(self.text) and self.text[self.position] in " \t\r\n,":
+            self.position += 1
+
+    def command(self):
+        self._skip()
+        if self.position < len(self.text) and self.text[self.position].isalpha():
+            self.position += 1
+            return self.text[self.position - 1]
+        return None
+
+    def has_number(self):
+        self._skip()
+        return _NUMBER.match(self.text, self.position) is not None
+
+    def at_end(self):
+        self._skip()
+        return self.position >= len(self.text)
+
+    def number(self):
+        self._skip()
+        match = _NUMBER.match(self.text, self.position)
+        if match is None:
+            raise ValueError(f"Number expected in the path data at position {self.position}")
+        self.position = match.end()
+        return float(match.group())
+
+    def point(self):
+        return np.array([self.number(), self.number()])
+
+    def flag(self):
+        self._skip()
+        if self.position >= len(self.text) or self.text[self.position] not in "01":
+            raise ValueError(f"Arc flag expected in the path data at position {self.position}")
+        self.position += 1
+        return self.text[self.position - 1] == "1"
+
+
+class _Subpath:
+    """
+    A continuous line of a shape: polylines ("L" pieces, the vertices from the start point) and cubic Bezier
+    curves ("C" pieces, the 4 control points).
+    """
+
+    def __init__(self, start):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.current = self.start
+        self.pieces = []
+        self.closed = False
+
+    def line_to(self, point):
+        point = np.asarray(point, dtype=np.float64)
+        if self.pieces and self.pieces[-1][0] == "L":
+            self.pieces[-1][1].append(point)
+        else:
+            self.pieces.append(("L", [self.current, point]))
+        self.current = point
+
+    def cubic_to(self, control_1, control_2, point):
+        point = np.asarray(point, dtype=np.float64)
+        self.pieces.append(("C", [self.current, np.asarray(control_1), np.asarray(control_2), point]))
+        self.current = point
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, point):
+        for control_1, control_2, end in _arc_to_cubics(self.current, rx, ry, rotation, large_arc, sweep, point):
+            self.cubic_to(control_1, control_2, end)
+
+    def close(self):
+        self.closed = True
+        self.current = self.start
+
+    def transformed(self, matrix):
+        """
+        Returns:
+        - list of tuple: The pieces of the subpath, their points transformed by a 3 x 3 affine matrix.
+        """
+
+        return [(kind, np.asarray(points) @ matrix[:2, :2].T + matrix[:2, 2]) for kind, points in self.pieces]
+
+
+def _arc_to_cubics(start, rx, ry, rotation, large_arc, sweep, end):
+    """
+    Converts an elliptical arc of an SVG path, given by its end points, into cubic Bezier curves of at most a
+    quarter of ellipse each (SVG specification, appendix F.6).
+
+    Returns:
+    - list of tuple: The two control points and the end point of every curve.
+    """
+
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    if np.allclose(start, end):
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return [(start, end, end)]  # A straight line
+
+    cos, sin = math.cos(math.radians(rotation)), math.sin(math.radians(rotation))
+    half_x, half_y = (start - end) / 2
+    x1 = cos * half_x + sin * half_y
+    y1 = -sin * half_x + cos * half_y
+
+    # Radii too small to join the end points are scaled up
+    ratio = (x1 / rx) ** 2 + (y1 / ry) ** 2
+    if ratio > 1:
+        rx, ry = rx * math.sqrt(ratio), ry * math.sqrt(ratio)
+
+    numerator = (rx * ry) ** 2 - (rx * y1) ** 2 - (ry * x1) ** 2
+    denominator = (rx * y1) ** 2 + (ry * x1) ** 2
+    coefficient = math.sqrt(max(0.0, numerator / denominator))
+    if large_arc == sweep:
+        coefficient = -coefficient
+    center_x1 = coefficient * rx * y1 / ry
+    center_y1 = -coefficient * ry * x1 / rx
+    center = np.array([cos * center_x1 - sin * center_y1, sin * center_x1 + cos * center_y1]) + (start + end) / 2
+
+    theta = math.atan2((y1 - center_y1) / ry, (x1 - center_x1) / rx)
+    delta = math.atan2((-y1 - center_y1) / ry, (-x1 - center_x1) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    def on_ellipse(x, y):
+        return center + np.array([cos * rx * x - sin * ry * y, sin * rx * x + cos * ry * y])
+
+    segments = max(1, math.ceil(abs(delta) / (math.pi / 2) - 1e-9))
+    step = delta / segments
+    handle = 4 / 3 * math.tan(step / 4)
+    curves = []
+    for index in range(segments):
+        angle_1 = theta + index * step
+        angle_2 = angle_1 + step
+        control_1 = on_ellipse(math.cos(angle_1) - handle * math.sin(angle_1),
+                               math.sin(angle_1) + handle * math.cos(angle_1))
+        control_2 = on_ellipse(math.cos(angle_2) + handle * math.sin(angle_2),
+                               math.sin(angle_2) - handle * math.cos(angle_2))
+        curves.append((control_1, control_2, on_ellipse(math.cos(angle_2), math.sin(angle_2))))
+
+    curves[-1] = (curves[-1][0], curves[-1][1], end)  # No rounding error on the end point
+    return curves
+
+
+def parse_path_data(text):
+    """
+    Reads the 'd' attribute of an SVG path: move, line, horizontal and vertical lines, cubic and quadratic
+    Bezier curves with their smooth variants, elliptical arcs and close commands, absolute or relative.
+
+    Parameters:
+    - text (str): The path data.
+
+    Returns:
+    - list of _Subpath: The subpaths of the path, in user units.
+    """
+
+    data = _PathData(text)
+    subpaths = []
+    subpath = None
+    current = np.zeros(2)
+    command = None
+    last_control = None  # Second control point of the last curve, for the smooth curves
+    last_kind = None
+
+    while not data.at_end():
+        new_command = data.command()
+        if new_command is not None:
+            command = new_command
+        elif command is None or not data.has_number():
+            raise ValueError(f"Command expected in the path data at position {data.position}")
+        elif command in "Mm":
+            command = "L" if command == "M" else "l"  # Coordinates following a move are lines
+
+        relative = command.islower()
+        offset = current if relative else np.zeros(2)
+        kind = command.upper()
+
+        if kind == "Z":
+            if subpath is not None:
+                subpath.close()
+                current = subpath.start
+                subpaths.append(subpath)
+                subpath = None
+            last_kind = kind
+            continue
+
+        if kind == "M":
+            if subpath is not None:
+                subpaths.append(subpath)
+            current = data.point() + offset
+            subpath = None
+            last_kind = kind
+            continue
+
+        if subpath is None:
+            subpath = _Subpath(current)  # From the last move, or from the start of the last closed subpath
+
+        if kind == "L":
+            current = data.point() + offset
+            subpath.line_to(current)
+        elif kind == "H":
+            current = np.array([data.number() + offset[0], current[1]])
+            subpath.line_to(current)
+        elif kind == "V":
+            current = np.array([current[0], data.number() + offset[1]])
+            subpath.line_to(current)
+        elif kind in "CS":
+            if kind == "C":
+                control_1 = data.point() + offset
+            else:
+                control_1 = 2 * current - last_control if last_kind in ("C", "S") else current
+            control_2 = data.point() + offset
+            end = data.point() + offset
+            subpath.cubic_to(control_1, control_2, end)
+            last_control, current = control_2, end
+        elif kind in "QT":
+            if kind == "Q":
+                control = data.point() + offset
+            else:
+                control = 2 * current - last_control if last_kind in ("Q", "T") else current
+            end = data.point() + offset
+            subpath.cubic_to(current + 2 / 3 * (control - current), end + 2 / 3 * (control - end), end)
+            last_control, current = control, end
+        elif kind == "A":
+            rx, ry, rotation = data.number(), data.number(), data.number()
+            large_arc, sweep = data.flag(), data.flag()
+            end = data.point() + offset
+            subpath.arc_to(rx, ry, rotation, large_arc, sweep, end)
+            current = end
+        else:
+            raise ValueError(f"Unknown path command '{command}'")
+
+        last_kind = kind
+
+    if subpath is not None:
+        subpaths.append(subpath)
+
+    return subpaths
+
+
+def parse_transform(text):
+    """
+    Reads the 'transform' attribute of an SVG element.
+
+    Parameters:
+    - text (str): The transform list, like "translate(10 20) rotate(45)".
+
+    Returns:
+    - numpy.ndarray: The 3 x 3 affine matrix of the transform.
+    """
+
+    matrix = np.eye(3)
+    for name, arguments in _TRANSFORM.findall(text or ""):
+        values = _numbers(arguments)
+        step = np.eye(3)
+        if name == "matrix":
+            step[:2, :] = np.array(values[:6]).reshape(3, 2).T
+        elif name == "translate":
+            step[:2, 2] = [values[0], values[1] if len(values) > 1 else 0.0]
+        elif name == "scale":
+            step[0, 0] = values[0]
+            step[1, 1] = values[1] if len(values) > 1 else values[0]
+        elif name == "rotate":
+            angle = math.radians(values[0])
+            step[:2, :2] = [[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]]
+            if len(values) == 3:  # Rotation around a point
+                center = np.eye(3)
+                center[:2, 2] = values[1:3]
+                back = np.eye(3)
+                back[:2, 2] = [-values[1], -values[2]]
+                step = center @ step @ back
+        elif name == "skewX":
+            step[0, 1] = math.tan(math.radians(values[0]))
+        elif name == "skewY":
+            step[1, 0] = math.tan(math.radians(values[0]))
+        matrix = matrix @ step
+
+    return matrix
+
+
+def _style(element, name, inherited=None):
+    """
+    Reads a presentation attribute of an SVG element, from its style or its attributes.
+    """
+
+    for declaration in (element.get("style") or "").split(";"):
+        key, _, value = declaration.partition(":")
+        if key.strip() == name:
+            return value.strip()
+    return element.get(name, inherited)
+
+
+def _ellipse(center_x, center_y, rx, ry):
+    subpath = _Subpath((center_x + rx, center_y))
+    for quarter in range(4):
+        angle_1, angle_2 = quarter * math.pi / 2, (quarter + 1) * math.pi / 2
+        cos_1, sin_1, cos_2, sin_2 = math.cos(angle_1), math.sin(angle_1), math.cos(angle_2), math.sin(angle_2)
+        subpath.cubic_to((center_x + rx * (cos_1 - QUARTER_ELLIPSE * sin_1),
+                          center_y + ry * (sin_1 + QUARTER_ELLIPSE * cos_1)),
+                         (center_x + rx * (cos_2 + QUARTER_ELLIPSE * sin_2),
+                          center_y + ry * (sin_2 - QUARTER_ELLIPSE * cos_2)),
+                         (center_x + rx * cos_2, center_y + ry * sin_2))
+    subpath.close()
+    return [subpath]
+
+
+def _rectangle(x, y, width, height, rx, ry):
+    if rx == 0 or ry == 0:
+        subpath = _Subpath((x, y))
+        for corner in ((x + width, y), (x + width, y + height), (x, y + height), (x, y)):
+            subpath.line_to(corner)
+    else:
+        rx, ry = min(rx, width / 2), min(ry, height / 2)
+        subpath = _Subpath((x + rx, y))
+        subpath.line_to((x + width - rx, y))
+        subpath.arc_to(rx, ry, 0, False, True, (x + width, y + ry))
+        subpath.line_to((x + width, y + height - ry))
+        subpath.arc_to(rx, ry, 0, False, True, (x + width - rx, y + height))
+        subpath.line_to((x + rx, y + height))
+        subpath.arc_to(rx, ry, 0, False, True, (x, y + height - ry))
+        subpath.line_to((x, y + ry))
+        subpath.arc_to(rx, ry, 0, False, True, (x + rx, y))
+    subpath.close()
+    return [subpath]
+
+
+def _points_subpath(text, closed):
+    values = _numbers(text)
+    points = np.array(values[:len(values) // 2 * 2]).reshape(-1, 2)
+    if len(points) == 0:
+        return []
+    subpath = _Subpath(points[0])
+    for point in points[1:]:
+        subpath.line_to(point)
+    if closed:
+        subpath.close()
+    return [subpath]
+
+
+def _element_subpaths(element, tag):
+    """
+    Returns:
+    - list of _Subpath: The geometry of a drawn SVG element, in its user units.
+    """
+
+    get = element.get
+    if tag == "path":
+        return parse_path_data(get("d", ""))
+    if tag in ("polygon", "polyline"):
+        return _points_subpath(get("points"), tag == "polygon")
+    if tag == "line":
+        subpath = _Subpath((_length(get("x1")), _length(get("y1"))))
+        subpath.line_to((_length(get("x2")), _length(get("y2"))))
+        return [subpath]
+    if tag == "rect":
+        rx, ry = get("rx"), get("ry")
+        rx = _length(rx if rx is not None else ry)
+        ry = _length(ry if ry is not None else get("rx"))
+        return _rectangle(_length(get("x")), _length(get("y")), _length(get("width")), _length(get("height")),
+                          rx, ry)
+    if tag == "circle":
+        radius = _length(get("r"))
+        return _ellipse(_length(get("cx")), _length(get("cy")), radius, radius)
+    if tag == "ellipse":
+        return _ellipse(_length(get("cx")), _length(get("cy")), _length(get("rx")), _length(get("ry")))
+    return []
+
+
+def read_svg(file_path):
+    """
+    Reads the shapes of an SVG file: paths, polygons, polylines, lines, rectangles, circles and ellipses, with
+    the transforms of their groups. Texts, references and the content of the definitions are ignored.
+
+    Parameters:
+    - file_path (str): Path to the SVG file.
+
+    Returns:
+    - tuple: The shapes, a list of (pieces of every subpath, closed flags, fill rule) in user units with y pointing
+      down, and the canvas (x, y, width, height) from the viewBox or the size of the drawing, None if it has none.
+    """
+
+    root = ElementTree.parse(file_path).getroot()
+    shapes = []
+
+    def walk(element, matrix, fill_rule):
+        tag = element.tag.split("}")[-1]
+        if tag in SVG_SKIPPED_ELEMENTS or _style(element, "display") == "none":
+            return
+
+        matrix = matrix @ parse_transform(element.get("transform"))
+        fill_rule = _style(element, "fill-rule", fill_rule)
+
+        subpaths = [subpath for subpath in _element_subpaths(element, tag) if subpath.pieces]
+        if subpaths:
+            shapes.append(([subpath.transformed(matrix) for subpath in subpaths],
+                           [subpath.closed for subpath in subpaths], fill_rule))
+
+        for child in element:
+            walk(child, matrix, fill_rule)
+
+    walk(root, np.eye(3), NONZERO)
+
+    canvas = None
+    view_box = _numbers(root.get("viewBox"))
+    if len(view_box) == 4:
+        canvas = tuple(view_box)
+    elif root.get("width") is not None and root.get("height") is not None:
+        canvas = (0.0, 0.0, _length(root.get("width")), _length(root.get("height")))
+
+    return shapes, canvas
+
+
+def read_polygons(file_path):
+    """
+    Reads a text file of polygons and polylines, in drawing units with y pointing down like the pixels of an image.
+
+    Every line "polygon x1 y1 x2 y2 ..." or "polyline x1 y1 x2 y2 ..." is a shape, the numbers being separated by
+    spaces or commas, and a line of coordinates without keyword is a polygon. Shapes can also be written one vertex
+    "x y" per line, in blocks separated by empty lines, optionally preceded by a "polygon" or "polyline" line.
+    Lines starting with '#' are comments.
+
+    Parameters:
+    - file_path (str): Path to the text file.
+
+    Returns:
+    - tuple: The shapes, in the format of `read_svg`, and no canvas (None).
+    """
+
+    shapes = []
+    block, block_closed = [], True
+
+    def add(points, closed):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points):
+            # The closing vertex of a polygon is implied
+            if closed and len(points) > 1 and np.array_equal(points[0], points[-1]):
+                points = points[:-1]
+            shapes.append(([[("L", points)]], [closed], EVENODD))
+
+    with open(file_path) as file:
+        for line in file:
+            line = line.split("#")[0].strip()
+            words = line.replace(",", " ").split()
+            keyword = words[0].lower() if words and words[0][0].isalpha() else None
+            if keyword is not None and keyword not in ("polygon", "polyline"):
+                raise ValueError(f"Unknown shape '{words[0]}', shapes are 'polygon' or 'polyline'")
+            values = [float(word) for word in words[1 if keyword else 0:]]
+            if len(values) % 2:
+                raise ValueError(f"Odd number of coordinates in the line '{line}'")
+
+            # A vertex per line belongs to the current block, anything else ends it
+            if keyword is None and len(values) == 2:
+                block.append(values)
+                continue
+            add(block, block_closed)
+            block, block_closed = [], True
+
+            if keyword is not None and not values:
+                block_closed = keyword == "polygon"
+            elif values:
+                add(values, keyword != "polyline")
+
+    add(block, block_closed)
+    return shapes, None
+
+
+def read_vector_file(file_path):
+    """
+    Reads the shapes of a vector pattern, an SVG file or a text file of polygons.
+
+    Returns:
+    - tuple: The shapes and the canvas, see `read_svg`.
+    """
+
+    if os.path.splitext(file_path)[1].lower() in SVG_EXTENSIONS:
+        return read_svg(file_path)
+    return read_polygons(file_path)
+
+
+def flatten_pieces(pieces):
+    """
+    Converts the pieces of a subpath into a polyline whose vertices are at most one DAC step apart on its curves.
+
+    Parameters:
+    - pieces (list of tuple): The polylines and cubic Bezier curves of the subpath, in DAC steps.
+
+    Returns:
+    - numpy.ndarray: The K x 2 vertices of the polyline, in DAC steps.
+    """
+
+    vertices = []
+    for kind, points in pieces:
+        if kind == "C":
+            # One vertex per DAC step along the control polygon, which is longer than the curve
+            samples = max(1, math.ceil(np.abs(np.diff(points, axis=0)).max(axis=1).sum()))
+            t = np.linspace(0, 1, samples + 1)[:, None]
+            points = ((1 - t) ** 3 * points[0] + 3 * (1 - t) ** 2 * t * points[1]
+                      + 3 * (1 - t) * t ** 2 * points[2] + t ** 3 * points[3])
+        vertices.append(points if not vertices else points[1:])
+
+    return np.concatenate(vertices)
+
+
+def outline_codes(polylines, closed):
+    """
+    Walks along the polylines one DAC step at a time, so that the beam moves by at most one step in each direction
+    between two points.
+
+    Parameters:
+    - polylines (list of numpy.ndarray): The K x 2 vertices of every polyline, in DAC steps.
+    - closed (list of bool): For every polyline, True if it returns to its first vertex.
+
+    Returns:
+    - numpy.ndarray: The N x 2 integer positions on the grid of the DAC, polyline by polyline in the order of the
+      drawing, without repeated consecutive positions.
+    """
+
+    starts, ends = [], []
+    for vertices, is_closed in zip(polylines, closed):
+        if is_closed:
+            starts.append(vertices)
+            ends.append(np.roll(vertices, -1, axis=0))
+        else:
+            # The last vertex of an open polyline is reached by a segment of length zero
+            starts.append(vertices)
+            ends.append(np.concatenate([vertices[1:], vertices[-1:]]))
+    if not starts:
+        return np.empty((0, 2), dtype=np.int64)
+
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    steps = np.maximum(1, np.ceil(np.abs(ends - starts).max(axis=1) - 1e-9)).astype(np.int64)
+
+    # The positions of a segment exclude its end, which is the start of the next one
+    segment = np.repeat(np.arange(len(steps)), steps)
+    index = np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)
+    fraction = (index / steps[segment])[:, None]
+    codes = np.rint(starts[segment] + fraction * (ends[segment] - starts[segment])).astype(np.int64)
+
+    moved = np.ones(len(codes), dtype=bool)
+    moved[1:] = np.any(codes[1:] != codes[:-1], axis=1)
+    return codes[moved]
+
+
+def fill_codes(polylines, shapes, even_odd):
+    """
+    Fills the inside of the shapes with the positions of the grid of the DAC, by scanning rows of the grid.
+
+    Every polyline is closed for the fill, like in SVG. The rows crossing the edges are computed for all the
+    edges at once, so that large layouts are filled without a loop over their shapes.
+
+    Parameters:
+    - polylines (list of numpy.ndarray): The K x 2 vertices of every polyline, in DAC steps with y pointing up.
+    - shapes (list of int): For every polyline, the index of its shape. The shapes are filled separately and merged.
+    - even_odd (numpy.ndarray): For every shape, True for the even-odd fill rule, False for the nonzero rule.
+
+    Returns:
+    - numpy.ndarray: The N x 2 integer positions inside the shapes, row by row from the top and left to right.
+    """
+
+    if not polylines:
+        return np.empty((0, 2), dtype=np.int64)
+
+    starts = np.concatenate(polylines)
+    ends = np.concatenate([np.roll(vertices, -1, axis=0) for vertices in polylines])
+    shape = np.repeat(np.asarray(shapes, dtype=np.int64), [len(vertices) for vertices in polylines])
+
+    # Rows crossed by every edge, the lowest end included and the highest one excluded
+    low, high = np.minimum(starts[:, 1], ends[:, 1]), np.maximum(starts[:, 1], ends[:, 1])
+    first_row = np.ceil(low).astype(np.int64)
+    rows_crossed = np.maximum(0, np.ceil(high).astype(np.int64) - first_row)
+    edge = np.repeat(np.arange(len(starts)), rows_crossed)
+    row = first_row[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(rows_crossed) - rows_crossed, rows_crossed)
+
+    start, end = starts[edge], ends[edge]
+    x = start[:, 0] + (row - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+    winding = np.where(np.asarray(even_odd, dtype=bool)[shape[edge]], 1, np.sign(end[:, 1] - start[:, 1]))
+    winding = winding.astype(np.int64)
+
+    # Crossings of every row of every shape from left to right, and the winding number after each of them
+    order = np.lexsort((x, row, shape[edge]))
+    x, row, winding, crossing_shape = x[order], row[order], winding[order], shape[edge][order]
+    total = np.cumsum(winding)
+    group_start = np.ones(len(row), dtype=bool)
+    group_start[1:] = (row[1:] != row[:-1]) | (crossing_shape[1:] != crossing_shape[:-1])
+    group_first = np.maximum.accumulate(np.where(group_start, np.arange(len(row)), 0))
+    number = total - (total - winding)[group_first]
+    inside = np.where(np.asarray(even_odd, dtype=bool)[crossing_shape], number % 2 == 1, number != 0)
+
+    # Spans between a crossing entering the shape and the next crossing of the same row
+    span = np.flatnonzero(inside[:-1] & ~group_start[1:])
+    first_column = np.ceil(x[span]).astype(np.int64)
+    lengths = np.maximum(0, np.ceil(x[span + 1]).astype(np.int64) - first_column)
+    span_index = np.repeat(np.arange(len(span)), lengths)
+    columns = first_column[span_index] + np.arange(len(span_index)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = row[span][span_index]
+    if len(columns) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Overlapping shapes are merged, the positions being sorted like the pixels of an image
+    width = int(columns.max() - columns.min()) + 1
+    keys = np.unique((rows.max() - rows) * width + (columns - columns.min()))
+    codes = np.empty((len(keys), 2), dtype=np.int64)
+    codes[:, 0] = keys % width + columns.min()
+    codes[:, 1] = rows.max() - keys // width
+
+    return codes
+
+
+def vector_to_voltage_pairs(file_path, voltage_range, sensitivity, mode=OUTLINE, scale=1.0):
+    """
+    Compiles a vector pattern into voltage coordinates on the grid of the DAC.
+
+    One drawing unit is one DAC step, like one pixel of an image, and the canvas of the drawing (its viewBox, or the
+    bounding box of its shapes) is centered within the voltage range. The lines and the curves are followed one DAC
+    step at a time in the outline mode, the inside of the shapes is scanned row by row in the fill mode.
+
+    Parameters:
+    - file_path (str): Path to the SVG file or to the text file of polygons.
+    - voltage_range (float): The maximum range of voltage values for the output coordinates.
+    - sensitivity (float): The smallest change in voltage represented in the output, the step of the DAC.
+    - mode (str): OUTLINE or FILL.
+    - scale (float): Number of DAC steps per drawing unit.
+
+    Returns:
+    - numpy.ndarray: An N x 2 array of (voltage_x, voltage_y) coordinates, in the order of the drawing for an outline
+      and row by row from the top for a fill.
+    """
+
+    try:
+        if mode not in VECTOR_MODES:
+            raise ValueError(f"Unknown vector mode '{mode}', available modes are {', '.join(VECTOR_MODES)}")
+
+        shapes, canvas = read_vector_file(file_path)
+        if not shapes:
+            return np.empty((0, 2), dtype=np.float64)
+
+        if canvas is None:
+            points = np.concatenate([np.concatenate([points for _, points in pieces])
+                                     for subpaths, _, _ in shapes for pieces in subpaths])
+            (left, top), (right, bottom) = points.min(axis=0), points.max(axis=0)
+            canvas = (left, top, right - left, bottom - top)
+
+        # From drawing units with y pointing down to DAC steps around the center of the canvas with y pointing up
+        to_steps = np.array([[scale, 0, -scale * (canvas[0] + canvas[2] / 2)],
+                             [0, -scale, scale * (canvas[1] + canvas[3] / 2)],
+                             [0, 0, 1]])
+
+        polylines, closed, shape_indices, even_odd = [], [], [], []
+        for index, (subpaths, closed_flags, fill_rule) in enumerate(shapes):
+            for pieces, is_closed in zip(subpaths, closed_flags):
+                pieces = [(kind, points @ to_steps[:2, :2].T + to_steps[:2, 2]) for kind, points in pieces]
+                vertices = flatten_pieces(pieces)
+                if is_closed and len(vertices) > 1 and np.allclose(vertices[0], vertices[-1]):
+                    vertices = vertices[:-1]  # The closing segment returns to the first vertex
+                polylines.append(vertices)
+                closed.append(is_closed)
+                shape_indices.append(index)
+            even_odd.append(fill_rule == EVENODD)
+
+        if mode == OUTLINE:
+            codes = outline_codes(polylines, closed)
+        else:
+            codes = fill_codes(polylines, shape_indices, np.array(even_odd))
+
+        voltage_pairs = codes * sensitivity
+        if len(voltage_pairs) and np.abs(voltage_pairs).max() > voltage_range / 2:
+            raise ValueError(f"The pattern spans {np.ptp(codes, axis=0).max() + 1} DAC steps, larger than the voltage "
+                             f"range of {int(round(voltage_range / sensitivity))} steps")
+
+        return voltage_pairs
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't compile the vector pattern : {e}")
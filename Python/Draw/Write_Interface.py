@@ -1,19 +1,49 @@
 from PyQt6 import QtWidgets, uic
 from PyQt6.QtWidgets import QFileDialog
 from PyQt6.QtGui import QPixmap, QImage
-from PyQt6.QtCore import Qt, QThread
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
+from PyQt6.QtCore import Qt, QThread, QTimer
 import numpy as np
 import io
 from PyQt6.QtCore import pyqtSignal
 from . import Image_to_Signals
 from . import Write_Signals
-import time
+from . import Path_Ordering
+from . import Preview
+from . import Pattern_Cache
+from . import Vector_Patterns
+from . import Dose_Simulation
+from Modules_FIB import Decimation
+from Modules_FIB import Signal_Inspector
+import threading
 
 # Load the UI file created with QT Designer
 Ui_MainWindow, _ = uic.loadUiType("WriteWindow.ui")
 
+# Names of the beam path strategies shown to the user
+PATH_STRATEGY_NAMES = {"raster": "Raster", "serpentine": "Serpentine", "nearest_neighbour": "Nearest neighbour",
+                       "components": "Islands", "drawing": "As drawn"}
+
+# Time given to the writing thread to park the beam when it is stopped, in milliseconds, before the card is reset
+STOP_TIMEOUT = 2000
+
+
+def format_time(seconds):
+    """
+    Formats a duration for the time label of the window.
+
+    Parameters:
+    - seconds (float): The duration, in seconds.
+
+    Returns:
+    - str: The duration in seconds, or in minutes and seconds above a minute.
+    """
+
+    if seconds < 60:  # Less than 60 seconds
+        return f"{int(seconds) + 1} seconds"
+    minutes = int(seconds) // 60
+    remaining_seconds = int(seconds) % 60 + 1
+    return f"{minutes}mn {remaining_seconds}s"
+
 
 class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     """
@@ -42,23 +72,62 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.pushButton_Signals.clicked.connect(self.Compute_Signals)
         self.pushButton_Go.clicked.connect(self.Write_Signals)
         self.pushButton_Stop.clicked.connect(self.Stop_Signals)
+        self.pushButton_Pause.clicked.connect(self.pause_writing)
 
-        # Ensure required time recalculation after modification
+        # Ensure required time recalculation after modification, the signals have to be computed again
         self.spinBox_iterations.valueChanged.connect(self.calculate_required_time)
+        self.spinBox_iterations.valueChanged.connect(self.signal_parameters_changed)
+
+        # Passes are regenerated by the card, they only change the required time
+        self.spinBox_passes.valueChanged.connect(self.calculate_required_time)
+        self.checkBox_continuous.toggled.connect(self.continuous_changed)
+
+        # Beam path strategies, the signals have to be computed again when it changes
+        for strategy, name in PATH_STRATEGY_NAMES.items():
+            self.comboBox_path.addItem(name, strategy)
+        self.comboBox_path.currentIndexChanged.connect(self.signal_parameters_changed)
+
+        # The voltage map and the signals are computed in a background thread, which can be cancelled
+        self.pushButton_Cancel.clicked.connect(self.cancel_computation)
+
+        # Simulated dose of the signals, shown in place of their plot
+        self.pushButton_Dose.toggled.connect(self.dose_preview_toggled)
+        self.doubleSpinBox_beam.valueChanged.connect(self.beam_profile_changed)
+
+        # Grayscale dose maps, the voltage map has to be computed again when the mode changes
+        self.checkBox_dose.toggled.connect(self.dose_mode_changed)
+
+        # Vector patterns are followed along their outlines or filled, the voltage map has to be computed again
+        self.checkBox_fill.toggled.connect(self.dose_mode_changed)
+
+        # Zoomable plot of the signals, shown in place of the image display
+        self.signal_plot = Signal_Inspector.SignalPlot(self.QPixmap_ui.parentWidget())
+        self.signal_plot.setGeometry(self.QPixmap_ui.geometry())
+        self.signal_plot.setToolTip("Wheel : zoom, drag : pan, double click : whole signals")
+        self.signal_plot.hide()
 
         # Initialize instance variables
         self.voltageRange = 20
         self.bits_number = 16
         self.label_time.setText("")
         self.filePath = None
+        self.pattern = None
         self.Objects = None
-        self.LR_signal = None
-        self.UD_signal = None
+        self.Dose = None
+        self.map_key = None
+        self.map_preview = None
+        self.jumps = None
+        self.Path = None
+        self.Signals = None
         self.iterations = None
         self.data = None
         self.required_time = None
-        self.remaining_time_thread = None
         self.run_Thread = None
+        self.resume_sample = None
+        self.paused = False
+        self.write_frequency = None
+        self.write_passes = None
+        self.compute_thread = None
 
     def request_data(self):
         """
@@ -94,11 +163,11 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         Displays an image within the application's UI.
 
         This function handles the visual rendering of images in the main window. It supports displaying images
-        from both file paths and in-memory byte streams (from operations like generating plots with matplotlib).
+        from file paths, in-memory byte streams and previews rendered as QImage by the `Preview` module.
         The image is scaled to fit the designated UI element while maintaining aspect ratio.
 
         Parameters:
-        - image (str or io.BytesIO): The image to display, provided either as a file path or as a BytesIO object.
+        - image (str, io.BytesIO or QImage): The image to display, provided as a file path, a BytesIO object or a QImage.
 
         The function uses QPixmap to handle image operations and QLabel for display. Errors during the process
         are handled gracefully through user notifications and resetting the application state.
@@ -108,14 +177,19 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             pixmap = QPixmap()
 
             if isinstance(image, io.BytesIO):
-                qimage = QImage()  # Image is a BytesIO object from matplotlib
+                qimage = QImage()  # Image is an encoded BytesIO object
                 qimage.loadFromData(image.getvalue())
                 pixmap = QPixmap.fromImage(qimage)
 
+            elif isinstance(image, QImage):
+                pixmap = QPixmap.fromImage(image)  # Image is a preview rendered by the Preview module
+
             elif isinstance(image, str):
                 pixmap.load(image)  # Image is a file path
 
             # Proceed to scale and display the pixmap
+            self.signal_plot.hide()
+            self.QPixmap_ui.show()
             self.QPixmap_ui.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
             scaled_pixmap = pixmap.scaled(self.QPixmap_ui.size(), Qt.AspectRatioMode.KeepAspectRatio,
                                           Qt.TransformationMode.SmoothTransformation)
@@ -130,8 +204,10 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         Opens a file dialog for the user to select an image and displays the selected image in the UI.
 
         This function triggers a file dialog that allows the user to select an image file from their file system.
-        Supported formats can be specified in the file dialog filter (currently PNG and all other file types are supported).
-        Once an image is selected, it is displayed in the main application window using the `displayImage` function.
+        Supported formats can be specified in the file dialog filter (currently PNG images, SVG files and text files
+        of polygons, and all other file types are supported). Once an image is selected, it is displayed in the main
+        application window using the `displayImage` function. Vector patterns are shown once their voltage map is
+        computed, the dose map being replaced by the choice between their outlines and their inside.
         Additionally, this function manages the enabling and disabling of UI buttons based on the state of the image loading process.
 
         Errors during the loading or display process are managed by displaying an error message and resetting the application to a known state.
@@ -139,11 +215,19 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         try:
             # Open file dialog to select an image
-            self.filePath, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "PNG Files (*.png);;All Files (*)")
+            self.filePath, _ = QFileDialog.getOpenFileName(self, "Select Image", "",
+                                                           "Patterns (*.png *.svg *.txt *.poly);;PNG Files (*.png);;"
+                                                           "Vector Files (*.svg *.txt *.poly);;All Files (*)")
             if self.filePath:
                 # Once an image is selected, display it
                 self.displayImage(self.filePath)
 
+                vector = Vector_Patterns.is_vector_file(self.filePath)
+                self.checkBox_dose.setEnabled(not vector)
+                self.checkBox_fill.setEnabled(vector)
+                if vector:
+                    self.statusbar.showMessage("Vector pattern, compute the voltage map to preview it", 5000)
+
                 # Switch button states
                 self.pushButton_Load_image.setEnabled(False)
                 self.pushButton_VoltageMap.setEnabled(True)
@@ -152,6 +236,44 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.message('Error', f"Failed to load the image : {e}")
             self.Reset()
 
+    def load_pattern(self, pattern, name="Generated pattern"):
+        """
+        Loads a pattern generated by the `Pattern_Library` instead of an image file, and computes its voltage map.
+
+        The dwell counts of the pattern are multiplied by the number of iterations, so that a single iteration
+        writes every point during the number of samples it was generated with.
+
+        Parameters:
+        - pattern (tuple of numpy.ndarray): The N x 2 voltage coordinates and their N dwell counts, or None for
+          a single sample per coordinate.
+        - name (str): Name of the pattern, shown in the status bar.
+        """
+
+        try:
+            voltage_pairs, dwell = pattern
+            voltage_pairs = np.ascontiguousarray(voltage_pairs, dtype=np.float64).reshape(-1, 2)
+            if dwell is None:
+                dwell = np.ones(len(voltage_pairs), dtype=np.int64)
+            dwell = np.asarray(dwell, dtype=np.int64)
+            if len(dwell) != len(voltage_pairs):
+                raise ValueError(f"{len(dwell)} dwell counts for {len(voltage_pairs)} coordinates")
+            if len(voltage_pairs) and np.abs(voltage_pairs).max() > self.voltageRange / 2:
+                raise ValueError(f"The pattern exceeds the voltage range of {self.voltageRange} V")
+
+            self.Reset()
+            self.pattern = (voltage_pairs, dwell)
+            self.statusbar.showMessage(f"{name} : {len(voltage_pairs)} points", 5000)
+
+            # Switch button states
+            self.pushButton_Load_image.setEnabled(False)
+            self.checkBox_dose.setEnabled(False)
+
+            self.Compute_Voltage_Map()
+
+        except Exception as e:
+            self.message('Error', f"Failed to load the pattern : {e}")
+            self.Reset()
+
     def Compute_Voltage_Map(self):
         """
         Computes the voltage map from an image file and displays a visual representation.
@@ -159,176 +281,537 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         This function processes a loaded image file to generate a voltage map, which is a set of voltage
         pairs derived from the image's pixel data. It uses the `Image_to_voltage_pairs` function from the
         `Image_to_Signals` module, calculating sensitivity based on the configured voltage range and bit depth.
-        The resulting coordinates are then plotted and displayed within the application.
+        Vector patterns are compiled at the same step by the `Vector_Patterns` module, and the patterns generated
+        by the `Pattern_Library` are used as they are.
+        The resulting coordinates are then rasterized by the `Preview` module and displayed within the application.
 
-        The function updates the UI to reflect the new state by enabling and disabling buttons as necessary.
-        It also triggers a recalculation of the required time for subsequent operations based on the newly
-        generated data.
+        The computation runs in a `Compute` thread, so the window stays responsive and the computation can be
+        cancelled. Its results are applied by `voltage_map_ready`, which updates the buttons states and the
+        required time. Voltage maps already computed for the same image and parameters are read from the
+        `Pattern_Cache`.
 
         Exceptions are handled by displaying error messages and resetting the application state if needed.
         """
 
         try:
-            if self.filePath:
-                # Compute the voltage map
-                sensitivity = self.voltageRange / (2 ** self.bits_number)
-                self.Objects = Image_to_Signals.Image_to_voltage_pairs(self.filePath, self.voltageRange, sensitivity)
+            if self.filePath or self.pattern is not None:
+                vector = bool(self.filePath) and Vector_Patterns.is_vector_file(self.filePath)
+                vector_mode = None
+                if vector:
+                    vector_mode = Vector_Patterns.FILL if self.checkBox_fill.isChecked() else Vector_Patterns.OUTLINE
+                parameters = {"file_path": self.filePath,
+                              "pattern": self.pattern,
+                              "voltage_range": self.voltageRange,
+                              "bits_number": self.bits_number,
+                              "sensitivity": self.voltageRange / (2 ** self.bits_number),
+                              "dose": self.checkBox_dose.isChecked() and not vector,
+                              "vector_mode": vector_mode,
+                              "preview_width": self.QPixmap_ui.width() - 1,
+                              "preview_height": self.QPixmap_ui.height() - 1}
+                self.start_computation(Compute.VOLTAGE_MAP, parameters)
 
                 # Update button states
-                self.pushButton_Signals.setEnabled(True)
                 self.pushButton_VoltageMap.setEnabled(False)
 
-                # Load the image to get its dimensions for plot scaling
-                image = QImage(self.filePath)
-                img_width = image.width()
-                img_height = image.height()
-
-                # Calculate figure size
-                dpi = 100  # Example DPI, adjust as necessary
-                figsize_width = img_width / dpi
-                figsize_height = img_height / dpi
-
-                # Plotting
-                fig, ax = plt.subplots(figsize=(figsize_width, figsize_height), dpi=dpi)
-                colors = cm.rainbow(np.linspace(0, 1, len(self.Objects)))  # Generating colors
+        except Exception as e:
+            self.message('Error', f"Failed to compute volage map : {e}")
+            self.Reset()
 
-                # Unzip the list of coordinates
-                x_vals, y_vals = zip(*self.Objects)
-                ax.scatter(x_vals, y_vals, s=1)  # s=1 sets the size of each point
+    def voltage_map_ready(self, result):
+        """
+        Applies the voltage map computed by a `Compute` thread: displays its preview, the jumps of every beam path
+        strategy and the required time.
 
-                ax.grid(True)
-                ax.set_aspect('equal', adjustable='box')
+        Parameters:
+        - result (dict): The coordinates, their doses (None for a binary mask), the jumps of every beam path
+          strategy and the preview of the voltage map.
+        """
 
-                # Save the plot to a BytesIO object and use displayImage to show it
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png', bbox_inches='tight', transparent=True)
-                buf.seek(0)
-                plt.close(fig)  # Close the figure to free memory
+        self.Objects = result["objects"]
+        self.Dose = result["dose"]
+        self.map_key = result["map_key"]
+        self.map_preview = result["preview"]
+        self.jumps = dict(result["jumps"])
+        self.report_path_strategies(self.jumps)
 
-                # Convert the BytesIO object to QPixmap and display it using displayImage
-                self.displayImage(buf)
+        # The outline of a vector pattern and a generated pattern are followed as they were drawn
+        if result["drawn"]:
+            self.comboBox_path.setCurrentIndex(self.comboBox_path.findData("drawing"))
 
-                self.calculate_required_time()
+        # Update button states
+        self.pushButton_Signals.setEnabled(True)
+        self.pushButton_VoltageMap.setEnabled(False)
 
-        except Exception as e:
-            self.message('Error', f"Failed to compute volage map : {e}")
-            self.Reset()
+        self.displayImage(result["preview"])
+        self.calculate_required_time()
 
     def Compute_Signals(self):
         """
         Computes the Left-Right and Up-Down signals from the voltage map and displays their plots.
 
         After generating a voltage map with `Compute_Voltage_Map`, this function further processes the data
-        to produce Left-Right (LR) and Up-Down (UD) signals using the `pairs_to_signal` method from the
-        `Image_to_Signals` module. The signals are plotted in two separate subplots and displayed in the UI.
+        to produce Left-Right (LR) and Up-Down (UD) signals using the `pairs_to_signals` method from the
+        `Image_to_Signals` module. Their min/max envelopes are plotted one above the other in a zoomable plot,
+        decimated again to the width of the plot at each zoom.
 
-        This function handles the activation and deactivation of UI buttons based on the process state and
-        ensures that visual representations of the signals are updated in the main window. It also considers
-        the number of iterations specified by the user to adjust the signal computation accordingly.
+        The beam path is ordered in a `Compute` thread, with the strategy and the number of iterations selected
+        when the computation starts. Changing them during the computation starts it again, and its results are
+        applied by `signals_ready`.
 
         Errors during computation or plotting are managed by notifying the user through a message and resetting
         the application state to ensure stability and reliability.
         """
 
         try:
-            if self.Objects:
+            if self.Objects is not None and len(self.Objects):
                 if self.iterations:
-                    # Compute signals
-                    self.LR_signal, self.UD_signal = Image_to_Signals.pairs_to_signal(self.Objects, self.iterations)
+                    parameters = {"objects": self.Objects,
+                                  "dose": self.Dose,
+                                  "map_key": self.map_key,
+                                  "strategy": self.comboBox_path.currentData(),
+                                  "iterations": self.iterations,
+                                  "sensitivity": self.voltageRange / (2 ** self.bits_number)}
+                    self.start_computation(Compute.SIGNALS, parameters)
 
                     # Update buttons state
-                    self.pushButton_Go.setEnabled(True)
                     self.pushButton_Signals.setEnabled(False)
 
-                    # Load the image to get its dimensions for plot scaling
-                    image = QImage(self.filePath)
-                    img_width = image.width()
-                    img_height = image.height()
+        except Exception as e:
+            self.message('Error', f"Failed to compute signals : {e}")
+            self.Reset()
+
+    def signals_ready(self, result):
+        """
+        Applies the signals computed by a `Compute` thread and plots their min/max envelope.
+
+        Parameters:
+        - result (dict): The ordered path, its dwell counts, the lazy signals, the views of their envelopes, the
+          strategy of the path and its jumps.
+        """
+
+        self.Path = result["path"]
+        self.Signals = result["signals"]
+
+        # The jumps of the strategies not compared with the voltage map
+        if self.jumps is not None and result["strategy"] not in self.jumps:
+            self.jumps[result["strategy"]] = result["jumps"]
+            self.report_path_strategies(self.jumps)
+
+        # Update buttons state
+        self.pushButton_Go.setEnabled(True)
+        self.pushButton_Signals.setEnabled(False)
+        self.clear_dose_preview()
+        self.pushButton_Dose.setEnabled(True)
+
+        # Plot the min/max envelope of the signals, from the path and its dwell counts
+        self.signal_plot.set_views(result["views"], ["LR", "UD"])
+        self.QPixmap_ui.hide()
+        self.signal_plot.show()
+
+    def start_computation(self, task, parameters):
+        """
+        Starts a `Compute` thread, cancelling the computation in progress if any.
+
+        Parameters:
+        - task (str): Compute.VOLTAGE_MAP or Compute.SIGNALS.
+        - parameters (dict): The parameters of the computation, copied from the window when it starts.
+        """
+
+        self.cancel_computation()
+
+        self.compute_thread = Compute(task, parameters, self)
+        self.compute_thread.progressUpdated.connect(self.computation_progress)
+        self.compute_thread.stageChanged.connect(self.computation_stage)
+        self.compute_thread.resultReady.connect(self.computation_done)
+        self.compute_thread.errorOccurred.connect(self.computation_failed)
+        self.compute_thread.finished.connect(self.compute_thread.deleteLater)
+
+        self.progressBar.setValue(0)
+        self.pushButton_Cancel.setEnabled(True)
+        self.compute_thread.start()
+
+    def cancel_computation(self):
+        """
+        Cancels the computation in progress, if any. The thread stops at its next progress report and its
+        results are ignored, so the window can be used again at once.
+
+        Returns:
+        - str: The task which was cancelled, None if no computation was in progress.
+        """
+
+        try:
+            if self.compute_thread is None:
+                return None
 
-                    # Calculate figure size
-                    dpi = 100  # Example DPI, adjust as necessary
-                    figsize_width = img_width / dpi
-                    figsize_height = (img_height / dpi) * 2  # Since we have 2 subplots, divide height by 2
+            task = self.compute_thread.task
+            self.compute_thread.cancel()
+            self.compute_thread = None
 
-                    # Plotting
-                    fig, ax = plt.subplots(2, 1, figsize=(figsize_width, figsize_height), dpi=dpi)
-                    fig.patch.set_alpha(0.0)  # Set the figure background to transparent
-                    ax[0].plot(self.LR_signal)
-                    ax[1].plot(self.UD_signal)
-                    plt.tight_layout()
+            self.pushButton_Cancel.setEnabled(False)
+            self.progressBar.setValue(0)
+            self.statusbar.showMessage("Computation cancelled", 3000)
 
-                    # Save the plot to a BytesIO object with a transparent background
-                    buf = io.BytesIO()
-                    plt.savefig(buf, format='png', bbox_inches='tight', transparent=True)
-                    buf.seek(0)
-                    plt.close(fig)  # Close the figure to free memory
+            # The cancelled computation can be started again
+            if task == Compute.VOLTAGE_MAP:
+                self.pushButton_VoltageMap.setEnabled(bool(self.filePath) or self.pattern is not None)
+            elif task == Compute.SIGNALS:
+                self.pushButton_Signals.setEnabled(self.Objects is not None)
+            else:
+                self.pushButton_Dose.blockSignals(True)
+                self.pushButton_Dose.setChecked(False)
+                self.pushButton_Dose.blockSignals(False)
 
-                    # Convert the BytesIO object to QPixmap and display it using displayImage
-                    self.displayImage(buf)
+            return task
 
         except Exception as e:
-            self.message('Error', f"Failed to compute signals : {e}")
+            self.message('Error', f"Couldn't cancel the computation : {e}")
+
+    def computation_progress(self, progress):
+        if self.sender() is self.compute_thread:
+            self.progressBar.setValue(progress)
+
+    def computation_stage(self, stage):
+        if self.sender() is self.compute_thread:
+            self.statusbar.showMessage(stage)
+
+    def computation_done(self, task, result):
+        """
+        Applies the results of the current `Compute` thread, the results of cancelled ones being ignored.
+        """
+
+        try:
+            if self.sender() is not self.compute_thread:
+                return
+
+            self.compute_thread = None
+            self.pushButton_Cancel.setEnabled(False)
+            self.statusbar.clearMessage()
+
+            if task == Compute.VOLTAGE_MAP:
+                self.voltage_map_ready(result)
+            elif task == Compute.SIGNALS:
+                self.signals_ready(result)
+            else:
+                self.dose_ready(result)
+
+        except Exception as e:
+            self.message('Error', f"Failed to apply the {task} : {e}")
             self.Reset()
 
+    def computation_failed(self, error_message):
+        if self.sender() is self.compute_thread:
+            task = self.compute_thread.task
+            self.compute_thread = None
+            self.message('Error', error_message)
+
+            # The pattern is still valid when only its dose preview failed
+            if task == Compute.DOSE:
+                self.pushButton_Cancel.setEnabled(False)
+                self.clear_dose_preview()
+                self.pushButton_Dose.setEnabled(self.Signals is not None)
+            else:
+                self.Reset()
+
+    def dose_preview_toggled(self, checked):
+        """
+        Shows the dose delivered by the signals in place of their plot, or shows the plot back.
+
+        The dose is simulated by a `Compute` thread from the points of the signals and their dwell counts, the jumps
+        between the points included, then convolved with the Gaussian profile of the beam set next to the button.
+        """
+
+        try:
+            if checked:
+                if self.Signals is not None:
+                    sensitivity = self.voltageRange / (2 ** self.bits_number)
+                    parameters = {"signals": self.Signals,
+                                  "sensitivity": sensitivity,
+                                  "sigma": self.doubleSpinBox_beam.value() * sensitivity}
+                    self.start_computation(Compute.DOSE, parameters)
+            else:
+                if self.compute_thread is not None and self.compute_thread.task == Compute.DOSE:
+                    self.cancel_computation()
+                self.QPixmap_ui.hide()
+                self.signal_plot.show()
+
+        except Exception as e:
+            self.message('Error', f"Failed to preview the dose : {e}")
+
+    def beam_profile_changed(self):
+        if self.pushButton_Dose.isChecked():
+            self.dose_preview_toggled(True)
+
+    def dose_ready(self, result):
+        """
+        Displays the dose simulated by a `Compute` thread, and its peak in the status bar.
+
+        Parameters:
+        - result (dict): The dose map and its rendering.
+        """
+
+        dose_map = result["dose_map"]
+        self.displayImage(result["preview"])
+
+        resolution = "DAC resolution" if dose_map.binning == 1 else f"{dose_map.binning} DAC steps per pixel"
+        self.statusbar.showMessage(f"Peak dose : {dose_map.peak():.0f} samples per pass ({resolution})")
+
+    def clear_dose_preview(self):
+        """
+        Unchecks the dose preview without showing the plot of the signals, and cancels its computation.
+        """
+
+        if self.compute_thread is not None and self.compute_thread.task == Compute.DOSE:
+            self.cancel_computation()
+        self.pushButton_Dose.blockSignals(True)
+        self.pushButton_Dose.setChecked(False)
+        self.pushButton_Dose.blockSignals(False)
+
+    def report_path_strategies(self, jumps):
+        """
+        Shows the total length of the jumps of every beam path strategy next to its name, so the user can choose
+        the fastest one for the current voltage map. The strategies which aren't compared up front, like the nearest
+        neighbour tour, are measured once their signals are computed.
+
+        Parameters:
+        - jumps (dict): For every strategy measured, the total length of the jumps in volts and their number, as
+          returned by `Path_Ordering.compare_strategies`.
+        """
+
+        try:
+            for index in range(self.comboBox_path.count()):
+                strategy = self.comboBox_path.itemData(index)
+                if strategy not in jumps:
+                    self.comboBox_path.setItemText(index, PATH_STRATEGY_NAMES[strategy])
+                    self.comboBox_path.setItemData(index, "Measured once the signals are computed",
+                                                   Qt.ItemDataRole.ToolTipRole)
+                    continue
+
+                length, number = jumps[strategy]
+                self.comboBox_path.setItemText(index, f"{PATH_STRATEGY_NAMES[strategy]} ({length:.2f} V)")
+                self.comboBox_path.setItemData(index, f"{number} jumps, {length:.3f} V in total",
+                                               Qt.ItemDataRole.ToolTipRole)
+
+        except Exception as e:
+            self.message('Error', f"Failed to compare the beam paths : {e}")
+
+    def signal_parameters_changed(self):
+        """
+        Invalidates the signals computed with the previous beam path strategy or number of iterations, and
+        computes them again if they were being computed.
+        """
+
+        try:
+            if self.compute_thread is not None and self.compute_thread.task == Compute.SIGNALS:
+                self.Compute_Signals()
+
+            elif self.Signals is not None:
+                self.Path = None
+                self.Signals = None
+                self.pushButton_Go.setEnabled(False)
+                self.pushButton_Signals.setEnabled(True)
+                self.clear_dose_preview()
+                self.pushButton_Dose.setEnabled(False)
+
+        except Exception as e:
+            self.message('Error', f"Failed to change the signals parameters : {e}")
+
+    def dose_mode_changed(self):
+        """
+        Invalidates the voltage map and the signals computed in the previous mode (binary mask or dose map, outline
+        or fill of a vector pattern), and computes the voltage map again if it was being computed.
+        """
+
+        try:
+            if self.filePath:
+                task = self.cancel_computation()
+
+                self.Objects = None
+                self.Dose = None
+                self.map_key = None
+                self.map_preview = None
+                self.jumps = None
+                self.Path = None
+                self.Signals = None
+                self.label_time.setText("")
+                self.pushButton_VoltageMap.setEnabled(True)
+                self.pushButton_Signals.setEnabled(False)
+                self.pushButton_Go.setEnabled(False)
+                self.clear_dose_preview()
+                self.pushButton_Dose.setEnabled(False)
+
+                if task == Compute.VOLTAGE_MAP:
+                    self.Compute_Voltage_Map()
+
+        except Exception as e:
+            self.message('Error', f"Failed to change the dose mode : {e}")
+
     def Write_Signals(self):
         """
         Initiates the process of writing the computed signals to the NI Card using multi-threading.
 
         This function checks that the Left-Right (LR) and Up-Down (UD) signals are computed and available.
         It then retrieves necessary channel and frequency settings from the application's data. The signals
-        are sent to the card channels using multithreading to manage signal transmission and
-        to update UI elements like progress bars and timers concurrently without freezing the GUI.
+        are sent to the card channels in a `Send` thread, so the GUI keeps responding during the writing.
 
-        The function sets up and starts two threads: one for managing the remaining time and updating the UI,
-        and another for the actual signal transmission. It ensures that the application responds to errors during
-        the process by displaying messages and resetting the state if needed.
+        The progress bar and the remaining time are updated from the number of samples actually generated by the
+        card, which the `Send` thread reports about 20 times per second. The writing can be paused with
+        `pause_writing` and resumed from the point it reached.
 
         Errors during setup or execution are handled by notifying the user and resetting the environment to a stable state.
         """
 
+        self.start_writing(0)
+
+    def start_writing(self, first_sample):
+        """
+        Starts a `Send` thread writing the signals from a given sample.
+
+        Parameters:
+        - first_sample (int): Index of the first sample to write, counted from the beginning of the first pass.
+        """
+
         try:
-            if (self.LR_signal is not None) and (self.UD_signal is not None):
+            if self.Signals is not None:
                 # Getting data from the main window
                 self.request_data()
                 data = self.data
                 channel_lr, channel_ud = data[0], data[1]
-                sampling_frequency = data[2]
+                self.write_frequency = data[2]
+                self.write_passes = self.passes()
 
-                # Show the original image back to the user
-                self.displayImage(self.filePath)
+                # Show the original image back to the user, or the preview of a vector or generated pattern
+                self.clear_dose_preview()
+                if self.pattern is not None or Vector_Patterns.is_vector_file(self.filePath):
+                    self.displayImage(self.map_preview)
+                else:
+                    self.displayImage(self.filePath)
 
                 # Update buttons states
                 self.pushButton_Go.setEnabled(False)
                 self.pushButton_Stop.setEnabled(True)
-
-                # Setting up the remaining time thread
-                self.remaining_time_thread = Remaining_Time(self.required_time)
-                self.remaining_time_thread.update_progress.connect(self.progressBar.setValue)
-                self.remaining_time_thread.update_time.connect(self.label_time.setText)
-                self.remaining_time_thread.progress_done.connect(self.progress_done)
-                self.remaining_time_thread.errorOccurred.connect(self.handle_thread_errors)
+                self.pushButton_Pause.setText("Pause")
+                self.pushButton_Pause.setEnabled(True)
+                self.resume_sample = None
+                self.paused = False
 
                 # Setting up the writing thread
-                self.run_Thread = Send(channel_lr, channel_ud, self.LR_signal, self.UD_signal,
-                                       sampling_frequency, self.required_time)
-                self.run_Thread.errorOccurred.connect(self.handle_thread_errors)
-
-                # Starting the threads
-                self.remaining_time_thread.start()
+                self.run_Thread = Send(channel_lr, channel_ud, self.Signals, self.write_frequency, self.required_time,
+                                       self.write_passes, first_sample)
+                self.run_Thread.errorOccurred.connect(self.writing_failed)
+                self.run_Thread.progressUpdated.connect(self.writing_progress)
+                self.run_Thread.writingStopped.connect(self.writing_stopped)
+                self.show_progress(first_sample)
+
+                # Starting the writing thread
                 self.run_Thread.start()
 
         except Exception as e:
             self.message('Error', f"Failed to write signals : {e}")
             self.Reset()
 
+    def writing_progress(self, sample):
+        if self.run_Thread is not None and self.sender() is self.run_Thread:
+            self.show_progress(sample)
+
+    def show_progress(self, sample):
+        """
+        Updates the progress bar and the remaining time from the sample reached by the card.
+
+        Parameters:
+        - sample (int): Index of the next sample to be generated, counted from the beginning of the first pass.
+        """
+
+        try:
+            pass_samples = self.Signals.shape[1]
+            pass_index, offset = divmod(sample, pass_samples)
+
+            if self.write_passes is None:
+                # Written until stopped, the progress of the current pass is shown
+                self.progressBar.setValue(int(100 * offset / pass_samples))
+                remaining = (pass_samples - offset) / self.write_frequency
+                self.label_time.setText(f"Pass {pass_index + 1} :\n{format_time(remaining)}")
+            else:
+                total_samples = pass_samples * self.write_passes
+                self.progressBar.setValue(int(100 * sample / total_samples))
+                remaining = (total_samples - sample) / self.write_frequency
+                self.label_time.setText(f"Remaining time :\n{format_time(remaining)}")
+
+        except Exception as e:
+            self.message('Error', f"Failed to update the progress : {e}")
+
+    def writing_stopped(self, sample, complete):
+        """
+        Reacts to the end of a `Send` thread: completed, paused or aborted.
+
+        The point and the pass reached are recorded in the status bar. A paused writing keeps the sample it reached,
+        from which `pause_writing` resumes it.
+
+        Parameters:
+        - sample (int): Index of the sample following the last generated one.
+        - complete (bool): True if every pass was written.
+        """
+
+        try:
+            if self.run_Thread is None or self.sender() is not self.run_Thread:
+                return
+
+            if complete:
+                self.progressBar.setValue(100)
+                self.label_time.setText("Done")
+                self.progress_done()
+                return
+
+            pass_index, offset = divmod(sample, self.Signals.shape[1])
+            point = min(self.Signals.point_at(offset), len(self.Path) - 1)
+            position = f"point {point + 1}/{len(self.Path)}"
+            if self.write_passes != 1:
+                position += f" of pass {pass_index + 1}"
+            self.statusbar.showMessage(f"Beam parked at {position}, sample {sample}")
+
+            if self.paused:
+                self.resume_sample = sample
+                self.label_time.setText(f"Paused at\n{position}")
+                self.pushButton_Pause.setText("Resume")
+                self.pushButton_Pause.setEnabled(True)
+            else:
+                self.label_time.setText(f"Stopped at\n{position}")
+                self.progress_done()
+
+        except Exception as e:
+            self.message('Error', f"Failed to stop the writing : {e}")
+
+    def writing_failed(self, error_message):
+        self.message('Error', error_message)
+        if self.run_Thread is not None and self.sender() is self.run_Thread:
+            self.progress_done()
+
+    def pause_writing(self):
+        """
+        Pauses the writing, or resumes a paused writing from the sample it reached.
+
+        The `Send` thread parks the beam when it stops, and reports the sample reached to `writing_stopped`.
+        """
+
+        try:
+            if self.resume_sample is not None:
+                self.start_writing(self.resume_sample)
+
+            elif self.run_Thread is not None and self.run_Thread.isRunning():
+                self.paused = True
+                self.pushButton_Pause.setEnabled(False)  # Until the beam is parked
+                self.run_Thread.stop()
+
+        except Exception as e:
+            self.message('Error', f"Couldn't pause the writing : {e}")
+
     def calculate_required_time(self):
         """
         Calculates the time required to complete the signal transmission based on the number of iterations and sampling frequency.
 
         This function retrieves the current sampling frequency and the number of iterations set by the user to compute
         the total time needed to transmit all signals. The computation considers the length of the object list, which represents
-        the number of voltage points generated from the image. The result is formatted and displayed in the UI to inform
-        the user about the duration of the operation.
+        the number of voltage points generated from the image, or the sum of their dwell counts for a dose map. The result is
+        formatted and displayed in the UI to inform the user about the duration of the operation.
 
         The time is calculated to help in setting expectations and for use in configuring the progress and time tracking threads
         during the signal writing process. Errors in fetching data or performing calculations result in a notification to the user
@@ -336,7 +819,7 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
 
         try:
-            if self.Objects:
+            if self.Objects is not None and len(self.Objects):
                 # Getting data from the main window
                 self.request_data()
                 data = self.data
@@ -346,39 +829,66 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                     # Getting data from the actual window
                     self.iterations = self.spinBox_iterations.value()
 
-                    # Calculating the required time
-                    self.required_time = len(self.Objects) / sampling_frequency * self.iterations
+                    # Calculating the required time, from the dwell of every point for a dose map
+                    if self.Dose is not None:
+                        total_samples = int(Image_to_Signals.dwell_counts(self.Dose, self.iterations).sum())
+                    else:
+                        total_samples = len(self.Objects) * self.iterations
+                    self.required_time = total_samples / sampling_frequency
 
-                    # Converting the required time
-                    if self.required_time < 60:  # Less than 60 seconds
-                        result_str = f"{int(self.required_time) + 1} seconds"
-                    else:  # 60 seconds or more
-                        minutes = int(self.required_time) // 60
-                        remaining_seconds = int(self.required_time) % 60 + 1
-                        result_str = f"{minutes}mn {remaining_seconds}s"
+                    # The passes are regenerated by the card, one pass is shown when written until stopped
+                    passes = self.passes()
+                    if passes is not None:
+                        self.required_time *= passes
 
                     # Displaying the required time
-                    self.label_time.setText(f"Required time :\n{result_str}")  # Write the required time on the UI
+                    title = "Required time :" if passes is not None else "Time per pass :"
+                    self.label_time.setText(f"{title}\n{format_time(self.required_time)}")  # Write the required time on the UI
 
         except Exception as e:
             self.message('Error', f"Failed to write calculate the required time : {e}")
             self.Reset()
 
+    def passes(self):
+        """
+        Returns:
+        - int or None: The number of passes of the pattern, None if it is written until stopped.
+        """
+
+        if self.checkBox_continuous.isChecked():
+            return None
+        return self.spinBox_passes.value()
+
+    def continuous_changed(self, checked):
+        """
+        Switches between a number of passes and a pattern written until stopped.
+        """
+
+        try:
+            self.spinBox_passes.setEnabled(not checked)
+            self.calculate_required_time()
+
+        except Exception as e:
+            self.message('Error', f"Failed to change the passes : {e}")
+
     def progress_done(self):
         """
-        Reacts to the completion of the progress, typically signal transmission.
+        Reacts to the end of the signal transmission, completed or stopped.
 
-        This method is designed to be called when signal transmission is completed. It enables the 'Go'
-        button, allowing the user to start another transmission. This can be connected to a signal indicating
-        that the transmission task has finished.
+        It enables the 'Go' button, allowing the user to start another transmission, and disables the
+        buttons controlling the transmission.
 
         If an error occurs, an error message is displayed to the user.
         """
 
         try:
             # Update buttons state
-            self.pushButton_Go.setEnabled(True)
+            self.pushButton_Go.setEnabled(self.Signals is not None)
             self.pushButton_Stop.setEnabled(False)
+            self.pushButton_Pause.setEnabled(False)
+            self.pushButton_Pause.setText("Pause")
+            self.resume_sample = None
+            self.paused = False
 
         except Exception as e:
             self.message('Error', f"Failed to emit 'done' signal : {e}")
@@ -387,35 +897,74 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
         Stops the signal transmission process.
 
-        This method attempts to stop any ongoing signal transmission by terminating the threads
-        responsible for sending the signals and updating the UI with the remaining time. It resets
-        the progress bar to 0 and recalculates the required time for transmission, effectively
-        resetting the UI to allow for a new operation to be started.
+        The `Send` thread stops the task of the card, parks the beam and reports the point it reached to
+        `writing_stopped`, which enables the controls again. The interface doesn't wait for it: a card which doesn't
+        answer is reset by `stop_deadline` after STOP_TIMEOUT milliseconds. A paused writing is abandoned, it can't
+        be resumed anymore.
 
-        If the threads cannot be terminated or if any other error occurs during the process,
-        an error message is displayed and the UI is reset to ensure the application remains in a usable state.
+        If any error occurs during the process, an error message is displayed.
         """
 
         try:
-            port = self.data[0][:-4]  # Remove "\aoX" to only get "DevX"
-            Write_Signals.reset(port)  # Reset the NI Card
+            self.paused = False
 
-            # Update buttons state
-            self.pushButton_Go.setEnabled(True)
-            self.pushButton_Stop.setEnabled(False)
+            if self.run_Thread is not None and self.run_Thread.isRunning():
+                self.pushButton_Stop.setEnabled(False)
+                self.pushButton_Pause.setEnabled(False)
+                self.run_Thread.stop()
 
-            try:
-                self.remaining_time_thread.terminate()  # Force kill the thread
-            except Exception:
-                pass
+                # The controls are enabled again by `writing_stopped`, without waiting for the card here
+                thread, port = self.run_Thread, self.data[0][:-4]  # Remove "\aoX" to only get "DevX"
+                QTimer.singleShot(STOP_TIMEOUT, lambda: self.stop_deadline(thread, port))
 
-            try:
-                self.run_Thread.terminate()  # Force kill the thread
-            except Exception:
-                pass
+            elif self.resume_sample is not None:
+                self.label_time.setText(self.label_time.text().replace("Paused", "Stopped"))
+                self.progress_done()
 
-            self.progressBar.setValue(0)  # Progress bar back to 0%
-            self.calculate_required_time()  # Show the required time
+        except Exception as e:
+            self.message('Error', f"Couldn't stop the signals : {e}")
+
+    def stop_deadline(self, thread, port):
+        """
+        Kills a `Send` thread still running STOP_TIMEOUT milliseconds after it was stopped, and resets its card.
+
+        Parameters:
+        - thread (Send): The stopped thread.
+        - port (str): The device of the card, such as "Dev1".
+        """
+
+        try:
+            if thread.isRunning():
+                thread.terminate()  # Force kill the thread
+                thread.wait()
+                Write_Signals.reset(port)  # Reset the NI Card
+                if thread is self.run_Thread:
+                    self.progress_done()
+
+        except Exception as e:
+            self.message('Error', f"Couldn't stop the signals : {e}")
+
+    def Shutdown_Signals(self):
+        """
+        Stops the signal transmission before the application quits, waiting for it unlike `Stop_Signals`.
+
+        The `Send` thread is given STOP_TIMEOUT milliseconds to stop the task of the card and park the beam. A thread
+        still running after it is killed and its card is reset, so that the card never keeps writing once the
+        application is closed.
+
+        If any error occurs during the process, an error message is displayed.
+        """
+
+        try:
+            self.paused = False
+            thread = self.run_Thread
+
+            if thread is not None and thread.isRunning():
+                thread.stop()
+                if not thread.wait(STOP_TIMEOUT):
+                    thread.terminate()  # Force kill the thread
+                    thread.wait()
+                    Write_Signals.reset(self.data[0][:-4])  # Remove "\aoX" to only get "DevX"
 
         except Exception as e:
             self.message('Error', f"Couldn't stop the signals : {e}")
@@ -439,32 +988,34 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
 
         try:
-            try:
-                self.remaining_time_thread.terminate()  # Force kill the thread
-            except Exception:
-                pass
+            self.cancel_computation()
+            self.statusbar.clearMessage()
 
-            try:
-                self.run_Thread.terminate()  # Force kill the thread
-            except Exception:
-                pass
-
-            # Stop the signals
-            if self.data is not None:
-                self.Stop_Signals()
+            # Stop the signals, the beam is parked
+            self.Stop_Signals()
 
             # Reset objects
             self.filePath = None
+            self.pattern = None
             self.Objects = None
+            self.Dose = None
+            self.map_key = None
+            self.map_preview = None
+            self.jumps = None
             self.Path = None
-            self.LR_signal = None
-            self.UD_signal = None
+            self.Signals = None
             self.data = None
-            self.remaining_time_thread = None
             self.run_Thread = None
+            self.resume_sample = None
+            self.paused = False
             self.required_time = None
             self.label_time.setText("")
             self.QPixmap_ui.clear()
+            self.signal_plot.clear()
+            self.signal_plot.hide()
+            self.QPixmap_ui.show()
+            for index in range(self.comboBox_path.count()):
+                self.comboBox_path.setItemText(index, PATH_STRATEGY_NAMES[self.comboBox_path.itemData(index)])
 
             # Switch button states
             self.pushButton_Load_image.setEnabled(True)
@@ -472,6 +1023,13 @@ class WriteWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.pushButton_Signals.setEnabled(False)
             self.pushButton_Go.setEnabled(False)
             self.pushButton_Stop.setEnabled(False)
+            self.pushButton_Pause.setEnabled(False)
+            self.pushButton_Pause.setText("Pause")
+            self.progressBar.setValue(0)
+            self.checkBox_dose.setEnabled(True)
+            self.checkBox_fill.setEnabled(False)
+            self.clear_dose_preview()
+            self.pushButton_Dose.setEnabled(False)
 
         except Exception as e:
             self.message('Error', f"Couldn't reset the device : {e}")
@@ -549,29 +1107,40 @@ class Send(QThread):
 
     This thread aims to facilitate the transmission of signal data to a hardware device, handling
     Left-Right (LR) and Up-Down (UD) signals through separate channels. It is designed to operate with
-    parameters such as signal arrays, sampling frequency, the number of iterations for the transmission,
+    parameters such as signal arrays, sampling frequency, the number of passes for the transmission,
     and the overall required time for completion. Errors during initialization or execution are communicated
     back through a custom signal.
 
+    The writing can be interrupted with `stop`, the beam is then parked and the sample reached is reported,
+    so that another thread can resume the writing from there.
+
     Attributes:
     - errorOccurred (pyqtSignal): Custom signal emitted when an error occurs, carrying an error message.
+    - progressUpdated (pyqtSignal): Emitted about 20 times per second with the index of the next sample to be
+      generated by the card, counted from the beginning of the first pass.
+    - writingStopped (pyqtSignal): Emitted at the end of the writing with the sample reached and True if every
+      pass was written.
     """
 
     errorOccurred = pyqtSignal(str)  # Signal to handle possible errors
+    progressUpdated = pyqtSignal(object)  # Sample indices can exceed 32 bits
+    writingStopped = pyqtSignal(object, bool)
 
-    def __init__(self, channel_lr, channel_ud, LR_signal, UD_signal, sampling_frequency, required_time, parent=None):
+    def __init__(self, channel_lr, channel_ud, signals, sampling_frequency, required_time, passes=1, first_sample=0,
+                 parent=None):
         """
         Initialize the thread
 
         Parameters:
         - channel_lr (str): Channel identifier for the LR signal.
         - channel_ud (str): Channel identifier for the UD signal.
-        - LR_signal (numpy.ndarray): Array representing the LR signal.
-        - UD_signal (numpy.ndarray): Array representing the UD signal.
+        - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): 2 x M array representing the LR signal (first
+          row) and the UD signal (second row), or its lazy descriptor.
         - sampling_frequency (int): Sampling frequency for the signals.
-        - iterations (int): Number of times the signals should be sent.
-        - timeout (float): Timeout for the operation, in seconds.
         - required_time (float): Total required time for the operation, intended for UI updates.
+        - passes (int or None): Number of passes regenerated by the card, None to write the signals until `stop`
+          is called.
+        - first_sample (int): Index of the first sample to write, to resume an interrupted writing.
         - parent (QObject, optional): Parent QObject for this thread. Defaults to None.
 
         Upon encountering an initialization error, this method emits an `errorOccurred` signal with
@@ -582,110 +1151,294 @@ class Send(QThread):
             super(Send, self).__init__(parent)
             self.channel_lr = channel_lr
             self.channel_ud = channel_ud
-            self.LR_signal = LR_signal
-            self.UD_signal = UD_signal
+            self.signals = signals
             self.sampling_frequency = sampling_frequency
             self.required_time = required_time
+            self.passes = passes
+            self.first_sample = first_sample
+            self.stop_event = threading.Event()
 
         except Exception as e:
             self.errorOccurred.emit(f"An error occurred while initializing the write thread : {str(e)}")
 
+    def stop(self):
+        self.stop_event.set()
+
     def run(self):
         """
-        Send signals and write them to the NI card.
+        Send signals and write them to the NI card, then park the beam if the writing was interrupted.
 
         If an error occurs during the execution of this method, an `errorOccurred` signal is emitted
         with details of the error, allowing for error handling by connected slots or signals.
         """
 
         try:
-            Write_Signals.write_signals_to_NI(self.channel_lr, self.channel_ud, self.LR_signal, self.UD_signal,
-                                              self.sampling_frequency, self.required_time + 1)
+            reached = Write_Signals.write_signals_to_NI(self.channel_lr, self.channel_ud, self.signals,
+                                                        self.sampling_frequency, self.required_time + 1,
+                                                        self.passes, self.stop_event, self.first_sample,
+                                                        self.progressUpdated.emit)
+
+            complete = self.passes is not None and reached >= self.signals.shape[1] * self.passes
+            if not complete:
+                Write_Signals.park_beam(self.channel_lr, self.channel_ud)
+            self.writingStopped.emit(reached, complete)
 
         except Exception as e:
             self.errorOccurred.emit(f"An error occurred while running the write thread : {str(e)}")
 
 
-class Remaining_Time(QThread):
+class ComputationCancelled(Exception):
+    """
+    Raised in a `Compute` thread to stop a cancelled computation.
+    """
+
+
+class Compute(QThread):
     """
-    A thread to manage and update the remaining time and progress for a long-running operation.
+    A thread computing the voltage map, the signals or the dose of the pattern, so that the window stays responsive
+    during the computation of large patterns and the user can keep adjusting the parameters.
 
-    This thread calculates and updates the remaining time for an operation based on the `required_time`
-    provided during initialization. It emits signals to update a progress bar and a time label in the UI
-    with the current progress and remaining time, respectively. When the operation completes, or the
-    remaining time runs out, it signals the completion of the progress.
+    The parameters are copied from the window when the computation starts. A cancelled computation stops at
+    its next progress report and emits nothing, the window ignoring the results of any thread but the current one.
 
     Attributes:
     - errorOccurred (pyqtSignal): Emitted when an exception is caught, with a message detailing the error.
-    - update_progress (pyqtSignal): Emitted to update the progress bar, carrying the current progress percentage.
-    - update_time (pyqtSignal): Emitted to update the remaining time label, carrying the formatted time string.
-    - progress_done (pyqtSignal): Emitted when the operation is complete or the time has fully elapsed.
+    - progressUpdated (pyqtSignal): Emitted with the progress of the computation, in percent.
+    - stageChanged (pyqtSignal): Emitted with the description of the step being computed.
+    - resultReady (pyqtSignal): Emitted with the task and a dict of its results.
     """
 
+    # Tasks of the thread
+    VOLTAGE_MAP = "voltage map"
+    SIGNALS = "signals"
+    DOSE = "dose"
+
     errorOccurred = pyqtSignal(str)  # Signal to handle possible errors
-    update_progress = pyqtSignal(int)  # Pour la mise à jour de la barre de progression
-    update_time = pyqtSignal(str)  # Pour la mise à jour du label de temps restant
-    progress_done = pyqtSignal()
+    progressUpdated = pyqtSignal(int)
+    stageChanged = pyqtSignal(str)
+    resultReady = pyqtSignal(str, object)
 
-    def __init__(self, required_time, parent=None):
+    def __init__(self, task, parameters, parent=None):
         """
-        Initialize the progress bar thread.
+        Initialize the thread
 
         Parameters:
-        - required_time(float): The total time required for the operation, in seconds.
-        - parent(QObject, optional): The parent QObject for this thread.Defaults to None.
-
-        Upon encountering an initialization error, this method emits an `errorOccurred` signal with
-        a descriptive message of the issue.
+        - task (str): Compute.VOLTAGE_MAP, Compute.SIGNALS or Compute.DOSE.
+        - parameters (dict): The parameters of the computation.
+        - parent (QObject, optional): Parent QObject for this thread. Defaults to None.
         """
 
         try:
-            super(Remaining_Time, self).__init__(parent)
-            self.required_time = required_time
+            super(Compute, self).__init__(parent)
+            self.task = task
+            self.parameters = parameters
+            self.cancelled = False
+            self.progress = None
 
         except Exception as e:
-            self.errorOccurred.emit(f"An error occurred while initializing the time thread : {str(e)}")
+            self.errorOccurred.emit(f"An error occurred while initializing the compute thread : {str(e)}")
 
-    def run(self):
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, fraction, start=0, stop=100):
         """
-        Executes the remaining time tracking logic of the thread.
+        Emits the progress of the computation when it changes, and stops the computation if it was cancelled.
 
-        Once started, this method calculates the elapsed and remaining time at frequent intervals,
-        emitting signals to update the UI with the current progress and the formatted remaining time.
-        Upon completion of the operation or when the remaining time runs out, it emits a `progress_done`
-        signal to indicate that the operation has finished.
+        Parameters:
+        - fraction (float): Fraction of the current step done.
+        - start (int): Progress at the beginning of the step, in percent.
+        - stop (int): Progress at the end of the step, in percent.
+        """
 
-        If an error occurs during the execution of this method, an `errorOccurred` signal is emitted
-        with details of the error, allowing for error handling by connected slots or signals.
+        if self.cancelled:
+            raise ComputationCancelled()
+
+        progress = int(start + fraction * (stop - start))
+        if progress != self.progress:
+            self.progress = progress
+            self.progressUpdated.emit(progress)
+
+    def store(self, key, arrays, values=None):
+        """
+        Stores results in the `Pattern_Cache`. The results can still be used if they couldn't be stored.
         """
 
         try:
-            start_time = time.time()  # Start timing for operation duration
+            Pattern_Cache.store(key, arrays, values)
+        except Exception as e:
+            self.stageChanged.emit(f"Cache unavailable : {str(e).strip()}")
+
+    def compute_voltage_map(self):
+        """
+        Computes the voltage map, the jumps of the quick beam path strategies and the preview of the map, or reads the
+        voltage map and the jumps from the `Pattern_Cache` if they were already computed for the same image.
 
-            while True:
-                elapsed_time = time.time() - start_time  # Calculate elapsed time
-                remaining_time = self.required_time - elapsed_time + 1  # Compute remaining time
+        Returns:
+        - dict: The coordinates ("objects"), their doses ("dose"), the jumps ("jumps"), the preview ("preview"),
+          the key of the voltage map in the cache ("map_key") and whether the coordinates are in the order they
+          were drawn, for an outline or a generated pattern ("drawn").
+        """
 
-                if remaining_time <= 1:  # Check if operation is complete
-                    self.update_progress.emit(100)  # Update progress bar to full
-                    self.update_time.emit("Done")  # Update label to show completion
-                    self.progress_done.emit()  # Signal that progress is done
-                    break  # Exit loop
+        parameters = self.parameters
+        sensitivity = parameters["sensitivity"]
+
+        self.stageChanged.emit("Computing the voltage map")
+        self.report(0)
+        pattern = parameters["pattern"]
+        if pattern is not None:
+            map_key = Pattern_Cache.pattern_key(*pattern, parameters["bits_number"])
+        else:
+            map_key = Pattern_Cache.voltage_map_key(parameters["file_path"], parameters["voltage_range"],
+                                                    parameters["bits_number"], parameters["dose"],
+                                                    parameters["vector_mode"])
+        cached = Pattern_Cache.load(map_key)
+
+        if cached is not None:
+            arrays, values = cached
+            objects, dose = arrays["objects"], arrays.get("dose")
+            jumps = {strategy: tuple(jump) for strategy, jump in values["jumps"].items()}
+
+        else:
+            if pattern is not None:
+                # The dwell counts of a generated pattern are doses in iterations
+                objects, dose = pattern
+            elif parameters["vector_mode"] is not None:
+                objects = Vector_Patterns.vector_to_voltage_pairs(parameters["file_path"],
+                                                                  parameters["voltage_range"], sensitivity,
+                                                                  parameters["vector_mode"])
+                dose = None
+            elif parameters["dose"]:
+                objects, dose = Image_to_Signals.Image_to_dose_map(parameters["file_path"],
+                                                                   parameters["voltage_range"], sensitivity)
+            else:
+                objects = Image_to_Signals.Image_to_voltage_pairs(parameters["file_path"],
+                                                                  parameters["voltage_range"], sensitivity)
+                dose = None
+
+            self.stageChanged.emit("Comparing the beam paths")
+            self.report(0, 10)
+            jumps = Path_Ordering.compare_strategies(objects, sensitivity, Path_Ordering.QUICK_STRATEGIES,
+                                                     lambda fraction: self.report(fraction, 10, 90))
+
+            self.store(map_key, {"objects": objects, "dose": dose},
+                       {"jumps": {strategy: [float(length), int(number)]
+                                  for strategy, (length, number) in jumps.items()}})
+
+        # Rasterize the coordinates at the size of the display, colored by dose for a dose map
+        self.stageChanged.emit("Rendering the preview")
+        self.report(0, 90)
+        width, height = Preview.preview_size(objects, parameters["preview_width"], parameters["preview_height"],
+                                             sensitivity)
+        weights = dose
+        if pattern is not None and len(dose):
+            weights = dose / max(1, dose.max())
+        preview = Preview.to_qimage(Preview.rasterize_pairs(objects, width, height, weights))
+        self.report(1)
+
+        drawn = pattern is not None or parameters["vector_mode"] == Vector_Patterns.OUTLINE
+        return {"objects": objects, "dose": dose, "jumps": jumps, "preview": preview, "map_key": map_key,
+                "drawn": drawn}
+
+    def compute_signals(self):
+        """
+        Orders the beam path, computes the dwell of every point and describes the signals. The ordered path and its
+        dwell counts are read from the `Pattern_Cache` if they were already computed for the same voltage map.
 
-                progress = int((elapsed_time / self.required_time) * 100)  # Calculate progress percentage
-                self.update_progress.emit(progress)  # Emit progress update
+        Returns:
+        - dict: The ordered coordinates ("path"), their dwell counts ("dwell"), the lazy signals ("signals"), the
+          views of the envelopes of the LR and UD signals ("views"), the strategy of the path ("strategy") and its
+          jumps ("jumps").
+        """
 
-                # Decide format for displaying remaining time
-                if remaining_time < 60:  # For less than a minute
-                    time_str = f"Remaining time :\n{int(remaining_time)} seconds"
-                else:  # For a minute or more
-                    minutes = int(remaining_time) // 60
-                    remaining_seconds = int(remaining_time) % 60
-                    time_str = f"Remaining time :\n{minutes}mn {remaining_seconds}s"
+        parameters = self.parameters
+        objects, dose, iterations = parameters["objects"], parameters["dose"], parameters["iterations"]
+
+        key = None
+        if parameters["map_key"] is not None:
+            key = Pattern_Cache.signals_key(parameters["map_key"], parameters["strategy"], iterations)
+        cached = Pattern_Cache.load(key) if key is not None else None
+
+        if cached is not None:
+            path, dwell = cached[0]["path"], cached[0]["dwell"]
+
+        else:
+            # Order the beam path with the selected strategy
+            self.stageChanged.emit("Ordering the beam path")
+            self.report(0)
+            order = Path_Ordering.path_order(objects, parameters["strategy"], parameters["sensitivity"],
+                                             lambda fraction: self.report(fraction, 0, 90))
+            path = objects[order]
+
+            # Dwell of every point, the points of a dose map receiving less than one sample are skipped
+            if dose is not None:
+                dwell = Image_to_Signals.dwell_counts(dose[order], iterations)
+                path = path[dwell > 0]
+                dwell = dwell[dwell > 0]
+            else:
+                dwell = np.full(len(path), iterations)
+
+            if key is not None:
+                self.store(key, {"path": path, "dwell": dwell}, {"total_samples": int(dwell.sum())})
+
+        self.stageChanged.emit("Generating the signals")
+        self.report(0, 90)
+
+        # The signals are generated chunk by chunk while they are written
+        signals = Image_to_Signals.pairs_to_signals(path, dwell, lazy=True)
+        views = [Decimation.EnvelopeView(path[:, 0], dwell), Decimation.EnvelopeView(path[:, 1], dwell)]
+        jumps = Path_Ordering.jump_length(path, parameters["sensitivity"])
+        self.report(1)
+
+        return {"path": path, "dwell": dwell, "signals": signals, "views": views, "strategy": parameters["strategy"],
+                "jumps": jumps}
+
+    def compute_dose(self):
+        """
+        Simulates the dose delivered by the signals, convolves it with the beam profile and renders it.
 
-                self.update_time.emit(time_str)  # Emit remaining time update
+        Returns:
+        - dict: The dose map ("dose_map") and its rendering ("preview").
+        """
 
-                time.sleep(0.001)
+        parameters = self.parameters
+
+        self.stageChanged.emit("Simulating the dose")
+        self.report(0)
+        dose_map = Dose_Simulation.simulate_signals(parameters["signals"], parameters["sensitivity"],
+                                                    progress=lambda fraction: self.report(fraction, 0, 80))
+
+        self.stageChanged.emit("Convolving with the beam profile")
+        self.report(0, 80)
+        dose_map = Dose_Simulation.gaussian_blur(dose_map, parameters["sigma"])
+
+        self.report(0, 95)
+        preview = Preview.to_qimage(Preview.dose_image(dose_map.dose))
+        self.report(1)
+
+        return {"dose_map": dose_map, "preview": preview}
+
+    def run(self):
+        """
+        Runs the computation and emits its results, unless it was cancelled.
+
+        If an error occurs during the execution of this method, an `errorOccurred` signal is emitted
+        with details of the error, allowing for error handling by connected slots or signals.
+        """
+
+        try:
+            if self.task == self.VOLTAGE_MAP:
+                result = self.compute_voltage_map()
+            elif self.task == self.SIGNALS:
+                result = self.compute_signals()
+            else:
+                result = self.compute_dose()
+
+            if not self.cancelled:
+                self.resultReady.emit(self.task, result)
 
         except Exception as e:
-            self.errorOccurred.emit(f"An error occurred while running the time thread : {str(e)}")
+            # The modules wrap the exceptions, a cancelled computation is recognized by its flag
+            if not self.cancelled:
+                self.errorOccurred.emit(f"An error occurred while computing the {self.task} : {str(e)}")
+
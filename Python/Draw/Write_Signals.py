@@ -1,46 +1,26 @@
-import nidaqmx
-from nidaqmx.constants import AcquisitionType
-from nidaqmx.stream_writers import AnalogMultiChannelWriter
+import queue
+import threading
+import time
+from nidaqmx.constants import AcquisitionType, RegenerationMode
 import numpy as np
+from Modules_FIB import Daq_Backend
+from Modules_FIB import Ni_Dependencies as NID
 
+# Number of chunks held by the output buffer of a streamed pattern, and by the queue of the producer thread
+STREAM_BUFFER_CHUNKS = 4
+STREAM_QUEUE_CHUNKS = 4
 
-def config_task(task, channel_lr, channel_ud, signal_lr, signal_ud, sampling_frequency):
-    """
-    Configures a NI-DAQmx task for writing voltage signals to specified channels.
-
-    This function sets up a DAQmx task to output analog voltage signals on two channels,
-    typically representing Left-Right (LR) and Up-Down (UD) movements. It configures the
-    channels for voltage output within a specified range and sets the sampling frequency
-    for the signals. Finally, it writes the provided signal arrays to the channels.
-
-    Parameters:
-    - task (nidaqmx.Task): The DAQmx Task to be configured for analog output.
-    - channel_lr (str): The name of the channel for outputting the LR signal.
-    - channel_ud (str): The name of the channel for outputting the UD signal.
-    - signal_lr (numpy.ndarray): The array containing the LR signal data.
-    - signal_ud (numpy.ndarray): The array containing the UD signal data.
-    - sampling_frequency (int): The frequency at which the signals should be sampled and output.
-
-    Raises:
-    - Exception: If an error occurs during task configuration or signal writing, an exception
-      is raised with a message detailing the failure.
-    """
+# Largest pass regenerated by the card, larger passes are streamed again for every pass
+REGENERATION_MAX_SAMPLES = 2 ** 24
 
-    try:
-        # Configure the channels
-        task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=-10, max_val=10)
-        task.ao_channels.add_ao_voltage_chan(channel_ud, min_val=-10, max_val=10)
-        task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.FINITE, samps_per_chan=len(signal_lr))
-        data_to_write = np.array([signal_lr, signal_ud])
-
-        # Create a StreamWriter for the analog outputs
-        writer = AnalogMultiChannelWriter(task.out_stream)
+# Period in seconds at which the number of generated samples is read while a pattern is written
+PROGRESS_PERIOD = 0.05
 
-        # Write both signals at the same time
-        writer.write_many_sample(data_to_write)
-
-    except Exception as e:
-        raise Exception(f"\nCouldn't configure the writing task : {e}")
+# Voltages of the beam while the writing is paused or aborted, set by the "park_voltages" entry of config.json.
+# The default is a corner of the deflection field, which is still on the sample: the position of a Faraday cup or of
+# an area of the sample which can be damaged should be configured instead
+DEFAULT_PARK_VOLTAGES = (-10.0, -10.0)
+park_voltages = DEFAULT_PARK_VOLTAGES
 
 
 def reset(port):
@@ -60,44 +40,458 @@ def reset(port):
     """
 
     try:
+        # The pooled scanning tasks don't survive the reset
+        NID.clear_task_pool()
+
         # Communicate and reset the device
-        device = nidaqmx.system.System.local().devices[port]
+        device = Daq_Backend.get_backend().system().devices[port]
         device.reset_device()
 
     except Exception as e:
         raise Exception(f"\nCouldn't reset the card : {e}")
 
 
-def write_signals_to_NI(channel_lr, channel_ud, signal_lr, signal_ud, sampling_frequency, required_time):
+def set_park_voltages(voltages):
+    """
+    Sets the position of the beam while the writing is paused or aborted.
+
+    Parameters:
+    - voltages (sequence of float): The LR and UD voltages of the position, between -10 V and 10 V.
+
+    Raises:
+    - Exception: If the voltages aren't a pair of voltages within the range of the outputs.
+    """
+
+    global park_voltages
+
+    try:
+        lr, ud = (float(voltage) for voltage in voltages)
+        if not (-10 <= lr <= 10 and -10 <= ud <= 10):
+            raise ValueError(f"{lr} V, {ud} V is outside of the range of the outputs (-10 V to 10 V)")
+        park_voltages = (lr, ud)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't set the park voltages : {e}")
+
+
+def park_beam(channel_lr, channel_ud, voltages=None):
+    """
+    Moves the beam to the park position, away from the pattern, once the writing is interrupted.
+
+    Parameters:
+    - channel_lr (str): The name of the channel of the LR signal.
+    - channel_ud (str): The name of the channel of the UD signal.
+    - voltages (tuple of float, optional): The LR and UD voltages of the position, `park_voltages` by default.
+
+    Raises:
+    - Exception: If the voltages couldn't be applied, with a message detailing the failure.
+    """
+
+    try:
+        if voltages is None:
+            voltages = park_voltages
+        with Daq_Backend.get_backend().Task() as task:
+            task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=-10, max_val=10)
+            task.ao_channels.add_ao_voltage_chan(channel_ud, min_val=-10, max_val=10)
+            task.write([float(voltages[0]), float(voltages[1])], auto_start=True)
+            task.stop()
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't park the beam : {e}")
+
+
+def write_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time, passes=1,
+                        stop_event=None, first_sample=0, progress=None):
     """
         Writes voltage signals to the NI-DAQmx card using specified channels.
 
         This function creates and configures a DAQmx task to write analog voltage signals for Left-Right (LR) and Up-Down (UD) movements to specified channels. It controls the timing and duration of the signal output based on the provided sampling frequency and the required operation time. The function handles task setup, execution, and teardown to ensure that the signals are output correctly.
+        Signals longer than the buffer of a streamed pattern are written with `stream_signals_to_NI`.
+        Several passes of the same signals are written once and regenerated by the card with
+        `regenerate_signals_to_NI`, passes too large to be regenerated are streamed again for every pass.
+
+        The writing can be interrupted at any time with 'stop_event', and resumed later from the sample it reached
+        with 'first_sample'.
 
         Parameters:
         - channel_lr (str): The name of the channel for outputting the LR signal.
         - channel_ud (str): The name of the channel for outputting the UD signal.
-        - signal_lr (numpy.ndarray): The array containing the LR signal data.
-        - signal_ud (numpy.ndarray): The array containing the UD signal data.
+        - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The 2 x M array containing the LR and UD
+          signals of one pass, or its lazy descriptor.
         - sampling_frequency (int): The frequency at which the signals should be sampled and output.
         - required_time (float): The maximum duration in seconds to wait for the task to complete before stopping.
+        - passes (int or None): Number of passes, None to write the signals again and again until 'stop_event' is set.
+        - stop_event (threading.Event, optional): Interrupts the writing.
+        - first_sample (int): Index of the first sample to write, counted from the beginning of the first pass.
+        - progress (callable, optional): Called every PROGRESS_PERIOD seconds with the index of the next sample to be
+          generated, counted like 'first_sample'.
+
+        Returns:
+        - int: The index of the sample following the last generated one, the total number of samples of the passes
+          if the writing wasn't interrupted.
 
         Raises:
         - Exception: If any part of the signal writing process fails, an exception is raised with a detailed error message.
         """
 
     try:
-        with nidaqmx.Task() as task:
-            config_task(task, channel_lr, channel_ud, signal_lr, signal_ud, sampling_frequency)
+        # Several passes of a pattern are regenerated by the card from a single pass
+        if passes != 1:
+            if signals.shape[1] <= REGENERATION_MAX_SAMPLES:
+                return regenerate_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time,
+                                                passes, stop_event, first_sample, progress)
+            if passes is None:
+                raise ValueError(f"A pass of {signals.shape[1]} samples is too large to be written until stopped, "
+                                 f"the card regenerates passes of at most {REGENERATION_MAX_SAMPLES} samples")
+
+        # Patterns larger than the output buffer of a streamed pattern are generated chunk by chunk
+        chunk_samples = stream_chunk_samples(sampling_frequency)
+        if passes != 1 or signals.shape[1] - first_sample > STREAM_BUFFER_CHUNKS * chunk_samples:
+            statistics = stream_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time,
+                                              chunk_samples, passes, stop_event, first_sample, progress)
+            return statistics["generated"]
+
+        # A single pass fitting in the buffer is a finite generation of this buffer
+        return regenerate_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time, 1,
+                                        stop_event, first_sample, progress)
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't write the signals to the card : {e}")
+
+
+def signal_block(signals, start, stop):
+    """
+    Block of samples of both signals.
+
+    Parameters:
+    - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The 2 x M signals or their lazy descriptor.
+    - start (int): Index of the first sample of the block.
+    - stop (int): Index following the last sample of the block.
+
+    Returns:
+    - numpy.ndarray: A C-contiguous float64 block of shape (2, stop - start).
+    """
+
+    if hasattr(signals, "chunk"):
+        return signals.chunk(start, stop)
+    return np.ascontiguousarray(signals[:, start:stop], dtype=np.float64)
+
+
+def pass_buffer(signals, offset, samples):
+    """
+    Samples of a pass starting at 'offset' and wrapping around to the beginning of the pass, so that regenerating
+    this buffer continues the passes from any of their samples.
+
+    Parameters:
+    - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The signals of one pass.
+    - offset (int): Index of the first sample of the buffer in the pass.
+    - samples (int): Number of samples of the buffer, at most one pass.
+
+    Returns:
+    - numpy.ndarray: A C-contiguous float64 array of shape (2, samples).
+    """
+
+    pass_samples = signals.shape[1]
+    if offset == 0 and samples == pass_samples and hasattr(signals, "materialize"):
+        return signals.materialize()
+
+    end = offset + samples
+    if end <= pass_samples:
+        return signal_block(signals, offset, end)
+    return np.concatenate((signal_block(signals, offset, pass_samples), signal_block(signals, 0, end - pass_samples)),
+                          axis=1)
+
+
+def wait_for_generation(task, total_samples, required_time, stop_event=None, progress=None):
+    """
+    Waits for an output task to generate its samples, reading the number of generated samples every
+    PROGRESS_PERIOD seconds instead of blocking in task.wait_until_done, then stops the task.
+
+    Parameters:
+    - task (nidaqmx.Task): The started output task.
+    - total_samples (int or None): Number of samples of a finite generation, None for a continuous one.
+    - required_time (float): The maximum duration in seconds of a finite generation.
+    - stop_event (threading.Event, optional): Stops the generation before its end, required for a continuous one.
+    - progress (callable, optional): Called with the number of samples generated.
+
+    Returns:
+    - int: The number of samples generated when the task was stopped.
+    """
+
+    deadline = time.perf_counter() + required_time if total_samples is not None else None
+
+    while True:
+        if progress is not None:
+            progress(task.out_stream.total_samp_per_chan_generated)
+
+        if total_samples is not None and task.is_task_done():
+            break
+        if stop_event is not None and stop_event.is_set():
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError(f"The generation didn't end within {required_time:.1f} s")
+
+        if stop_event is not None:
+            stop_event.wait(PROGRESS_PERIOD)
+        else:
+            time.sleep(PROGRESS_PERIOD)
+
+    # The number of samples generated is still available once the task is stopped, it is the exact position
+    # reached by the beam
+    task.stop()
+    generated = task.out_stream.total_samp_per_chan_generated
+    if progress is not None:
+        progress(generated)
+
+    return generated
+
+
+def regenerate_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time, passes,
+                             stop_event=None, first_sample=0, progress=None):
+    """
+    Writes several passes of the same signals, the card regenerating its output buffer instead of the host writing
+    every pass.
+
+    Only one pass is written to the output buffer, whatever the number of passes: a finite generation of
+    'passes' times the samples of a pass regenerates the buffer until it ends, a continuous generation regenerates
+    it until 'stop_event' is set. The memory used and the time spent writing the buffer don't depend on the number
+    of passes. To resume the passes from 'first_sample', the buffer starts at this sample of its pass and wraps
+    around to the beginning of the pass.
+
+    Parameters:
+    - channel_lr (str): The name of the channel for outputting the LR signal.
+    - channel_ud (str): The name of the channel for outputting the UD signal.
+    - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The 2 x M array containing the LR and UD
+      signals of one pass, or its lazy descriptor.
+    - sampling_frequency (int): The frequency at which the signals should be sampled and output.
+    - required_time (float): The maximum duration in seconds to wait for the passes to be generated.
+    - passes (int or None): Number of passes, None to regenerate the buffer until 'stop_event' is set.
+    - stop_event (threading.Event, optional): Stops the generation, required without a number of passes.
+    - first_sample (int): Index of the first sample to write, counted from the beginning of the first pass.
+    - progress (callable, optional): Called with the index of the next sample to be generated.
+
+    Returns:
+    - int: The index of the sample following the last generated one.
+
+    Raises:
+    - Exception: If the generation fails, with a message detailing the failure.
+    """
+
+    try:
+        if passes is None and stop_event is None:
+            raise ValueError("A generation without a number of passes needs a stop event")
+
+        pass_samples = signals.shape[1]
+        offset = first_sample % pass_samples if pass_samples else 0
+        remaining = None if passes is None else pass_samples * passes - first_sample
+        buffer_samples = pass_samples if remaining is None else min(pass_samples, remaining)
+        if buffer_samples <= 0:
+            return first_sample
+
+        # The pooled scanning tasks reserve the same channels
+        NID.clear_task_pool()
+
+        backend = Daq_Backend.get_backend()
+        with backend.Task() as task:
+            task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=-10, max_val=10)
+            task.ao_channels.add_ao_voltage_chan(channel_ud, min_val=-10, max_val=10)
+            if passes is None:
+                task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.CONTINUOUS,
+                                                samps_per_chan=buffer_samples)
+            else:
+                task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.FINITE,
+                                                samps_per_chan=remaining)
+
+            # The buffer holds at most one pass, regenerated by the card
+            task.out_stream.regen_mode = RegenerationMode.ALLOW_REGENERATION
+            task.out_stream.output_buf_size = buffer_samples
+            backend.AnalogMultiChannelWriter(task.out_stream).write_many_sample(
+                pass_buffer(signals, offset, buffer_samples))
 
-            # Start the task
             task.start()
 
-            # Wait for the task to end
-            task.wait_until_done(timeout=required_time)
+            generated = wait_for_generation(task, remaining, required_time, stop_event,
+                                            None if progress is None else lambda samples: progress(first_sample + samples))
 
-            # Stop the task
-            task.stop()
+        return first_sample + generated
 
     except Exception as e:
-        raise Exception(f"\nCouldn't write the signals to the card : {e}")
+        raise Exception(f"\nCouldn't regenerate the signals on the card : {e}")
+
+
+def stream_chunk_samples(sampling_frequency):
+    """
+    Number of samples per chunk of a streamed pattern, like the chunks of a streamed acquisition.
+
+    Parameters:
+    - sampling_frequency (int): The frequency at which the signals are output.
+
+    Returns:
+    - int: The number of samples per channel of a chunk.
+    """
+
+    return max(1, min(NID.STREAM_CHUNK_SAMPLES, int(sampling_frequency * NID.STREAM_CHUNK_SECONDS)))
+
+
+def signal_chunks(signals, chunk_samples, passes=1, first_sample=0):
+    """
+    Generator yielding consecutive blocks of samples of both signals.
+
+    Parameters:
+    - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The 2 x M signals or their lazy descriptor.
+    - chunk_samples (int): Number of samples per channel of each block (the last one of a pass can be shorter).
+    - passes (int): Number of times the signals are generated.
+    - first_sample (int): Index of the first sample, counted from the beginning of the first pass.
+
+    Yields:
+    - numpy.ndarray: C-contiguous float64 blocks of shape (2, samples).
+    """
+
+    pass_samples = signals.shape[1]
+    sample = first_sample
+
+    while sample < pass_samples * passes:
+        offset = sample % pass_samples
+        stop = min(offset + chunk_samples, pass_samples)
+        yield signal_block(signals, offset, stop)
+        sample += stop - offset
+
+
+def stream_signals_to_NI(channel_lr, channel_ud, signals, sampling_frequency, required_time, chunk_samples=None,
+                         passes=1, stop_event=None, first_sample=0, progress=None):
+    """
+    Writes voltage signals of any length to the NI-DAQmx card, streaming them chunk by chunk.
+
+    The output task doesn't regenerate its buffer, which only holds a few chunks: a producer thread generates the
+    next chunks from the signals (or from their lazy descriptor, so the complete signals never exist in memory)
+    while this function writes them as soon as the card has room for them. Before each write, the number of
+    samples still waiting in the buffer is checked, so an underflow (the generation catching up with the written
+    samples) is detected and reported instead of silently outputting a wrong pattern.
+
+    Parameters:
+    - channel_lr (str): The name of the channel for outputting the LR signal.
+    - channel_ud (str): The name of the channel for outputting the UD signal.
+    - signals (numpy.ndarray or Image_to_Signals.RepeatedSignals): The 2 x M array containing the LR and UD
+      signals, or its lazy descriptor.
+    - sampling_frequency (int): The frequency at which the signals should be sampled and output.
+    - required_time (float): The maximum duration in seconds to wait for the task to complete before stopping.
+    - chunk_samples (int, optional): Number of samples per chunk, 'stream_chunk_samples' by default.
+    - passes (int): Number of times the signals are generated, for passes too large to be regenerated by the card.
+    - stop_event (threading.Event, optional): Interrupts the generation.
+    - first_sample (int): Index of the first sample to write, counted from the beginning of the first pass.
+    - progress (callable, optional): Called at most every PROGRESS_PERIOD seconds with the index of the next
+      sample to be generated.
+
+    Returns:
+    - dict: Statistics of the generation: "written" samples, "min_buffered" (smallest number of samples left in
+      the buffer before a write once the task started), "underflows" (number of times the buffer was empty) and
+      "generated" (index of the sample following the last generated one, counted like 'first_sample').
+
+    Raises:
+    - Exception: If the generation fails, with the number of samples written and the underflows detected.
+    """
+
+    total_samples = signals.shape[1] * passes - first_sample
+    if chunk_samples is None:
+        chunk_samples = stream_chunk_samples(sampling_frequency)
+    buffer_samples = min(total_samples, STREAM_BUFFER_CHUNKS * chunk_samples)
+    write_timeout = buffer_samples / sampling_frequency + 10
+
+    statistics = {"written": 0, "min_buffered": buffer_samples, "underflows": 0, "generated": first_sample}
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    stop_event = stop_event if stop_event is not None else threading.Event()
+    producer_stop = threading.Event()
+
+    def put(item):
+        # Waits for room in the queue, giving up once the writing loop is over so the producer never blocks
+        while not producer_stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        # Generates the chunks in advance, an exception is forwarded to the writing loop
+        try:
+            for chunk in signal_chunks(signals, chunk_samples, passes, first_sample):
+                if not put(chunk):
+                    return
+            put(None)
+        except Exception as producer_error:
+            put(producer_error)
+
+    def next_chunk():
+        chunk = chunks.get()
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
+
+    def report(generated):
+        statistics["generated"] = first_sample + generated
+        if progress is not None:
+            progress(first_sample + generated)
+
+    producer = threading.Thread(target=produce, name="Pattern producer", daemon=True)
+
+    try:
+        if total_samples <= 0:
+            return statistics
+
+        # The pooled scanning tasks reserve the same channels
+        NID.clear_task_pool()
+
+        backend = Daq_Backend.get_backend()
+        with backend.Task() as task:
+            task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=-10, max_val=10)
+            task.ao_channels.add_ao_voltage_chan(channel_ud, min_val=-10, max_val=10)
+            task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.FINITE,
+                                            samps_per_chan=total_samples)
+            task.out_stream.regen_mode = RegenerationMode.DONT_ALLOW_REGENERATION
+            task.out_stream.output_buf_size = buffer_samples
+            writer = backend.AnalogMultiChannelWriter(task.out_stream)
+
+            producer.start()
+
+            # Fill the buffer before starting the generation
+            chunk = next_chunk()
+            while (chunk is not None and statistics["written"] + chunk.shape[1] <= buffer_samples
+                   and not stop_event.is_set()):
+                writer.write_many_sample(chunk, timeout=write_timeout)
+                statistics["written"] += chunk.shape[1]
+                chunk = next_chunk()
+
+            if stop_event.is_set():
+                return statistics
+
+            task.start()
+
+            # Feed the buffer while the card generates the samples
+            last_report = time.perf_counter()
+            while chunk is not None and not stop_event.is_set():
+                generated = task.out_stream.total_samp_per_chan_generated
+                buffered = statistics["written"] - generated
+                statistics["min_buffered"] = min(statistics["min_buffered"], buffered)
+                if buffered <= 0:
+                    statistics["underflows"] += 1
+
+                if time.perf_counter() - last_report >= PROGRESS_PERIOD:
+                    report(generated)
+                    last_report = time.perf_counter()
+
+                writer.write_many_sample(chunk, timeout=write_timeout)
+                statistics["written"] += chunk.shape[1]
+                chunk = next_chunk()
+
+            # Wait for the last samples to be generated, or stop at once if interrupted
+            report(wait_for_generation(task, total_samples, required_time, stop_event, report))
+
+        return statistics
+
+    except Exception as e:
+        raise Exception(f"\nCouldn't stream the signals to the card ({statistics['written']} of {total_samples} "
+                        f"samples written, {statistics['underflows']} underflow(s) detected) : {e}")
+
+    finally:
+        producer_stop.set()
@@ -1,17 +1,20 @@
 import sys
 from PyQt6 import QtCore, QtWidgets, uic
-from PyQt6.QtGui import QImage, QPixmap
-from PyQt6.QtCore import Qt
 import warnings
 from Modules_FIB import Ni_Dependencies
+from Modules_FIB import Daq_Backend
 from Modules_FIB import Visa_Dependencies
 from Modules_FIB import Source_Lenses
+from Modules_FIB import Signal_Inspector
+from Modules_FIB import Image_View
+from Modules_FIB import ImageProcessing
 import numpy as np
 from PIL import Image
 import json
 from math import ceil
 from Modules_FIB import Thread
 import Draw
+from Draw import Write_Signals
 
 # Ignores the ResourceWarnings made by PyVISA library
 warnings.simplefilter("ignore", ResourceWarning)
@@ -53,6 +56,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.pushButton_connect_gpp_4323.clicked.connect(self.connect_to_gpp_4323)
             self.pushButton_connect_gpp_4323_help.clicked.connect(self.gpp_4323_help)
             self.pushButton_sweep.clicked.connect(self.sweep)
+            self.pushButton_abort_sweep.clicked.connect(self.abort_sweep)
+            self.pushButton_inspect_signal.clicked.connect(self.inspect_signal)
             self.pushButton_save_image.clicked.connect(self.save_image)
             self.pushButton_load_config.clicked.connect(self.load_config)
             self.pushButton_save_config.clicked.connect(self.save_config)
@@ -80,6 +85,13 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.progressBarThread = None
             self.currentImage = None
             self.video_thread = None
+            self.video_timer = QtCore.QTimer(self)  # Pulls the newest frame of the video at the refresh rate
+            self.video_timer.timeout.connect(self.video_refresh)
+            self.video_images = None  # Images wrapping the frames of the video
+            self.partial_image = None  # Raw values of the rows received during a sweep
+            self.partial_range = None  # Minimum and maximum of the rows received during a sweep
+            self.partial_normalizer = ImageProcessing.Normalizer()  # Maps the rows to the range of the partial image
+            self.raw_signal = None  # Raw samples of the last recorded sweep
 
             # Initialize the comboBoxes
             self.populate_dev_combobox()
@@ -95,6 +107,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             # Initialize the connections window
             self.Source_Lenses = Source_Lenses.Window()
 
+            # Initialize the raw signal inspector
+            self.signal_inspector = Signal_Inspector.SignalInspector()
+
         except Exception as e:
             self.message('Error', f"Failed during the initialisation process : {e}")
 
@@ -132,14 +147,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def quit(self):
         """
         Function to quit the application safely.
-        Disconnects from the power supply if connected before exiting.
+        Waits for the writing to stop and disconnects from the power supply if connected before exiting.
         """
 
         try:
+            self.WriteWindow.Shutdown_Signals()
             if self.gpp_power_supply is not None:
                 self.gpp_power_supply.disconnect()
+            Ni_Dependencies.clear_task_pool()
             self.Source_Lenses.stop()
-            self.WriteWindow.Stop_Signals()
             QtCore.QCoreApplication.instance().quit()
 
         except Exception as e:
@@ -201,6 +217,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
 
         try:
+            Ni_Dependencies.clear_task_pool()  # The pooled tasks belong to the previous device
             self.port_dev = self.comboBox_dev.currentText()
             system = Ni_Dependencies.ni_cards_system()
             if (not self.comboBox_dev.currentText() in system.devices) or (
@@ -346,9 +363,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 # Sweep signal generation in a thread
                 self.sweep_thread = Thread.SweepThread(time_per_pixel, sampling_frequency, pixels_number,
                                                        channel_lr,
-                                                       channel_ud, channel_read, mode)
+                                                       channel_ud, channel_read, mode,
+                                                       self.checkBox_record_signal.isChecked())
                 self.sweep_thread.errorOccurred.connect(self.handle_thread_errors)
                 self.sweep_thread.image.connect(self.image_display)
+                self.sweep_thread.rows.connect(self.image_rows_display)
+                self.sweep_thread.finished.connect(self.sweep_done)
                 self.sweep_thread.finished.connect(self.thread_cleanup)
 
                 self.progressBarThread = Thread.ProgressBar(time_per_pixel, pixels_number)
@@ -356,12 +376,61 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 self.progressBarThread.errorOccurred.connect(self.handle_thread_errors)
                 self.progressBarThread.finished.connect(self.thread_cleanup)
 
+                self.partial_image = None
                 self.sweep_thread.start()
                 self.progressBarThread.start()
 
+                # Change buttons states
+                self.pushButton_sweep.setEnabled(False)
+                self.pushButton_abort_sweep.setEnabled(True)
+
             except Exception as e:
                 self.message('Error', f"An error occurred during the sweep process : {e}")
 
+    # Aborts the sweep in progress
+    def abort_sweep(self):
+        """
+        Aborts the sweep in progress. The rows already acquired stay displayed.
+        """
+
+        try:
+            self.sweep_thread.abort()
+            self.progressBarThread.stop()
+
+        except Exception as e:
+            self.message('Error', f"Couldn't abort the sweep : {e}")
+
+    # Called when the sweep thread is finished, whether the sweep is complete or not
+    def sweep_done(self):
+        """
+        Restores the buttons states at the end of a sweep.
+        """
+
+        self.pushButton_sweep.setEnabled(True)
+        self.pushButton_abort_sweep.setEnabled(False)
+
+        # Keep the raw samples of a recorded sweep, even aborted
+        if self.sweep_thread is not None and self.sweep_thread.raw_signal is not None:
+            self.raw_signal = (self.sweep_thread.raw_signal, self.sweep_thread.sampling_frequency,
+                               self.sweep_thread.raw_samples_per_row)
+            self.pushButton_inspect_signal.setEnabled(True)
+
+    # Shows the raw samples of the last recorded sweep
+    def inspect_signal(self):
+        """
+        Opens the raw signal inspector with the samples recorded during the last sweep.
+        """
+
+        try:
+            if self.raw_signal is not None:
+                signal, sampling_frequency, samples_per_row = self.raw_signal
+                self.signal_inspector.set_signal(signal, sampling_frequency, samples_per_row)
+                self.signal_inspector.show()
+                self.signal_inspector.raise_()
+
+        except Exception as e:
+            self.message('Error', f"Couldn't inspect the signal : {e}")
+
     # If an error occurred in any thread, we display it to the user
     def handle_thread_errors(self, error_message):
         """
@@ -417,11 +486,17 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
                 self.video_thread = Thread.VideoThread(time_per_pixel, sampling_frequency, pixels_number, channel_lr,
                                                        channel_ud, channel_read)
-                self.video_thread.image.connect(self.video_display)
+                self.video_thread.latencyUpdated.connect(self.video_latency)
                 self.video_thread.errorOccurred.connect(self.handle_thread_errors)
+                self.video_thread.finished.connect(self.video_timer.stop)
                 self.video_thread.finished.connect(self.thread_cleanup)
+                self.video_images = [Image_View.wrap_array(frame) for frame in self.video_thread.frames.frames]
                 self.video_thread.start()
 
+                # Display the frames at the refresh rate of the screen
+                refresh_rate = self.screen().refreshRate() or 60
+                self.video_timer.start(max(1, int(1000 / refresh_rate)))
+
                 # Change buttons states
                 self.pushButton_start_video.setEnabled(False)
                 self.pushButton_stop_video.setEnabled(True)
@@ -458,50 +533,83 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def image_display(self, np_image):
         """
         Function to display the image in the interface.
-        Normalizes the values and updates the QPixmap with the new image.
+        Copies the image into the persistent buffer of its resolution, which the view paints scaled.
 
         Args:
         image (numpy.ndarray): List of pixel values to be displayed.
         """
 
         try:
-            pixels_number = self.spinBox_image_size.value()
-
             self.currentImage = np_image  # Useful to save the image
-            stride = pixels_number  # Number of bytes per line for a grayscale image
-            q_image = QImage(np_image.data, pixels_number, pixels_number, stride, QImage.Format.Format_Grayscale8)
-            pixmap = QPixmap.fromImage(q_image)
-            pixmap = pixmap.scaled(self.QPixmap_ui.width(), self.QPixmap_ui.height(),
-                                   Qt.AspectRatioMode.KeepAspectRatio)
-            self.QPixmap_ui.setPixmap(pixmap)
-            self.repaint()
+            np.copyto(self.QPixmap_ui.buffer(np_image.shape), np_image, casting="unsafe")
+            self.QPixmap_ui.show_buffer(np_image.shape)
 
         except Exception as e:
             self.message('Error', f" Couldn't display the image : {e}")
 
-    def video_display(self, np_image):
+    def image_rows_display(self, first_row, rows):
         """
-        Function to display the image in the interface in case of video scanning.
-        Normalizes the values and updates the QPixmap with the new image.
+        Function to display the rows of the image while they are acquired during a sweep.
+        The rows received so far are normalized together, straight into the buffer of the view, and the rows not
+        acquired yet are left black.
 
         Args:
-        image (numpy.ndarray): List of pixel values to be displayed.
+        first_row (int): Index of the first received row in the image.
+        rows (numpy.ndarray): Raw values of the received rows.
         """
 
         try:
-            pixels_number = self.video_resolution
+            pixels_number = self.spinBox_image_size.value()
+            shape = (pixels_number, pixels_number)
+
+            # First rows of a new image
+            if self.partial_image is None or self.partial_image.shape != shape:
+                self.partial_image = np.zeros(shape)
+                self.partial_range = [rows.min(), rows.max()]
 
-            stride = pixels_number  # Number of bytes per line for a grayscale image
-            q_image = QImage(np_image.data, pixels_number, pixels_number, stride, QImage.Format.Format_Grayscale8)
+            last_row = first_row + len(rows)
+            self.partial_image[first_row:last_row] = rows
+            self.partial_range = [min(self.partial_range[0], rows.min()), max(self.partial_range[1], rows.max())]
 
-            pixmap = QPixmap.fromImage(q_image)
-            pixmap = pixmap.scaled(self.QPixmap_ui.width(), self.QPixmap_ui.height(),
-                                   Qt.AspectRatioMode.KeepAspectRatio)
-            self.QPixmap_ui.setPixmap(pixmap)
-            self.repaint()
+            # Normalize the received rows between 0 and 255
+            display = self.QPixmap_ui.buffer(shape)
+            display[last_row:] = 0
+            self.partial_normalizer.set_levels(*self.partial_range)
+            self.partial_normalizer(self.partial_image[:last_row], display[:last_row])
+
+            self.currentImage = display
+            self.QPixmap_ui.show_buffer(shape)
 
         except Exception as e:
-            self.message('Error', f" Couldn't display the image : {e}")
+            self.message('Error', f" Couldn't display the rows : {e}")
+
+    def video_refresh(self):
+        """
+        Displays the newest frame of the video, called at the refresh rate of the screen. Nothing is done if no
+        new frame was processed since the last refresh, and the frames processed in between are dropped. The frame
+        is painted from its slot of the frame ring, which stays reserved until the next frame is pulled.
+        """
+
+        if self.video_thread is None or not self.video_thread.isRunning():
+            return
+
+        frame = self.video_thread.frames.pull()
+        if frame is not None:
+            slot, processed = frame
+            self.QPixmap_ui.show_image(self.video_images[slot], self.video_thread.frames.frames[slot])
+            self.video_thread.frame_displayed(processed)
+
+    def video_latency(self, report):
+        """
+        Shows the latency of the stages of the video in the status bar.
+
+        Args:
+        report (dict): The latency of every stage in milliseconds, the frames per second and the dropped frames.
+        """
+
+        stages = ", ".join(f"{stage} {report[stage]:.1f} ms" for stage in Thread.VideoLatency.STAGES
+                           if report[stage] is not None)
+        self.statusbar.showMessage(f"Video : {report['fps']:.1f} fps, {stages}, {report['dropped']} dropped")
 
     # Save the image
     def save_image(self):
@@ -575,7 +683,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 "channel_ud": self.comboBox_vs.currentText(),
                 "channel_read": self.comboBox_sensor.currentText(),
                 "port_dev": self.comboBox_dev.currentText(),
-                "gpp_power_supply": self.comboBox_gpp_4323.currentText()
+                "gpp_power_supply": self.comboBox_gpp_4323.currentText(),
+                "daq_backend": Daq_Backend.get_backend().name,
+                "park_voltages": list(Write_Signals.park_voltages)
             }
 
             # Saves into a json file
@@ -590,6 +700,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
         Function to load configuration from a JSON file.
         Reads 'config.json' and updates the UI elements with stored values.
+        The optional "daq_backend" entry selects a real card ("nidaqmx") or the simulator ("simulated"),
+        configured by the optional "simulation" entry (noise, lag_samples, realtime, specimen, seed).
+        The optional "park_voltages" entry, [LR, UD] in volts, is the position of the beam while a writing is paused
+        or aborted: a Faraday cup or an area of the sample which can be damaged, the corner of the field by default.
         """
 
         try:
@@ -597,6 +711,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             with open('config.json', 'r') as config_file:
                 config = json.load(config_file)
 
+            # Selects the card backend ("nidaqmx" or "simulated") and lists its devices
+            if "daq_backend" in config:
+                Ni_Dependencies.clear_task_pool()
+                Daq_Backend.select_backend(config["daq_backend"], config.get("simulation"))
+                self.populate_dev_combobox()
+
+            # Position of the beam while a writing is paused or aborted
+            Write_Signals.set_park_voltages(config.get("park_voltages", Write_Signals.DEFAULT_PARK_VOLTAGES))
+
             # Updates the UI
             self.spinBox_time_per_pixel.setValue(config.get("time_per_pixel", 0))
             self.spinBox_sampling_frequency.setValue(config.get("sampling_frequency", 0))
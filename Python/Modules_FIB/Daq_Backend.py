@@ -0,0 +1,110 @@
+import os
+
+# Environment variable used to choose the backend without a configuration file (ex: FIB_DAQ_BACKEND=simulated)
+BACKEND_ENVIRONMENT_VARIABLE = "FIB_DAQ_BACKEND"
+
+# Names of the available backends
+BACKENDS = ("nidaqmx", "simulated")
+
+# Backend currently used by the application
+_backend = None
+
+
+class NidaqmxBackend:
+    """
+    Backend forwarding every call to the nidaqmx library, used with a real NI card.
+
+    A backend exposes the small part of the nidaqmx API used by the application: the Task class, the stream
+    writers and readers, and access to the local system and its devices. Every module talking to the card goes
+    through the selected backend, so the card can be replaced by a software simulation.
+    """
+
+    name = "nidaqmx"
+
+    def __init__(self):
+        """
+        Imports nidaqmx and binds its classes to the backend.
+        """
+
+        try:
+            import nidaqmx
+            from nidaqmx import stream_writers, stream_readers
+
+            self._nidaqmx = nidaqmx
+            self.Task = nidaqmx.Task
+            self.AnalogMultiChannelWriter = stream_writers.AnalogMultiChannelWriter
+            self.AnalogSingleChannelReader = stream_readers.AnalogSingleChannelReader
+            self.AnalogUnscaledReader = stream_readers.AnalogUnscaledReader
+
+        except Exception as e:
+            raise Exception(f"\nNidaqmxBackend initialisation returned : {e}")
+
+    def system(self):
+        """
+        Returns:
+            nidaqmx.system.System: An object representing the local NI DAQmx system.
+        """
+
+        return self._nidaqmx.system.System.local()
+
+    def device(self, name):
+        """
+        Parameters:
+            name (str): The name of the NI DAQmx device.
+
+        Returns:
+            nidaqmx.system.Device: An object representing the device.
+        """
+
+        return self._nidaqmx.system.Device(name)
+
+
+def select_backend(name, options=None):
+    """
+    Selects the backend used for every communication with the card.
+
+    Parameters:
+        name (str): Name of the backend, "nidaqmx" for a real card or "simulated" for the software simulator.
+        options (dict, optional): Keyword arguments given to the simulated backend (noise, lag_samples, ...).
+                                  Ignored by the nidaqmx backend.
+
+    Returns:
+        The selected backend.
+    """
+
+    global _backend
+
+    try:
+        if name == "nidaqmx":
+            _backend = NidaqmxBackend()
+
+        elif name == "simulated":
+            from Modules_FIB import Simulated_Daq
+            _backend = Simulated_Daq.SimulatedBackend(**(options or {}))
+
+        else:
+            raise ValueError(f"Unknown backend '{name}', available backends are {', '.join(BACKENDS)}")
+
+        return _backend
+
+    except Exception as e:
+        raise Exception(f"\nFunction select_backend returned : {e}")
+
+
+def get_backend():
+    """
+    Returns the backend currently used. If none has been selected yet, the backend named in the
+    FIB_DAQ_BACKEND environment variable is selected, and the nidaqmx backend by default.
+
+    Returns:
+        The current backend.
+    """
+
+    try:
+        if _backend is None:
+            select_backend(os.environ.get(BACKEND_ENVIRONMENT_VARIABLE, "nidaqmx"))
+
+        return _backend
+
+    except Exception as e:
+        raise Exception(f"\nFunction get_backend returned : {e}")
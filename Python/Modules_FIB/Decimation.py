@@ -0,0 +1,146 @@
+import numpy as np
+
+# Smallest number of samples shown by a zoomed view
+MIN_VIEW_SAMPLES = 16
+
+
+def min_max_envelope(signal, columns, counts=None, start=0, stop=None):
+    """
+    Reduces a signal to its minimum and maximum over each pixel column of a plot, so that a plot of a few
+    hundred columns shows every peak of a signal of millions of samples. Only the samples between 'start' and
+    'stop' are reduced, so zooming into a range only costs the samples of this range.
+
+    Parameters:
+        signal (numpy.ndarray): The 1-D signal. With 'counts', the value of every run of samples.
+        columns (int): Number of columns of the plot.
+        counts (int or numpy.ndarray, optional): Run-length description of the signal, 'signal[i]' being held
+                                                 during 'counts[i]' samples (or 'counts' samples for all of them).
+                                                 The runs are not expanded.
+        start (int): Index of the first sample of the range.
+        stop (int, optional): Index following the last sample of the range, the end of the signal by default.
+
+    Returns:
+        tuple of numpy.ndarray: The minimum and the maximum of every column. There are fewer columns than
+                                requested when the signal has fewer samples.
+    """
+
+    try:
+        values = np.asarray(signal)
+        if counts is None:
+            ends = None
+            total_samples = len(values)
+        else:
+            counts = np.broadcast_to(np.asarray(counts, dtype=np.int64), values.shape)
+            values = values[counts > 0]  # Empty runs aren't part of the signal
+            ends = np.cumsum(counts[counts > 0])  # Index following the last sample of each run
+            total_samples = int(ends[-1]) if len(ends) else 0
+
+        start = max(0, int(start))
+        stop = total_samples if stop is None else min(int(stop), total_samples)
+
+        columns = int(min(columns, stop - start))
+        if columns <= 0:
+            return np.empty(0, dtype=values.dtype), np.empty(0, dtype=values.dtype)
+
+        # First and last sample of every column
+        bounds = start + np.arange(columns + 1, dtype=np.int64) * (stop - start) // columns
+        first_samples, last_samples = bounds[:-1], bounds[1:] - 1
+
+        # First and last value of every column
+        if ends is None:
+            first_values, last_values = first_samples, last_samples
+        else:
+            first_values = np.searchsorted(ends, first_samples, side='right')
+            last_values = np.searchsorted(ends, last_samples, side='right')
+
+        # The ranges of reduceat stop before the first value of the next column, the last value of a column can
+        # also be the first one of the next column when a run spans both of them
+        values = values[:last_values[-1] + 1]
+        minimums = np.minimum(np.minimum.reduceat(values, first_values), values[last_values])
+        maximums = np.maximum(np.maximum.reduceat(values, first_values), values[last_values])
+
+        return minimums, maximums
+
+    except Exception as e:
+        raise Exception(f"\nFunction min_max_envelope returned : {e}")
+
+
+class EnvelopeView:
+    """
+    Zoomable view of a long signal, decimated again to the width of the plot each time it is drawn.
+
+    The view only keeps the range of samples shown, the envelope of this range being computed on demand by
+    'min_max_envelope'. It accepts the same signals as 'min_max_envelope', including run-length signals.
+    """
+
+    def __init__(self, signal, counts=None):
+        """
+        Parameters:
+            signal (numpy.ndarray): The 1-D signal, or the value of every run of samples with 'counts'.
+            counts (int or numpy.ndarray, optional): Number of samples of every run of a run-length signal.
+        """
+
+        self.signal = np.asarray(signal)
+        self.counts = counts
+        if counts is None:
+            self.total_samples = len(self.signal)
+        else:
+            self.total_samples = int(np.sum(np.broadcast_to(counts, self.signal.shape)))
+
+        self.start = 0
+        self.stop = self.total_samples
+
+        # Limits of the values, to keep the vertical scale when zooming
+        self.min_value = float(self.signal.min()) if len(self.signal) else 0.0
+        self.max_value = float(self.signal.max()) if len(self.signal) else 0.0
+
+    def envelope(self, columns):
+        """
+        Parameters:
+            columns (int): Width of the plot in pixels.
+
+        Returns:
+            tuple of numpy.ndarray: The minimum and the maximum of every column of the range shown.
+        """
+
+        return min_max_envelope(self.signal, columns, self.counts, self.start, self.stop)
+
+    def set_range(self, start, stop):
+        """
+        Shows the samples between 'start' and 'stop', kept inside the signal and at least MIN_VIEW_SAMPLES long.
+        """
+
+        length = min(max(int(stop) - int(start), MIN_VIEW_SAMPLES), self.total_samples)
+        self.start = int(min(max(int(start), 0), self.total_samples - length))
+        self.stop = self.start + length
+
+    def zoom(self, factor, anchor=None):
+        """
+        Zooms in (factor > 1) or out (factor < 1), keeping the sample 'anchor' at the same place of the plot.
+
+        Parameters:
+            factor (float): Zoom factor.
+            anchor (int, optional): Sample kept in place, the middle of the range by default.
+        """
+
+        if anchor is None:
+            anchor = (self.start + self.stop) / 2
+        length = (self.stop - self.start) / factor
+        position = (anchor - self.start) / max(self.stop - self.start, 1)
+        start = anchor - position * length
+        self.set_range(round(start), round(start + length))
+
+    def pan(self, samples):
+        """
+        Moves the range shown by a number of samples, to the right if positive.
+        """
+
+        self.set_range(self.start + samples, self.stop + samples)
+
+    def reset(self):
+        """
+        Shows the whole signal.
+        """
+
+        self.start = 0
+        self.stop = self.total_samples
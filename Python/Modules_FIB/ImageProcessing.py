@@ -1,23 +1,170 @@
 import numpy as np
 
 
-def normalize(raw_image):
+# Number of video frames sharing the same contrast before it is measured again
+CONTRAST_REFRESH_FRAMES = 15
+
+# Largest number of pixels the percentiles are measured on, larger images being subsampled
+PERCENTILE_SAMPLES = 65536
+
+
+class Normalizer:
+    """
+    Maps raw image values to 8-bit grey values. The values between a low and a high level, the minimum and the
+    maximum or two percentiles of the image, are scaled to [0, 255] with an optional gamma, the others are clipped.
+    A flat image, whose levels are equal, is white.
+
+    Integer images of 16 bits or less are mapped through a lookup table of every possible value, built again only
+    when the levels change. Other images are scaled in place in a float32 buffer kept between the calls. The levels
+    can be reused for several images, so a video measures its contrast once every few frames.
+
+    Attributes:
+        low_percentile (float): Percentile of the image mapped to 0, 0 for its minimum.
+        high_percentile (float): Percentile of the image mapped to 255, 100 for its maximum.
+        gamma (float): Exponent applied to the scaled values, 1 for a linear mapping.
+        refresh_frames (int): Number of images sharing the same levels.
+        levels (tuple of float): The raw values mapped to 0 and 255, None before the first image.
+    """
+
+    def __init__(self, low_percentile=0.0, high_percentile=100.0, gamma=1.0, refresh_frames=1):
+        if not 0 <= low_percentile < high_percentile <= 100:
+            raise ValueError("The percentiles must verify 0 <= low < high <= 100")
+        if gamma <= 0:
+            raise ValueError("The gamma must be positive")
+
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.gamma = gamma
+        self.refresh_frames = max(1, int(refresh_frames))
+        self.levels = None
+        self.frames_left = 0  # Images left before the levels are measured again
+        self.scratch = np.empty(0, dtype=np.float32)
+        self.lut = None
+        self.lut_key = None  # Levels, gamma and type of the lookup table
+
+    def set_levels(self, low, high):
+        """
+        Sets the levels of the next images instead of measuring them.
+
+        Parameters:
+            low (float): The raw value mapped to 0.
+            high (float): The raw value mapped to 255.
+        """
+
+        self.levels = (float(low), float(high))
+        self.frames_left = self.refresh_frames
+
+    def reset(self):
+        """
+        Measures the levels again on the next image.
+        """
+
+        self.frames_left = 0
+
+    def measure(self, raw_image):
+        """
+        Returns:
+            tuple of float: The values of the low and high percentiles of the image.
+        """
+
+        if self.low_percentile == 0 and self.high_percentile == 100:
+            return float(raw_image.min()), float(raw_image.max())
+
+        values = raw_image.ravel()
+        values = values[::max(1, values.size // PERCENTILE_SAMPLES)]
+        low, high = np.percentile(values, (self.low_percentile, self.high_percentile))
+        return float(low), float(high)
+
+    def __call__(self, raw_image, out=None):
+        """
+        Normalizes an image, measuring its levels if the previous ones expired.
+
+        Parameters:
+            raw_image (numpy.ndarray): The raw values.
+            out (numpy.ndarray, optional): A uint8 array of the same shape receiving the grey values.
+
+        Returns:
+            numpy.ndarray: The uint8 grey values, 'out' if given.
+        """
+
+        if out is None:
+            out = np.empty(raw_image.shape, dtype=np.uint8)
+
+        if self.levels is None or self.frames_left <= 0:
+            self.levels = self.measure(raw_image)
+            self.frames_left = self.refresh_frames
+        self.frames_left -= 1
+
+        low, high = self.levels
+        if high <= low:  # Flat image, white like the interpolation it replaces
+            out.fill(255)
+        elif raw_image.dtype.kind in "iu" and raw_image.dtype.itemsize <= 2:
+            self._lookup(raw_image, low, high, out)
+        else:
+            self._scale(raw_image, low, high, out)
+
+        return out
+
+    def _lookup(self, raw_image, low, high, out):
+        """
+        Maps an integer image through the lookup table of its type, indexed by its values read as unsigned.
+        """
+
+        key = (low, high, self.gamma, raw_image.dtype)
+        if self.lut_key != key:
+            info = np.iinfo(raw_image.dtype)
+            values = np.arange(2 ** info.bits, dtype=np.float64)
+            if info.min < 0:  # Unsigned indices of the negative values
+                values[2 ** (info.bits - 1):] -= 2 ** info.bits
+            self.lut = np.empty(len(values), dtype=np.uint8)
+            self._scale(values, low, high, self.lut)
+            self.lut_key = key
+
+        np.take(self.lut, raw_image.view(f"u{raw_image.dtype.itemsize}"), out=out)
+
+    def _scale(self, raw_image, low, high, out):
+        """
+        Scales an image in place in the float32 buffer, rounding to the nearest grey value.
+        """
+
+        if self.scratch.size < raw_image.size:
+            self.scratch = np.empty(raw_image.size, dtype=np.float32)
+        scratch = self.scratch[:raw_image.size].reshape(raw_image.shape)
+
+        np.subtract(raw_image, low, out=scratch, casting="unsafe")
+        if self.gamma == 1:
+            np.multiply(scratch, 255 / (high - low), out=scratch)
+            np.clip(scratch, 0, 255, out=scratch)
+        else:
+            np.multiply(scratch, 1 / (high - low), out=scratch)
+            np.clip(scratch, 0, 1, out=scratch)
+            np.power(scratch, self.gamma, out=scratch)
+            np.multiply(scratch, 255, out=scratch)
+        np.add(scratch, 0.5, out=scratch)
+        np.copyto(out, scratch, casting="unsafe")
+
+
+def normalize(raw_image, out=None, normalizer=None):
     """
     Normalizes a raw image data array to a scale of 0 to 255 (8-bit grey values).
 
     Parameters:
         raw_image (numpy.ndarray): The input raw image data array.
+        out (numpy.ndarray, optional): A uint8 array of the same shape receiving the grey values, such as the
+                                       buffer of the display.
+        normalizer (Normalizer, optional): The normalizer keeping the contrast between the images of a video,
+                                           the minimum and the maximum of the image by default.
 
     Returns:
-        numpy.ndarray: The normalized image data array with values scaled to the range [0, 255].
+        numpy.ndarray: The normalized uint8 image data array, with values scaled to the range [0, 255], 'out' if
+                       given.
     """
 
     try:
-        min_val = raw_image.min()
-        max_val = raw_image.max()
-        raw_image = np.interp(raw_image, (min_val, max_val), (0, 255))
+        if normalizer is None:
+            normalizer = Normalizer()
 
-        return raw_image
+        return normalizer(raw_image, out)
 
     except Exception as e:
         raise Exception(f"\nFunction normalize returned : {e}")
@@ -95,3 +242,41 @@ def average(raw_data, samples_per_step, pixels_number):
 
     except Exception as e:
         raise Exception(f"\nFunction average returned : {e}")
+
+
+def average_into(chunk, samples_per_step, out, scale=None):
+    """
+    Averages groups of samples of an acquisition chunk and writes the pixel values into an output array. This is
+    used by streamed acquisitions, where the raw samples are reduced chunk by chunk instead of being kept in memory.
+
+    Unscaled integer samples are summed as integers and converted to volts by 'scale' once per pixel, instead of
+    once per sample. The scaling polynomial of the card being linear to a few ppm, this is the average of the
+    voltages.
+
+    Parameters:
+        chunk (numpy.ndarray): The raw samples of the chunk, its length must be a multiple of samples_per_step.
+        samples_per_step (int): The number of samples corresponding to each pixel.
+        out (numpy.ndarray): The 1D float array receiving one value per pixel of the chunk.
+        scale (callable, optional): Called as scale(values, out=out) to convert the averaged unscaled values of
+                                    'out' to volts in place.
+
+    Returns:
+        numpy.ndarray: The output array.
+    """
+
+    try:
+        if samples_per_step == 1:
+            out[:] = chunk
+        elif chunk.dtype.kind in "iu":
+            sums = np.sum(chunk.reshape(-1, samples_per_step), axis=1, dtype=np.int64)
+            np.divide(sums, samples_per_step, out=out)
+        else:
+            np.mean(chunk.reshape(-1, samples_per_step), axis=1, out=out)
+
+        if scale is not None:
+            scale(out, out=out)
+
+        return out
+
+    except Exception as e:
+        raise Exception(f"\nFunction average_into returned : {e}")
@@ -0,0 +1,106 @@
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtGui import QPainter, QImage
+import numpy as np
+
+
+def wrap_array(array):
+    """
+    Wraps a 2-D uint8 array in a grayscale QImage sharing its memory, without copy. The array must stay alive and
+    C-contiguous as long as the image is used, its changes being shown by the image.
+
+    Parameters:
+        array (numpy.ndarray): The 8-bit image, one byte per pixel.
+
+    Returns:
+        QImage: The image reading the memory of the array.
+    """
+
+    if array.dtype != np.uint8 or array.ndim != 2 or not array.flags.c_contiguous:
+        raise ValueError("Only C-contiguous 2-D uint8 arrays can be wrapped")
+
+    height, width = array.shape
+    return QImage(array.data, width, height, array.strides[0], QImage.Format.Format_Grayscale8)
+
+
+class ImageView(QtWidgets.QWidget):
+    """
+    Widget showing an 8-bit grayscale image scaled to fit, keeping its aspect ratio.
+
+    The images are painted straight from the memory of numpy arrays: the widget keeps a buffer and its QImage for
+    every resolution shown, which the callers fill in place, and the scaling is done by the painter into a target
+    rectangle computed only when the widget or the image is resized. Showing an image only schedules a repaint,
+    so images shown faster than the screen is refreshed are painted once.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initializes an empty view.
+        """
+
+        super(ImageView, self).__init__(parent)
+        self.buffers = {}  # Persistent buffer and image of every resolution
+        self.image = None  # Image painted
+        self.array = None  # Memory of the image painted
+        self.target = None  # Rectangle of the widget the image is scaled into
+
+    def buffer(self, shape):
+        """
+        Returns the persistent buffer of a resolution, allocated and wrapped the first time it is requested.
+
+        Parameters:
+            shape (tuple of int): The (height, width) of the image.
+
+        Returns:
+            numpy.ndarray: The uint8 buffer, shown by 'show_buffer'.
+        """
+
+        shape = tuple(shape)
+        if shape not in self.buffers:
+            array = np.zeros(shape, dtype=np.uint8)
+            self.buffers[shape] = (array, wrap_array(array))
+
+        return self.buffers[shape][0]
+
+    def show_buffer(self, shape):
+        """
+        Shows the persistent buffer of a resolution, as filled by the caller.
+        """
+
+        array, image = self.buffers[tuple(shape)]
+        self.show_image(image, array)
+
+    def show_image(self, image, array):
+        """
+        Shows an image wrapping the memory of an array, from 'wrap_array'.
+
+        Parameters:
+            image (QImage): The image to paint.
+            array (numpy.ndarray): The array wrapped by the image, kept alive while the image is shown.
+        """
+
+        if self.image is None or self.image.size() != image.size():
+            self.target = None
+        self.image = image
+        self.array = array
+        self.update()
+
+    def resizeEvent(self, event):
+        self.target = None
+        super(ImageView, self).resizeEvent(event)
+
+    def paintEvent(self, event):
+        """
+        Paints the image scaled into the largest centered rectangle of its aspect ratio.
+        """
+
+        if self.image is None:
+            return
+
+        if self.target is None:
+            size = self.image.size().scaled(self.size(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+            self.target = QtCore.QRect(QtCore.QPoint((self.width() - size.width()) // 2,
+                                                     (self.height() - size.height()) // 2), size)
+
+        painter = QPainter(self)
+        painter.drawImage(self.target, self.image)
+        painter.end()
@@ -1,6 +1,22 @@
-import nidaqmx
-from nidaqmx.constants import AcquisitionType, TerminalConfiguration, Edge
-from nidaqmx.stream_writers import AnalogMultiChannelWriter
+import hashlib
+import threading
+import weakref
+import numpy as np
+from nidaqmx.constants import AcquisitionType, TerminalConfiguration, Edge, RegenerationMode, TaskMode
+from Modules_FIB import Daq_Backend
+
+# Number of frames the input buffer can hold during a continuous video acquisition
+VIDEO_BUFFERED_FRAMES = 8
+
+# Maximum number of samples read at once by a streamed acquisition (2 MB of unscaled int16 samples)
+STREAM_CHUNK_SAMPLES = 2 ** 20
+
+# Maximum duration of a chunk of a streamed acquisition, in seconds, so that the rows are displayed progressively
+STREAM_CHUNK_SECONDS = 0.1
+
+# Committed scanning tasks kept alive between sweeps, by scan configuration (see get_pooled_tasks)
+_task_pool = {}
+_task_pool_lock = threading.Lock()
 
 
 # Elementary ni functions
@@ -11,13 +27,13 @@ def ni_cards_system():
 
     This function returns an object representing the local NI DAQmx system,
     which contains information about the installed NI DAQmx devices and
-    their properties.
+    their properties. With the simulated backend, the simulated devices are listed.
 
     Returns:
     nidaqmx.system.System: An object representing the local NI DAQmx system.
     """
     try:
-        return nidaqmx.system.System.local()
+        return Daq_Backend.get_backend().system()
 
     except Exception as e:
         raise Exception(f"\nFunction ni_cards_system returned : {e}")
@@ -37,7 +53,7 @@ def ni_cards_device(port_dev):
     nidaqmx.system.Device: An object representing the specified NI DAQmx device.
     """
     try:
-        return nidaqmx.system.Device(port_dev)
+        return Daq_Backend.get_backend().device(port_dev)
 
     except Exception as e:
         raise Exception(f"\nFunction ni_cards_device returned : {e}")
@@ -82,7 +98,7 @@ def initial_voltage_setting(min_tension, max_tension, channel_ud):
     """
 
     try:
-        with nidaqmx.Task() as init_task:
+        with Daq_Backend.get_backend().Task() as init_task:
             init_task.ao_channels.add_ao_voltage_chan(channel_ud, min_val=min_tension, max_val=max_tension)
             init_task.write(max_tension)
             init_task.start()
@@ -120,8 +136,9 @@ def configure_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tensi
     """
 
     try:
-        write_task = nidaqmx.Task()
-        read_task = nidaqmx.Task()
+        backend = Daq_Backend.get_backend()
+        write_task = backend.Task()
+        read_task = backend.Task()
 
         # Channels configuration
         write_task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=min_tension, max_val=max_tension)
@@ -152,22 +169,28 @@ def configure_video_tasks(channel_lr, channel_ud, channel_read, min_tension, max
     for scanning and the analog input channel for data acquisition. This function prepares the system for
     synchronized reading and writing operations, essential for acquiring video data.
 
+    Both tasks are configured in continuous mode: the scanning signals are written once into the output buffer
+    and regenerated by the card for every frame, while the input task streams samples without interruption.
+    Frames are then obtained by slicing the input stream every 'total_samples_to_read' samples, so no task has
+    to be started or stopped between two frames.
+
     Parameters: channel_lr (str): The identifier for the left-right scanning channel. channel_ud (str): The
     identifier for the up-down scanning channel. channel_read (str): The identifier for the channel from which to
     read the video signal. min_tension (float): The minimum voltage value for the scanning signals. max_tension (
     float): The maximum voltage value for the scanning signals. sampling_frequency (int): The sampling frequency for
     both reading and writing operations. complete_horizontal_staircase (numpy.ndarray): The precomputed staircase
-    signal for horizontal scanning. total_samples_to_read (int): The total number of samples to be read, determining
-    the duration of the read task. data_to_write (numpy.ndarray): The array containing both the horizontal and
-    vertical staircase signals to be written.
+    signal for horizontal scanning. total_samples_to_read (int): The number of samples making up one frame.
+    data_to_write (numpy.ndarray): The array containing both the horizontal and vertical staircase signals to be
+    written.
 
     Returns:
         tuple: A tuple containing the configured write and read tasks ready for execution.
     """
 
     try:
-        write_task = nidaqmx.Task()
-        read_task = nidaqmx.Task()
+        backend = Daq_Backend.get_backend()
+        write_task = backend.Task()
+        read_task = backend.Task()
 
         # Channels configuration
         write_task.ao_channels.add_ao_voltage_chan(channel_lr, min_val=min_tension, max_val=max_tension)
@@ -175,18 +198,21 @@ def configure_video_tasks(channel_lr, channel_ud, channel_read, min_tension, max
         read_task.ai_channels.add_ai_voltage_chan(channel_read, min_val=min_tension, max_val=max_tension,
                                                   terminal_config=TerminalConfiguration.DIFF)
 
-        # Timing configuration
-        write_task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.FINITE,
+        # Timing configuration, the write buffer holds exactly one frame which is regenerated by the card
+        write_task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.CONTINUOUS,
                                               samps_per_chan=len(complete_horizontal_staircase))
-        read_task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.FINITE,
-                                             samps_per_chan=total_samples_to_read)
+        write_task.out_stream.regen_mode = RegenerationMode.ALLOW_REGENERATION
+
+        # The read buffer holds several frames so that a slow frame processing doesn't overflow it
+        read_task.timing.cfg_samp_clk_timing(rate=sampling_frequency, sample_mode=AcquisitionType.CONTINUOUS,
+                                             samps_per_chan=total_samples_to_read * VIDEO_BUFFERED_FRAMES)
 
         # Trigger the read task at the start of the write task
         read_trigger_source = '/' + channel_lr.split('/')[0] + '/ao/StartTrigger'
         read_task.triggers.start_trigger.cfg_dig_edge_start_trig(read_trigger_source, trigger_edge=Edge.RISING)
 
         # Create a StreamWriter for the analog outputs
-        writer = AnalogMultiChannelWriter(write_task.out_stream)
+        writer = Daq_Backend.get_backend().AnalogMultiChannelWriter(write_task.out_stream)
 
         # Write both signals at the same time
         writer.write_many_sample(data_to_write)
@@ -197,16 +223,223 @@ def configure_video_tasks(channel_lr, channel_ud, channel_read, min_tension, max
         raise Exception(f"\nFunction configure_video_tasks returned : {e}")
 
 
+###############################################################################
+# Tasks pool
+
+def _waveform_digest(data_to_write):
+    """
+    Returns a digest of the content of a waveform, used to know if the buffer of a pooled task must be rewritten.
+    """
+
+    return hashlib.blake2b(memoryview(np.ascontiguousarray(data_to_write)).cast('B'), digest_size=16).digest()
+
+
+def get_pooled_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
+                     sampling_frequency, data_to_write, total_samples_to_read):
+    """
+    Returns committed tasks for a scan, ready to be started, with the scanning signals in the output buffer.
+
+    The tasks are kept alive in a pool keyed by the channels, voltages, sampling frequency, numbers of samples and
+    trigger of the scan. Back-to-back sweeps with the same configuration reuse the same committed tasks, and the
+    output buffer is only rewritten when the scanning signals change. When a new configuration is requested, the
+    pooled tasks using one of its channels are closed first, since a channel can only be reserved by one task.
+
+    The tasks must be stopped after each scan (not closed) so that they go back to their committed state. The
+    last sample of 'data_to_write' should bring the beam back to the start of the scan: the outputs then hold the
+    start position between sweeps, so the initial voltage only has to be set when the tasks are created.
+
+    Args:
+        channel_lr (str): The name of the analog output channel for left-right scanning.
+        channel_ud (str): The name of the analog output channel for up-down scanning.
+        channel_read (str): The name of the analog input channel for reading the signal.
+        min_tension (float): The minimum voltage that can be output by the analog output channels.
+        max_tension (float): The maximum voltage that can be output by the analog output channels.
+        sampling_frequency (float): The sampling frequency for data acquisition, in Hz.
+        data_to_write (numpy.array): The scanning signals to write (channels x samples).
+        total_samples_to_read (int): The total number of samples to read during data acquisition.
+
+    Returns:
+        tuple: The pooled write and read tasks.
+    """
+
+    try:
+        trigger_source = '/' + channel_lr.split('/')[0] + '/ao/StartTrigger'
+        key = (channel_lr, channel_ud, channel_read, min_tension, max_tension, sampling_frequency,
+               data_to_write.shape[1], total_samples_to_read, trigger_source)
+
+        with _task_pool_lock:
+            entry = _task_pool.get(key)
+
+            if entry is None:
+                # Close the pooled tasks reserving one of the channels
+                channels = {channel_lr, channel_ud, channel_read}
+                for other_key in [k for k in _task_pool if channels & set(k[:3])]:
+                    other = _task_pool.pop(other_key)
+                    close_rw_tasks(other["write_task"], other["read_task"])
+
+                # Set initial voltage for channel_ud, the tasks then keep the beam at the start between sweeps
+                initial_voltage_setting(min_tension, max_tension, channel_ud)
+
+                write_task, read_task = configure_tasks(channel_lr, channel_ud, channel_read, min_tension,
+                                                        max_tension, sampling_frequency, data_to_write[0],
+                                                        total_samples_to_read)
+                entry = {"write_task": write_task, "read_task": read_task, "waveform": None, "digest": None}
+                _task_pool[key] = entry
+
+                # Reserve the resources once, starting and stopping a committed task is then much faster
+                write_task.control(TaskMode.TASK_COMMIT)
+                read_task.control(TaskMode.TASK_COMMIT)
+
+            # Rewrite the output buffer only if the scanning signals changed
+            known = entry["waveform"] is not None and entry["waveform"]() is data_to_write
+            if not (known and not data_to_write.flags.writeable):
+                digest = _waveform_digest(data_to_write)
+                if digest != entry["digest"]:
+                    write_waveform(entry["write_task"], data_to_write)
+                    entry["digest"] = digest
+                entry["waveform"] = weakref.ref(data_to_write)
+
+            return entry["write_task"], entry["read_task"]
+
+    except Exception as e:
+        evict_pooled_tasks(channel_lr, channel_ud, channel_read)
+        raise Exception(f"\nFunction get_pooled_tasks returned : {e}")
+
+
+def evict_pooled_tasks(*channels):
+    """
+    Closes the pooled tasks using one of the given channels, for example after a failed scan or before another
+    task needs these channels.
+
+    Args:
+        *channels (str): Names of the channels to release.
+    """
+
+    try:
+        with _task_pool_lock:
+            for key in [k for k in _task_pool if set(channels) & set(k[:3])]:
+                entry = _task_pool.pop(key)
+                close_rw_tasks(entry["write_task"], entry["read_task"])
+
+    except Exception as e:
+        raise Exception(f"\nFunction evict_pooled_tasks returned : {e}")
+
+
+def clear_task_pool():
+    """
+    Closes every pooled task. Used when the device or the configuration changes, and before any other task
+    needs the scanning channels (video, pattern writing).
+    """
+
+    try:
+        with _task_pool_lock:
+            entries = list(_task_pool.values())
+            _task_pool.clear()
+
+        for entry in entries:
+            close_rw_tasks(entry["write_task"], entry["read_task"])
+
+    except Exception as e:
+        raise Exception(f"\nFunction clear_task_pool returned : {e}")
+
+
 ###############################################################################
 # Writing & Reading functions
 
+def scaling_coefficients(read_task):
+    """
+   Returns the coefficients of the polynomial converting the unscaled samples of the first input channel to volts.
+
+   Args:
+       read_task (nidaqmx.Task): The task configured for reading the input signal.
+
+   Returns:
+       numpy.ndarray: The coefficients, from the constant term to the highest degree.
+   """
+
+    try:
+        return np.asarray(read_task.ai_channels[0].ai_dev_scaling_coeff, dtype=np.float64)
+
+    except Exception as e:
+        raise Exception(f"\nFunction scaling_coefficients returned : {e}")
+
+
+def scale_samples(samples, coefficients, out=None):
+    """
+   Converts unscaled samples, or averages of unscaled samples, to volts.
+
+   Args:
+       samples (numpy.ndarray): The unscaled values.
+       coefficients (numpy.ndarray): The scaling polynomial returned by 'scaling_coefficients'.
+       out (numpy.ndarray, optional): A float array of the same shape receiving the voltages.
+
+   Returns:
+       numpy.ndarray: The voltages, 'out' if given.
+   """
+
+    try:
+        if out is None:
+            out = np.empty(np.shape(samples), dtype=np.float64)
+
+        coefficients = np.trim_zeros(np.asarray(coefficients, dtype=np.float64), 'b')
+        if len(coefficients) <= 2:  # Linear scaling, which can be done in place
+            np.multiply(samples, coefficients[1] if len(coefficients) == 2 else 0, out=out)
+            np.add(out, coefficients[0] if len(coefficients) else 0, out=out)
+            return out
+
+        if np.shares_memory(samples, out):
+            samples = samples.copy()
+
+        # Horner's method, without temporary arrays
+        out[...] = coefficients[-1]
+        for coefficient in coefficients[-2::-1]:
+            np.multiply(out, samples, out=out)
+            np.add(out, coefficient, out=out)
+
+        return out
+
+    except Exception as e:
+        raise Exception(f"\nFunction scale_samples returned : {e}")
+
+
+def read_unscaled(read_task, total_samples_to_read, timeout, out=None, reader=None):
+    """
+   Reads unscaled 16-bit samples of the input channel into a NumPy array, without creating a list of voltages.
+
+   Args:
+       read_task (nidaqmx.Task): The running task configured for reading the input signal.
+       total_samples_to_read (int): The number of samples to read.
+       timeout (float): The maximum timeout for data acquisition, in seconds.
+       out (numpy.ndarray, optional): A preallocated int16 array of at least 'total_samples_to_read' samples.
+       reader (AnalogUnscaledReader, optional): The reader of the task, created if not given.
+
+   Returns:
+       numpy.ndarray: The unscaled samples, a view on 'out' if given. See 'scale_samples' for the voltages.
+   """
+
+    try:
+        if out is None:
+            out = np.empty(total_samples_to_read, dtype=np.int16)
+        if reader is None:
+            reader = Daq_Backend.get_backend().AnalogUnscaledReader(read_task.in_stream)
+
+        samples = out[:total_samples_to_read]
+        reader.read_int16(samples.reshape(1, -1), number_of_samples_per_channel=total_samples_to_read,
+                          timeout=timeout)
+
+        return samples
+
+    except Exception as e:
+        raise Exception(f"\nFunction read_unscaled returned : {e}")
+
+
 def write_and_read(write_task, read_task, data_to_write, total_samples_to_read, timeout):
     """
    Writes scanning signals and reads the input signal simultaneously.
 
    This function writes the provided scanning signals to the analog output channels of the write task.
    It then starts both the write and read tasks to write and read the signals simultaneously. The
-   read data is returned raw after acquisition.
+   read data is returned raw after acquisition, as unscaled samples.
 
    Args:
        write_task (nidaqmx.Task): The task configured for writing scanning signals.
@@ -216,12 +449,12 @@ def write_and_read(write_task, read_task, data_to_write, total_samples_to_read,
        timeout (float): The maximum timeout for data acquisition, in seconds.
 
    Returns:
-       numpy.array: The raw data read from the analog input channel.
+       numpy.array: The unscaled int16 samples read from the analog input channel, see 'scale_samples'.
    """
 
     try:
         # Create a StreamWriter for the analog outputs
-        writer = AnalogMultiChannelWriter(write_task.out_stream)
+        writer = Daq_Backend.get_backend().AnalogMultiChannelWriter(write_task.out_stream)
 
         # Write both signals at the same time
         writer.write_many_sample(data_to_write)
@@ -231,7 +464,7 @@ def write_and_read(write_task, read_task, data_to_write, total_samples_to_read,
         write_task.start()
 
         # Read the data for the entire image
-        raw_data = read_task.read(number_of_samples_per_channel=total_samples_to_read, timeout=timeout)
+        raw_data = read_unscaled(read_task, total_samples_to_read, timeout)
 
         # Wait for the end of the tasks
         write_task.wait_until_done(timeout=timeout)
@@ -245,12 +478,77 @@ def write_and_read(write_task, read_task, data_to_write, total_samples_to_read,
         raise Exception(f"\nFunction write_and_read returned : {e}")
 
 
+def write_waveform(write_task, data_to_write):
+    """
+   Writes the scanning signals to the output buffer of the write task.
+
+   Args:
+       write_task (nidaqmx.Task): The task configured for writing scanning signals.
+       data_to_write (numpy.array): The data to be written to the analog output channels (channels x samples).
+   """
+
+    try:
+        writer = Daq_Backend.get_backend().AnalogMultiChannelWriter(write_task.out_stream)
+        writer.write_many_sample(data_to_write)
+
+    except Exception as e:
+        raise Exception(f"\nFunction write_waveform returned : {e}")
+
+
+def stream_read(write_task, read_task, total_samples_to_read, chunk_samples, timeout):
+    """
+   Starts the writing and reading tasks and reads the input signal chunk by chunk.
+
+   This generator yields the acquired samples in chunks of 'chunk_samples' samples (the last one may be shorter).
+   Every chunk is read unscaled into the same preallocated int16 buffer, so the memory used by the acquisition
+   doesn't depend on the number of samples to read. A yielded chunk is only valid until the next one is requested
+   and must be processed or copied before. The tasks are stopped once every sample is read, or if the caller stops
+   early.
+
+   Args:
+       write_task (nidaqmx.Task): The task configured for writing scanning signals, with its buffer written.
+       read_task (nidaqmx.Task): The task configured for reading the input signal.
+       total_samples_to_read (int): The total number of samples to read during data acquisition.
+       chunk_samples (int): The number of samples read at once.
+       timeout (float): The maximum timeout for the reading of one chunk, in seconds.
+
+   Yields:
+       numpy.array: A view on the buffer holding the unscaled samples of the last chunk, see 'scale_samples'.
+   """
+
+    try:
+        reader = Daq_Backend.get_backend().AnalogUnscaledReader(read_task.in_stream)
+        buffer = np.empty(min(chunk_samples, total_samples_to_read), dtype=np.int16)
+
+        # Start the tasks
+        read_task.start()
+        write_task.start()
+
+        try:
+            samples_read = 0
+            while samples_read < total_samples_to_read:
+                chunk = read_unscaled(read_task, min(len(buffer), total_samples_to_read - samples_read), timeout,
+                                      buffer, reader)
+                samples_read += len(chunk)
+                yield chunk
+
+            # Wait for the end of the tasks
+            write_task.wait_until_done(timeout=timeout)
+
+        finally:
+            write_task.stop()
+            read_task.stop()
+
+    except Exception as e:
+        raise Exception(f"\nFunction stream_read returned : {e}")
+
+
 def quick_write_and_read(write_task, read_task, total_samples_to_read, timeout):
     """
    Start and stop the writing and the reading task.
 
    This function starts both the write and read tasks to write and read the signals simultaneously. The
-   read data is returned raw after acquisition.
+   read data is returned raw after acquisition, as unscaled samples.
 
    Args:
        write_task (nidaqmx.Task): The task configured for writing scanning signals.
@@ -259,7 +557,7 @@ def quick_write_and_read(write_task, read_task, total_samples_to_read, timeout):
        timeout (float): The maximum timeout for data acquisition, in seconds.
 
    Returns:
-       numpy.array: The raw data read from the analog input channel.
+       numpy.array: The unscaled int16 samples read from the analog input channel, see 'scale_samples'.
    """
 
     try:
@@ -268,7 +566,7 @@ def quick_write_and_read(write_task, read_task, total_samples_to_read, timeout):
         write_task.start()
 
         # Read the data for the entire image
-        raw_data = read_task.read(number_of_samples_per_channel=total_samples_to_read, timeout=timeout)
+        raw_data = read_unscaled(read_task, total_samples_to_read, timeout)
 
         # Wait for the end of the tasks
         write_task.wait_until_done(timeout=timeout)
@@ -280,3 +578,47 @@ def quick_write_and_read(write_task, read_task, total_samples_to_read, timeout):
 
     except Exception as e:
         raise Exception(f"\nFunction quick_write_and_read returned : {e}")
+
+
+def start_rw_tasks(write_task, read_task):
+    """
+   Start the reading and the writing task.
+
+   The read task is started first so that it is armed and waiting for the start trigger of the write task.
+   This is used by the continuous video acquisition, where both tasks keep running until they are closed.
+
+   Args:
+       write_task (nidaqmx.Task): The task configured for writing scanning signals.
+       read_task (nidaqmx.Task): The task configured for reading the input signal.
+   """
+
+    try:
+        read_task.start()
+        write_task.start()
+
+    except Exception as e:
+        raise Exception(f"\nFunction start_rw_tasks returned : {e}")
+
+
+def read_frame(read_task, total_samples_to_read, timeout, out=None):
+    """
+   Read the samples of the next frame from a running continuous read task.
+
+   Since the read task is triggered by the write task and both share the same sampling frequency,
+   reading exactly 'total_samples_to_read' samples at a time keeps every read aligned on a frame.
+
+   Args:
+       read_task (nidaqmx.Task): The running task configured for reading the input signal.
+       total_samples_to_read (int): The number of samples making up one frame.
+       timeout (float): The maximum timeout for data acquisition, in seconds.
+       out (numpy.ndarray, optional): A preallocated int16 array receiving the samples of the frame.
+
+   Returns:
+       numpy.ndarray: The unscaled samples of one frame read from the analog input channel.
+   """
+
+    try:
+        return read_unscaled(read_task, total_samples_to_read, timeout, out)
+
+    except Exception as e:
+        raise Exception(f"\nFunction read_frame returned : {e}")
@@ -1,16 +1,19 @@
 import numpy as np
 from Modules_FIB import Ni_Dependencies as NID
 from Modules_FIB import ImageProcessing
+from Modules_FIB import Waveforms
 
 
-def rise_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read):
+def rise_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read,
+                  rows_callback=None, samples_callback=None):
     """
     Generates and reads scanning signals for a Focused Ion Beam (FIB) system.
 
     This function configures and executes two simultaneous tasks: one for writing
     analog output signals for scanning (both horizontal and vertical), and another
-    for reading the corresponding analog input signal. It initially sets a voltage
-    for 'channel_ud' to avoid synchronization issues at the start. Then it performs
+    for reading the corresponding analog input signal. The tasks are taken from the
+    pool of 'Ni_Dependencies', which sets a voltage for 'channel_ud' when they are
+    created to avoid synchronization issues at the start. Then it performs
     scanning by generating staircase signals in both horizontal and vertical directions
     while reading the input signal synchronously. The function averages the read data
     if more than one sample per pixel is acquired.
@@ -23,6 +26,13 @@ def rise_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr,
     - channel_lr: Channel name for the left-right scanning signal.
     - channel_ud: Channel name for the up-down scanning signal.
     - channel_read: Channel name for reading the input signal.
+    - rows_callback: Optional function called as rows_callback(first_row, rows) each time rows of the image are
+                     acquired, with the averaged signal values (not normalized) of the completed rows. It is called
+                     from the acquisition thread after every chunk, with no rows while the two extra rows are
+                     acquired, and can raise an exception to abort the scan.
+    - samples_callback: Optional function called as samples_callback(first_sample, samples, total_samples) with
+                        the voltages of every chunk of raw samples read, including the two extra rows and columns.
+                        The chunk is only valid during the call.
 
     Returns:
     - A 2D NumPy array representing the acquired image. The array dimensions correspond
@@ -35,7 +45,6 @@ def rise_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr,
 
         # Converts microseconds to seconds
         time_per_pixel = time_per_pixel / 1000000
-        timeout = time_per_pixel * pixels_number * pixels_number + 1
 
         # Number of samples per step/pixel
         samples_per_step = int(time_per_pixel * sampling_frequency)
@@ -45,59 +54,117 @@ def rise_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr,
         min_tension = -10
         max_tension = 10
 
-        # Set initial voltage for channel_ud
-        NID.initial_voltage_setting(min_tension, max_tension, channel_ud)
+        # Staircase signals for left-right and top-down scanning, shared with the previous sweeps when identical.
+        # The last sample brings the beam back to the start of the scan for the next one
+        data_to_write = Waveforms.scan_waveform("rise", pixels_number, samples_per_step, min_tension, max_tension)
+
+        # The completed rows are sent without the two first rows and columns, like the final image. The callback is
+        # called for every chunk, with no rows while the two first rows are acquired, so it can abort the scan
+        send_rows = None
+        if rows_callback is not None:
+            def send_rows(first_row, rows):
+                extra_rows = max(2 - first_row, 0)
+                rows_callback(max(first_row - 2, 0), rows[extra_rows:, 2:])
+
+        # Write both signal in one task and read with another, the tasks are reused by the next identical sweeps
+        write_task, read_task = NID.get_pooled_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
+                                                     sampling_frequency, data_to_write, total_samples_to_read)
+        try:
+            # Acquire the image, the raw samples are averaged chunk by chunk
+            image_array = acquire_image(write_task, read_task, samples_per_step, pixels_number, sampling_frequency,
+                                        send_rows, samples_callback)
+
+        except Exception:
+            # Closes the tasks of an aborted or failed scan, they will be configured again by the next sweep
+            NID.evict_pooled_tasks(channel_lr, channel_ud, channel_read)
+            raise
 
-        # Generating the staircase signal for left-right scanning (repeated "pixels_number" times)
-        horizontal_staircase = np.repeat(np.linspace(min_tension, max_tension, pixels_number), samples_per_step)
-        complete_horizontal_staircase = np.tile(horizontal_staircase, pixels_number)
+        # To avoid weird behaviour we delete the first row of the image twice
+        image_array = ImageProcessing.remove_two_columns(image_array)
 
-        # Generating the staircase signal for top-down scanning (unique for the entire image)
-        vertical_staircase = np.repeat(np.linspace(max_tension, min_tension, pixels_number),
-                                       samples_per_step * pixels_number)
+        # Normalize the values between 0 and 255
+        return ImageProcessing.normalize(image_array)
 
-        # Write both signal in one task and read with another
-        write_task, read_task = NID.configure_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
-                                                    sampling_frequency, complete_horizontal_staircase,
-                                                    total_samples_to_read)
-        # Structure datas to write
-        data_to_write = np.array([complete_horizontal_staircase, vertical_staircase])
-
-        # Create a StreamWriter for the analog outputs
-        raw_data = NID.write_and_read(write_task, read_task, data_to_write, total_samples_to_read, timeout)
-        # Stop the tasks
+    except Exception as e:
+        raise Exception(f"\nFunction rise_scanning returned : {e}")
 
-        # If there is only one sample per pixel, we skip the averaging process
-        if samples_per_step == 1:
-            # Reshape to a numpy 2D array (pixels_number x pixels_number)
-            image_array = np.array(raw_data).reshape(pixels_number, pixels_number)
 
-        else:
-            image_array = ImageProcessing.average(raw_data, samples_per_step, pixels_number)
+def acquire_image(write_task, read_task, samples_per_step, pixels_number, sampling_frequency, rows_callback=None,
+                  samples_callback=None):
+    """
+    Runs a configured scan and builds the image while the samples are acquired.
 
-        # To avoid weird behaviour we delete the first row of the image twice
-        image_array = ImageProcessing.remove_two_columns(image_array)
+    The input signal is read in chunks of whole rows into a preallocated buffer (see 'Ni_Dependencies.stream_read'),
+    and each chunk is averaged into the output image as soon as it is read. The samples are read unscaled, averaged
+    as integers and converted to volts once per pixel. The raw samples are never all held in
+    memory, so the memory used only depends on the size of the image. The chunks are kept short enough for the
+    completed rows to be delivered several times per second through 'rows_callback'.
 
-        # Normalize the values between 0 and 255
-        image_array = ImageProcessing.normalize(image_array)
+    Parameters:
+    - write_task: The task writing the scanning signals, with its buffer already written.
+    - read_task: The task reading the input signal.
+    - samples_per_step: Number of samples acquired for each pixel.
+    - pixels_number: Number of pixels per row and column of the acquired image.
+    - sampling_frequency: Sampling frequency for data acquisition, in Hz.
+    - rows_callback: Optional function called as rows_callback(first_row, rows) after each chunk, with a view on
+                     the rows of the image completed by this chunk.
+    - samples_callback: Optional function called as samples_callback(first_sample, samples, total_samples) with
+                        the voltages of each chunk of raw samples, before it is averaged. The samples are only
+                        converted to volts when it is given.
 
-        # Closes all tasks
-        NID.close_rw_tasks(write_task, read_task)
+    Returns:
+    - A 2D NumPy array (pixels_number x pixels_number) of the averaged signal value at each pixel.
+    """
+
+    try:
+        samples_per_row = samples_per_step * pixels_number
+        total_samples_to_read = samples_per_row * pixels_number
+
+        # Read whole rows at once, at least one row per chunk
+        chunk_limit = min(NID.STREAM_CHUNK_SAMPLES, int(sampling_frequency * NID.STREAM_CHUNK_SECONDS))
+        rows_per_chunk = max(1, chunk_limit // samples_per_row)
+        chunk_samples = rows_per_chunk * samples_per_row
+        timeout = chunk_samples / sampling_frequency + 1
+
+        image_array = np.empty((pixels_number, pixels_number), dtype=np.float64)
+        pixels = image_array.reshape(-1)
+        pixel = 0
+
+        # Conversion of the unscaled samples to volts
+        coefficients = NID.scaling_coefficients(read_task)
+
+        def scale(values, out=None):
+            return NID.scale_samples(values, coefficients, out)
+
+        for chunk in NID.stream_read(write_task, read_task, total_samples_to_read, chunk_samples, timeout):
+            if samples_callback is not None:
+                samples_callback(pixel * samples_per_step, scale(chunk), total_samples_to_read)
+
+            pixels_in_chunk = len(chunk) // samples_per_step
+            ImageProcessing.average_into(chunk, samples_per_step, pixels[pixel:pixel + pixels_in_chunk], scale)
 
-        return image_array.astype(np.uint8)
+            if rows_callback is not None:
+                first_row = pixel // pixels_number
+                rows_callback(first_row, image_array[first_row:(pixel + pixels_in_chunk) // pixels_number])
+
+            pixel += pixels_in_chunk
+
+        return image_array
 
     except Exception as e:
-        raise Exception(f"\nFunction rise_scanning returned : {e}")
+        raise Exception(f"\nFunction acquire_image returned : {e}")
 
 
-def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read):
+def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read,
+                      rows_callback=None, samples_callback=None):
     """
     Generates and reads triangle scanning signals for a Focused Ion Beam (FIB) system.
 
     This function configures and executes two simultaneous tasks: one for writing
     analog output signals for triangle scanning (both horizontal and vertical), and another
-    for reading the corresponding analog input signal. It initially sets a voltage
-    for 'channel_ud' to avoid synchronization issues at the start. Then it performs
+    for reading the corresponding analog input signal. The tasks are taken from the
+    pool of 'Ni_Dependencies', which sets a voltage for 'channel_ud' when they are
+    created to avoid synchronization issues at the start. Then it performs
     scanning by generating staircase signals in both horizontal and vertical directions
     while reading the input signal synchronously. The function averages the read data
     if more than one sample per pixel is acquired.
@@ -110,6 +177,12 @@ def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel
     - channel_lr: Channel name for the left-right scanning signal.
     - channel_ud: Channel name for the up-down scanning signal.
     - channel_read: Channel name for reading the input signal.
+    - rows_callback: Optional function called as rows_callback(first_row, rows) each time rows of the image are
+                     acquired, with the averaged signal values (not normalized) of the completed rows. It is called
+                     from the acquisition thread and can raise an exception to abort the scan.
+    - samples_callback: Optional function called as samples_callback(first_sample, samples, total_samples) with
+                        the voltages of every chunk of raw samples read, including the two extra rows and columns.
+                        The chunk is only valid during the call.
 
     Returns:
     - A 2D NumPy array representing the acquired image. The array dimensions correspond
@@ -120,7 +193,6 @@ def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel
     try:
         # Converts microseconds to seconds
         time_per_pixel = time_per_pixel / 1000000
-        timeout = time_per_pixel * pixels_number * pixels_number + 1
 
         # Number of samples per step/pixel
         samples_per_step = int(time_per_pixel * sampling_frequency)
@@ -130,47 +202,37 @@ def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel
         min_tension = -10
         max_tension = 10
 
-        # Set initial voltage for channel_ud
-        NID.initial_voltage_setting(min_tension, max_tension, channel_ud)
-
-        # Generating the staircase signal for left-right scanning (repeated "pixels_number" times)
-        horizontal_staircase = np.repeat(np.append(np.linspace(min_tension, max_tension, pixels_number),
-                                                   np.linspace(max_tension, min_tension, pixels_number)), samples_per_step)
-        complete_horizontal_staircase = np.tile(horizontal_staircase, pixels_number // 2)
-
-        # Generating the staircase signal for top-down scanning (unique for the entire image)
-        vertical_staircase = np.repeat(np.linspace(max_tension, min_tension, pixels_number),
-                                       samples_per_step * pixels_number)
-
-        # Write both signal in one task and read with another
-        write_task, read_task = NID.configure_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
-                                                    sampling_frequency, complete_horizontal_staircase,
-                                                    total_samples_to_read)
-
-        # Structure datas to write
-        data_to_write = np.array([complete_horizontal_staircase, vertical_staircase])
-
-        # Create a StreamWriter for the analog outputs
-        raw_data = NID.write_and_read(write_task, read_task, data_to_write, total_samples_to_read, timeout)
-
-        # Closes all tasks
-        NID.close_rw_tasks(write_task, read_task)
-
-        # If there is only one sample per pixel, we skip the averaging process
-        if samples_per_step == 1:
-            # Reshape to a numpy 2D array (pixels_number x pixels_number)
-            image_array = np.array(raw_data).reshape(pixels_number, pixels_number)
-
-        else:
-            image_array = ImageProcessing.average(raw_data, samples_per_step, pixels_number)
+        # Staircase signals for left-right and top-down scanning, shared with the previous sweeps when identical.
+        # The last sample brings the beam back to the start of the scan for the next one
+        data_to_write = Waveforms.scan_waveform("triangle", pixels_number, samples_per_step, min_tension, max_tension)
+
+        # The completed rows are sent with one row out of two reversed, like the final image
+        send_rows = None
+        if rows_callback is not None:
+            def send_rows(first_row, rows):
+                rows = rows.copy()
+                first_odd_row = 1 - first_row % 2
+                rows[first_odd_row::2] = rows[first_odd_row::2, ::-1]
+                rows_callback(first_row, rows)
+
+        # Write both signal in one task and read with another, the tasks are reused by the next identical sweeps
+        write_task, read_task = NID.get_pooled_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
+                                                     sampling_frequency, data_to_write, total_samples_to_read)
+        try:
+            # Acquire the image, the raw samples are averaged chunk by chunk
+            image_array = acquire_image(write_task, read_task, samples_per_step, pixels_number, sampling_frequency,
+                                        send_rows, samples_callback)
+
+        except Exception:
+            # Closes the tasks of an aborted or failed scan, they will be configured again by the next sweep
+            NID.evict_pooled_tasks(channel_lr, channel_ud, channel_read)
+            raise
 
         # Reverse rows alternatively
         image_array = ImageProcessing.reverse_alternate_rows(image_array)
 
         # Normalize the values between 0 and 255
-        image_array = ImageProcessing.normalize(image_array)
-
-        return image_array.astype(np.uint8)
+        return ImageProcessing.normalize(image_array)
 
     except Exception as e:
         raise Exception(f"\nFunction triangle_scanning returned : {e}")
@@ -179,8 +241,8 @@ def triangle_scanning(time_per_pixel, sampling_frequency, pixels_number, channel
 def video_init(time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read):
     """
     Initializes the configuration for video acquisition, including creating the staircase signals for scanning
-    and setting up read and write tasks. It adjusts the number of pixels to account for synchronization issues
-    at the start and converts time units appropriately.
+    and setting up continuous read and write tasks. It adjusts the number of pixels to account for synchronization
+    issues at the start and converts time units appropriately. The tasks are started with 'video_start'.
 
     Parameters:
         time_per_pixel (int): Time in microseconds allocated for each pixel.
@@ -191,7 +253,7 @@ def video_init(time_per_pixel, sampling_frequency, pixels_number, channel_lr, ch
         channel_read (str): The channel used for reading the video signal.
 
     Returns:
-        tuple: Contains the write task, read task, timeout for the operation, and the total number of samples to read.
+        tuple: Contains the write task, read task, timeout for one frame, and the number of samples in one frame.
     """
 
     try:
@@ -210,23 +272,20 @@ def video_init(time_per_pixel, sampling_frequency, pixels_number, channel_lr, ch
         min_tension = -10
         max_tension = 10
 
+        # The pooled scanning tasks use the same channels
+        NID.clear_task_pool()
+
         # Set initial voltage for channel_ud
         NID.initial_voltage_setting(min_tension, max_tension, channel_ud)
 
-        # Generating the staircase signal for left-right scanning (repeated "pixels_number" times)
-        horizontal_staircase = np.repeat(np.linspace(min_tension, max_tension, pixels_number), samples_per_step)
-        complete_horizontal_staircase = np.tile(horizontal_staircase, pixels_number)
-
-        # Generating the staircase signal for top-down scanning (unique for the entire image)
-        vertical_staircase = np.repeat(np.linspace(max_tension, min_tension, pixels_number),
-                                       samples_per_step * pixels_number)
-
-        # Structure datas to write
-        data_to_write = np.array([complete_horizontal_staircase, vertical_staircase])
+        # Staircase signals for left-right and top-down scanning, without the park sample since the continuous
+        # regeneration already brings the beam back to the start of the scan
+        data_to_write = Waveforms.scan_waveform("rise", pixels_number, samples_per_step, min_tension, max_tension,
+                                                park_sample=False)
 
         # Write both signal in one task and read with another
         write_task, read_task = NID.configure_video_tasks(channel_lr, channel_ud, channel_read, min_tension, max_tension,
-                                                          sampling_frequency, complete_horizontal_staircase,
+                                                          sampling_frequency, data_to_write[0],
                                                           total_samples_to_read, data_to_write)
 
         return write_task, read_task, timeout, total_samples_to_read
@@ -235,40 +294,76 @@ def video_init(time_per_pixel, sampling_frequency, pixels_number, channel_lr, ch
         raise Exception(f"\nFunction video_init returned : {e}")
 
 
-def video_instance(write_task, read_task, timeout, pixels_number, total_samples_to_read):
+def video_start(write_task, read_task):
     """
-    Captures a single instance of video data by writing to and reading from the configured tasks. It processes
-    the raw data into a 2D image array, normalizes the image values, and corrects for initial acquisition
-    synchronization issues.
+    Starts the continuous write and read tasks configured by 'video_init'. From then on the card regenerates
+    the scanning signals frame after frame and the input samples are streamed until the tasks are closed.
 
     Parameters:
         write_task: The task used for writing the scan signals.
         read_task: The task used for reading the video data.
+    """
+
+    try:
+        NID.start_rw_tasks(write_task, read_task)
+
+    except Exception as e:
+        raise Exception(f"\nFunction video_start returned : {e}")
+
+
+def video_read(read_task, timeout, total_samples_to_read, out=None):
+    """
+    Reads the raw samples of the next frame from the continuous read task. This is the only step of the video
+    waiting on the card, the frame is processed by 'video_frame' while the card acquires the next one.
+
+    The samples are read unscaled: the normalization of the frame doesn't depend on the unit of the samples, so
+    they are never converted to volts.
+
+    Parameters:
+        read_task: The running task used for reading the video data.
         timeout (float): The maximum time to wait for the read operation to complete.
-        pixels_number (int): The number of pixels in one dimension of the video frame, adjusted for synchronization.
-        total_samples_to_read (int): The total number of samples to be read from the read task.
+        total_samples_to_read (int): The number of samples making up one frame.
+        out (numpy.ndarray, optional): A preallocated int16 array receiving the samples.
 
     Returns:
-        numpy.ndarray: The processed 2D image array.
+        numpy.ndarray: The unscaled int16 samples of the frame.
     """
 
     try:
-        # Create a StreamWriter for the analog outputs
-        raw_data = NID.quick_write_and_read(write_task, read_task, total_samples_to_read, timeout)
+        # Read the next frame of the continuous stream
+        return NID.read_frame(read_task, total_samples_to_read, timeout, out)
+
+    except Exception as e:
+        raise Exception(f"\nFunction video_read returned : {e}")
+
+
+def video_frame(raw_data, pixels_number, out=None, normalizer=None):
+    """
+    Processes the raw samples of a frame into a 2D image array, normalizes the image values, and corrects for
+    initial acquisition synchronization issues.
 
+    Parameters:
+        raw_data (numpy.ndarray): The raw samples of the frame, read by 'video_read'.
+        pixels_number (int): The number of pixels in one dimension of the video frame, adjusted for synchronization.
+        out (numpy.ndarray, optional): A uint8 (pixels_number x pixels_number) array receiving the image in place.
+        normalizer (ImageProcessing.Normalizer, optional): The normalizer keeping the contrast between the frames.
+
+    Returns:
+        numpy.ndarray: The processed 2D image array, 'out' if given.
+    """
+
+    try:
         # Reshape to a numpy 2D array (pixels_number x pixels_number)
-        image_array = np.array(raw_data).reshape(pixels_number + 2, pixels_number + 2)
+        image_array = raw_data.reshape(pixels_number + 2, pixels_number + 2)
 
         # To avoid weird behaviour we delete the first row of the image twice
         image_array = ImageProcessing.remove_two_columns(image_array)
 
         # Normalize the values between 0 and 255
-        image_array = ImageProcessing.normalize(image_array)
-
-        return image_array.astype(np.uint8)
+        return ImageProcessing.normalize(image_array, out, normalizer)
 
     except Exception as e:
-        raise Exception(f"\nFunction video_instance returned : {e}")
+        raise Exception(f"\nFunction video_frame returned : {e}")
 
 
 def video_stop(write_task, read_task):
@@ -0,0 +1,213 @@
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtCore import Qt, QLineF
+from PyQt6.QtGui import QPainter, QColor, QPen
+import numpy as np
+from Modules_FIB import Decimation
+
+# Zoom factor of one step of the mouse wheel
+WHEEL_ZOOM_FACTOR = 1.25
+
+# Colors of the plots
+BACKGROUND_COLOR = QColor(0, 0, 0)
+AXIS_COLOR = QColor(70, 70, 70)
+SIGNAL_COLOR = QColor(255, 255, 255)
+TEXT_COLOR = QColor(160, 160, 160)
+
+
+class SignalPlot(QtWidgets.QWidget):
+    """
+    Widget plotting long signals from their min/max envelope, one above the other with a shared sample axis.
+
+    Each signal is an 'Decimation.EnvelopeView', decimated again to the width of the widget each time it is
+    painted. The mouse wheel zooms around the pointer, dragging pans and a double click shows the whole signals.
+
+    Signals:
+        rangeChanged: Emitted with the first and the following last sample shown, after a zoom or a pan.
+    """
+
+    rangeChanged = QtCore.pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        """
+        Initializes an empty plot.
+        """
+
+        super(SignalPlot, self).__init__(parent)
+        self.views = []
+        self.names = []
+        self.drag_position = None
+        self.setMinimumSize(100, 60)
+
+    def set_views(self, views, names=None):
+        """
+        Parameters:
+            views (list of Decimation.EnvelopeView): The signals to plot, sharing the same number of samples.
+            names (list of str, optional): Name of every signal, written in its top left corner.
+        """
+
+        self.views = list(views)
+        self.names = list(names) if names is not None else [""] * len(self.views)
+        self.update()
+        self.emit_range()
+
+    def clear(self):
+        """
+        Removes the signals from the plot.
+        """
+
+        self.set_views([])
+
+    def emit_range(self):
+        if self.views:
+            self.rangeChanged.emit(self.views[0].start, self.views[0].stop)
+
+    def paintEvent(self, event):
+        """
+        Draws every column of the envelopes as a vertical line, each one joining the previous column so the plot
+        stays continuous when zoomed in.
+        """
+
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), BACKGROUND_COLOR)
+
+        if not self.views:
+            painter.end()
+            return
+
+        width = self.width()
+        lane_height = self.height() / len(self.views)
+
+        for lane, view in enumerate(self.views):
+            top = lane * lane_height + 2
+            height = lane_height - 4
+            span = max(view.max_value - view.min_value, np.finfo(np.float64).tiny)
+
+            # Zero axis
+            if view.min_value <= 0 <= view.max_value:
+                painter.setPen(QPen(AXIS_COLOR))
+                zero = top + view.max_value / span * height
+                painter.drawLine(QLineF(0, zero, width, zero))
+
+            minimums, maximums = view.envelope(width)
+            if len(minimums):
+                low = np.minimum(minimums, np.append(minimums[:1], maximums[:-1]))
+                high = np.maximum(maximums, np.append(maximums[:1], minimums[:-1]))
+                y_low = top + (view.max_value - low) / span * height
+                y_high = top + (view.max_value - high) / span * height
+                x = (np.arange(len(minimums)) + 0.5) * width / len(minimums)
+
+                painter.setPen(QPen(SIGNAL_COLOR))
+                painter.drawLines([QLineF(x0, y0, x0, y1) for x0, y0, y1 in zip(x.tolist(), y_low.tolist(),
+                                                                                y_high.tolist())])
+
+            painter.setPen(QPen(TEXT_COLOR))
+            painter.drawText(QtCore.QPointF(4, top + 12), self.names[lane])
+
+        painter.end()
+
+    def wheelEvent(self, event):
+        """
+        Zooms around the sample under the mouse pointer.
+        """
+
+        if not self.views:
+            return
+
+        factor = WHEEL_ZOOM_FACTOR ** (event.angleDelta().y() / 120)
+        view = self.views[0]
+        anchor = view.start + event.position().x() / max(self.width(), 1) * (view.stop - view.start)
+        for view in self.views:
+            view.zoom(factor, anchor)
+
+        self.update()
+        self.emit_range()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_position = event.position().x()
+
+    def mouseMoveEvent(self, event):
+        """
+        Pans the signals while the mouse is dragged.
+        """
+
+        if self.drag_position is None or not self.views:
+            return
+
+        view = self.views[0]
+        samples = round((self.drag_position - event.position().x()) * (view.stop - view.start) / max(self.width(), 1))
+        if samples:
+            for view in self.views:
+                view.pan(samples)
+            self.drag_position = event.position().x()
+            self.update()
+            self.emit_range()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_position = None
+
+    def mouseDoubleClickEvent(self, event):
+        """
+        Shows the whole signals.
+        """
+
+        for view in self.views:
+            view.reset()
+
+        self.update()
+        self.emit_range()
+
+
+class SignalInspector(QtWidgets.QWidget):
+    """
+    Window inspecting the raw input signal of a scan, before it is averaged into pixels, to check the noise,
+    the settling of the detector or the synchronisation at the start of the rows.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Builds the window, with the plot and a label describing the range shown.
+        """
+
+        super(SignalInspector, self).__init__(parent)
+        self.setWindowTitle("Raw signal inspector")
+        self.resize(900, 300)
+
+        self.label_range = QtWidgets.QLabel(self)
+        self.plot = SignalPlot(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.label_range)
+        layout.addWidget(self.plot, 1)
+
+        self.sampling_frequency = None
+        self.samples_per_row = None
+        self.plot.rangeChanged.connect(self.show_range)
+
+    def set_signal(self, signal, sampling_frequency, samples_per_row=None, name="Detector"):
+        """
+        Shows a new signal, entirely.
+
+        Parameters:
+            signal (numpy.ndarray): The raw samples.
+            sampling_frequency (float): The sampling frequency of the signal, in Hz.
+            samples_per_row (int, optional): Number of samples of a row of the scan, to show the rows in the range.
+            name (str): Name of the signal.
+        """
+
+        self.sampling_frequency = sampling_frequency
+        self.samples_per_row = samples_per_row
+        self.plot.set_views([Decimation.EnvelopeView(signal)], [name])
+
+    def show_range(self, start, stop):
+        """
+        Describes the range of samples shown.
+        """
+
+        text = f"Samples {start} - {stop}"
+        if self.sampling_frequency:
+            text += f"  ({start / self.sampling_frequency * 1000:.3f} - {stop / self.sampling_frequency * 1000:.3f} ms)"
+        if self.samples_per_row:
+            text += f"  rows {start // self.samples_per_row} - {(stop - 1) // self.samples_per_row}"
+        text += "    Wheel : zoom, drag : pan, double click : whole signal"
+
+        self.label_range.setText(text)
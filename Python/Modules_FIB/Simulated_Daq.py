@@ -0,0 +1,734 @@
+import threading
+import time
+import numpy as np
+from nidaqmx.constants import AcquisitionType, RegenerationMode
+
+# Properties of the simulated card
+SIMULATED_DEVICE_NAME = "SimDev1"
+SIMULATED_AO_CHANNELS = 2
+SIMULATED_AI_CHANNELS = 8
+SIMULATED_MAX_RATE = 1250000.0
+SIMULATED_AI_RESOLUTION = 16  # Bits of the unscaled input samples
+
+# Voltage range of the simulated detector output
+DETECTOR_MIN_VOLTAGE = 0
+DETECTOR_MAX_VOLTAGE = 5
+
+
+def synthetic_specimen(size=512):
+    """
+    Generates a synthetic specimen used by the simulator as the imaged sample.
+
+    The specimen is made of a grey gradient, a lattice of bright disks and an "L" shaped mark. The mark is not
+    symmetric, which makes flipped or transposed images easy to spot.
+
+    Parameters:
+        size (int): Number of pixels per row and column of the specimen.
+
+    Returns:
+        numpy.ndarray: A 2D float32 array with values between 0 and 1.
+    """
+
+    try:
+        y, x = np.mgrid[0:size, 0:size] / size
+
+        # Background gradient
+        specimen = 0.15 + 0.25 * x
+
+        # Lattice of disks
+        cx = (x * 8) % 1 - 0.5
+        cy = (y * 8) % 1 - 0.5
+        specimen += 0.4 * ((cx ** 2 + cy ** 2) < 0.08)
+
+        # "L" shaped mark in the top left corner
+        mark = ((x > 0.05) & (x < 0.1) & (y > 0.05) & (y < 0.35)) | ((x > 0.05) & (x < 0.25) & (y > 0.3) & (y < 0.35))
+        specimen[mark] = 1
+
+        return np.clip(specimen, 0, 1).astype(np.float32)
+
+    except Exception as e:
+        raise Exception(f"\nFunction synthetic_specimen returned : {e}")
+
+
+def parse_channels(physical_channel):
+    """
+    Splits a physical channel string into device and channel names.
+
+    Supports the nidaqmx syntax for lists and ranges, for example "SimDev1/ao0, SimDev1/ao1" or "SimDev1/ai0:3".
+
+    Parameters:
+        physical_channel (str): The physical channel string.
+
+    Returns:
+        list of str: The complete name of every channel, for example ["SimDev1/ao0", "SimDev1/ao1"].
+    """
+
+    channels = []
+    for part in physical_channel.split(','):
+        part = part.strip().lstrip('/')
+        device, channel = part.split('/', 1)
+
+        if ':' in channel:
+            first, last = channel.split(':')
+            prefix = first.rstrip('0123456789')
+            for index in range(int(first[len(prefix):]), int(last.lstrip(prefix)) + 1):
+                channels.append(f"{device}/{prefix}{index}")
+        else:
+            channels.append(f"{device}/{channel}")
+
+    return channels
+
+
+class _PhysicalChannel:
+    """
+    Physical channel of the simulated device, only carries its name like nidaqmx.system.PhysicalChannel.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+
+class SimulatedDevice:
+    """
+    Simulated NI card, mimicking the properties of nidaqmx.system.Device used by the application.
+
+    The device remembers the voltage held by each analog output, so that a scan started after an
+    'initial_voltage_setting' sees the beam where it was left, like on the real card.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.ao_physical_chans = [_PhysicalChannel(f"{name}/ao{i}") for i in range(SIMULATED_AO_CHANNELS)]
+        self.ai_physical_chans = [_PhysicalChannel(f"{name}/ai{i}") for i in range(SIMULATED_AI_CHANNELS)]
+        self.ai_max_single_chan_rate = SIMULATED_MAX_RATE
+        self.ao_max_rate = SIMULATED_MAX_RATE
+        self.output_voltages = {chan.name: 0.0 for chan in self.ao_physical_chans}
+        self.tasks = []
+
+    def reset_device(self):
+        """
+        Stops every task running on the device and brings the outputs back to 0 V.
+        """
+
+        for task in list(self.tasks):
+            task.stop()
+        for channel in self.output_voltages:
+            self.output_voltages[channel] = 0.0
+
+
+class _DeviceCollection:
+    """
+    Collection of simulated devices, mimicking nidaqmx.system.System.devices.
+    """
+
+    def __init__(self, devices):
+        self._devices = devices
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, item):
+        name = item.name if isinstance(item, SimulatedDevice) else item
+        return name in self._devices
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            return list(self._devices.values())[item]
+        return self._devices[item]
+
+    @property
+    def device_names(self):
+        return list(self._devices)
+
+
+class _SimulatedSystem:
+    """
+    Local system of the simulator, mimicking nidaqmx.system.System.
+    """
+
+    def __init__(self, backend):
+        self.devices = _DeviceCollection(backend.devices)
+
+
+class _Channel:
+    """
+    Channel of a simulated task, mimicking an item of task.ai_channels.
+    """
+
+    def __init__(self, channels, name):
+        self._channels = channels
+        self.name = name
+
+    @property
+    def ai_dev_scaling_coeff(self):
+        """
+        Polynomial converting the unscaled samples to volts, the codes covering the range of the channel.
+        """
+
+        full_scale = max(abs(self._channels.min_val), abs(self._channels.max_val))
+        return [0.0, full_scale / 2 ** (SIMULATED_AI_RESOLUTION - 1), 0.0, 0.0]
+
+
+class _Channels:
+    """
+    Channel collection of a simulated task, mimicking task.ao_channels and task.ai_channels.
+    """
+
+    def __init__(self, task):
+        self._task = task
+        self.names = []
+        self.min_val = -10.0
+        self.max_val = 10.0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return _Channel(self, self.names[index])
+
+    def _add(self, physical_channel, min_val, max_val):
+        for name in parse_channels(physical_channel):
+            device, _ = name.split('/', 1)
+            if device not in self._task._backend.devices:
+                raise Exception(f"Simulated device '{device}' doesn't exist")
+            self.names.append(name)
+        self.min_val = min_val
+        self.max_val = max_val
+
+    def add_ao_voltage_chan(self, physical_channel, name_to_assign_to_channel="", min_val=-10.0, max_val=10.0,
+                            **kwargs):
+        self._add(physical_channel, min_val, max_val)
+
+    def add_ai_voltage_chan(self, physical_channel, name_to_assign_to_channel="", min_val=-5.0, max_val=5.0,
+                            **kwargs):
+        self._add(physical_channel, min_val, max_val)
+
+
+class _Timing:
+    """
+    Timing of a simulated task, mimicking task.timing.
+    """
+
+    def __init__(self):
+        self.samp_clk_rate = None
+        self.samp_quant_samp_mode = None
+        self.samp_quant_samp_per_chan = 1
+
+    def cfg_samp_clk_timing(self, rate, source="", active_edge=None, sample_mode=AcquisitionType.FINITE,
+                            samps_per_chan=1000):
+        self.samp_clk_rate = float(rate)
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = int(samps_per_chan)
+
+
+class _StartTrigger:
+    """
+    Start trigger of a simulated task, only digital edges coming from an analog output start trigger are supported.
+    """
+
+    def __init__(self):
+        self.source = None
+
+    def cfg_dig_edge_start_trig(self, trigger_source, trigger_edge=None):
+        self.source = trigger_source
+
+
+class _Triggers:
+    def __init__(self):
+        self.start_trigger = _StartTrigger()
+
+
+class _OutStream:
+    """
+    Output stream of a simulated task, mimicking task.out_stream.
+    """
+
+    def __init__(self, task):
+        self._task = task
+        self.regen_mode = RegenerationMode.ALLOW_REGENERATION
+        self.output_buf_size = None
+
+    @property
+    def total_samp_per_chan_generated(self):
+        return self._task._generated_samples()
+
+    @property
+    def space_avail(self):
+        return self._task._space_available()
+
+
+class _InStream:
+    """
+    Input stream of a simulated task, mimicking task.in_stream.
+    """
+
+    def __init__(self, task):
+        self._task = task
+
+    @property
+    def total_samp_per_chan_acquired(self):
+        return self._task._read_position
+
+    @property
+    def avail_samp_per_chan(self):
+        return max(0, min(self._task._clock_samples(), self._task._last_sample()) - self._task._read_position)
+
+
+class Task:
+    """
+    Simulated NI-DAQmx task, supporting the subset of nidaqmx.Task used by the application.
+
+    An analog output task stores the written waveform and generates it from the moment it is started. When
+    regeneration is not allowed, the output buffer is a ring of 'out_stream.output_buf_size' samples which must be
+    refilled while the task runs, and writing after the generation caught up with the written samples fails like
+    an underflow of a real card.
+    An analog input task triggered by "/<device>/ao/StartTrigger" starts with the output task of that device, and
+    each input sample is computed from the output sample written 'lag_samples' earlier: the first output channel
+    is taken as the horizontal deflection and the second one as the vertical deflection, the specimen is looked up
+    at that position and the detector noise is added.
+    """
+
+    def __init__(self, backend, new_task_name=""):
+        self._backend = backend
+        self.name = new_task_name
+        self.ao_channels = _Channels(self)
+        self.ai_channels = _Channels(self)
+        self.timing = _Timing()
+        self.triggers = _Triggers()
+        self.out_stream = _OutStream(self)
+        self.in_stream = _InStream(self)
+
+        self._data = None  # Waveform in the output buffer (channels x samples)
+        self._written = 0  # Samples written since the start, when regeneration isn't allowed
+        self._consumed = 0  # Samples generated by an unpaced generation without regeneration
+        self._generated_at_stop = None  # Samples generated before the last stop, still readable once stopped
+        self._start_time = None  # Time at which the sample clock started, None while not running
+        self._running = False
+        self._source_task = None  # Output task whose start trigger started this input task
+        self._initial_output = None  # Voltages held by the outputs before the start
+        self._read_position = 0
+        self._closed = False
+
+    # Context manager, like nidaqmx.Task
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Helpers
+    def _device(self):
+        channels = self.ao_channels.names or self.ai_channels.names
+        return self._backend.devices[channels[0].split('/')[0]]
+
+    def _check_open(self):
+        if self._closed:
+            raise Exception(f"Simulated task '{self.name}' has already been closed")
+
+    def _is_finite(self):
+        return self.timing.samp_quant_samp_mode == AcquisitionType.FINITE
+
+    def _is_streaming(self):
+        return (len(self.ao_channels) > 0 and self.timing.samp_clk_rate is not None and
+                self.out_stream.regen_mode == RegenerationMode.DONT_ALLOW_REGENERATION)
+
+    def _buffer_size(self):
+        return self.out_stream.output_buf_size or self.timing.samp_quant_samp_per_chan
+
+    def _last_sample(self):
+        """Number of samples the task produces before stopping on its own."""
+        if self._is_finite():
+            return self.timing.samp_quant_samp_per_chan
+        return float('inf')
+
+    def _clock_samples(self):
+        """Number of sample clock ticks elapsed since the start."""
+        if not self._running or self._start_time is None:
+            return 0
+        if not self._backend.realtime or self.timing.samp_clk_rate is None:
+            return float('inf')
+        return int((time.perf_counter() - self._start_time) * self.timing.samp_clk_rate)
+
+    def _generated_samples(self):
+        if not self._running and self._generated_at_stop is not None:
+            return self._generated_at_stop
+        if self._data is None:
+            return 0
+        generated = min(self._clock_samples(), self._last_sample())
+        if self._is_streaming():  # The generation can't go beyond the written samples
+            if not self._backend.realtime:
+                return self._consumed if self._running else 0
+            return int(min(generated, self._written))
+        if generated == float('inf'):  # Unpaced continuous generation, one buffer is considered generated
+            return self._data.shape[1]
+        return int(generated)
+
+    def _underflowed(self):
+        """True if a generation without regeneration ran out of written samples before its end."""
+        return (self._is_streaming() and self._running and self._backend.realtime and
+                self._written < self._last_sample() and self._clock_samples() > self._written)
+
+    def _drain(self):
+        """An unpaced generation without regeneration generates its remaining samples when it is waited for."""
+        if self._is_streaming() and not self._backend.realtime and self._running:
+            self._consumed = self._written
+
+    def _space_available(self):
+        if not self._is_streaming():
+            return 0
+        return self._buffer_size() - (self._written - self._generated_samples())
+
+    def _output_samples(self, indices):
+        """
+        Voltages output by an analog output task at the given sample indices (channels x len(indices)).
+        Negative indices return the voltages held before the start, indices after the end of a finite generation
+        return the last sample and a continuous generation regenerates its buffer.
+        """
+
+        length = self._data.shape[1]
+        output = np.empty((self._data.shape[0], len(indices)))
+        before = indices < 0
+
+        if self._is_streaming():
+            # Only the last buffer of written samples is still available
+            positions = np.clip(indices, max(0, self._written - length), max(0, self._written - 1)) % length
+        elif self._is_finite():
+            # A finite generation longer than its buffer regenerates it
+            positions = np.minimum(indices, self._last_sample() - 1) % length
+        else:
+            positions = indices % length
+
+        output[:, ~before] = self._data[:, positions[~before]]
+        output[:, before] = self._initial_output[:, None]
+        return output
+
+    # Task control
+    def start(self):
+        self._check_open()
+        device = self._device()
+        if self not in device.tasks:
+            device.tasks.append(self)
+
+        if len(self.ao_channels):
+            self._initial_output = np.array([device.output_voltages[name] for name in self.ao_channels.names])
+            self._generated_at_stop = None
+            self._running = True
+            self._start_time = time.perf_counter()
+
+            # Starts the input tasks waiting for this start trigger
+            trigger = '/' + device.name + '/ao/StartTrigger'
+            for task in device.tasks:
+                if task is not self and task._running is None and task.triggers.start_trigger.source == trigger:
+                    task._trigger(self)
+        else:
+            self._read_position = 0
+            if self.triggers.start_trigger.source:
+                self._running = None  # Armed, waiting for the trigger
+            else:
+                self._running = True
+                self._start_time = time.perf_counter()
+
+    def _trigger(self, source_task):
+        self._source_task = source_task
+        self._start_time = source_task._start_time
+        self._running = True
+
+    def stop(self):
+        self._drain()
+        if len(self.ao_channels) and self._running and self._data is not None:
+            # The outputs keep the last generated voltage
+            generated = self._generated_samples()
+            self._generated_at_stop = generated
+            if generated > 0:
+                last = self._output_samples(np.array([generated - 1]))[:, 0]
+                device = self._device()
+                for name, voltage in zip(self.ao_channels.names, last):
+                    device.output_voltages[name] = float(voltage)
+
+        self._running = False
+        self._start_time = None
+        self._source_task = None
+        self._read_position = 0
+
+        # Without regeneration, the buffer has to be written again before the next start
+        if self._is_streaming():
+            self._data = None
+            self._written = 0
+            self._consumed = 0
+
+    def close(self):
+        if not self._closed:
+            self.stop()
+            if self.ao_channels.names or self.ai_channels.names:
+                device_tasks = self._device().tasks
+                if self in device_tasks:
+                    device_tasks.remove(self)
+            self._closed = True
+
+    def is_task_done(self):
+        if not self._running:
+            return True
+        if self._is_streaming():
+            self._drain()
+            return self._is_finite() and self._generated_samples() >= self._last_sample()
+        return self._is_finite() and self._clock_samples() >= self._last_sample()
+
+    def wait_until_done(self, timeout=10.0):
+        self._check_open()
+        self._drain()
+        if not self._running:
+            return
+        if not self._is_finite():
+            time.sleep(timeout)
+            raise Exception("Simulated wait_until_done timed out on a continuous task")
+
+        if self._backend.realtime:
+            remaining = self._start_time + self._last_sample() / self.timing.samp_clk_rate - time.perf_counter()
+            if remaining > timeout:
+                time.sleep(timeout)
+                raise Exception("Simulated wait_until_done timed out")
+            if remaining > 0:
+                time.sleep(remaining)
+
+    # Writing
+    def _write(self, data, timeout=10.0):
+        self._check_open()
+        data = np.array(data, dtype=np.float64)  # The driver keeps its own copy of the samples
+        channels = len(self.ao_channels)
+
+        if data.ndim == 0:
+            data = np.full((channels, 1), float(data))
+        elif data.ndim == 1:
+            data = data.reshape(1, -1) if channels == 1 else data.reshape(channels, 1)
+
+        if data.shape[0] != channels:
+            raise Exception(f"Simulated write expected {channels} channels, got {data.shape[0]}")
+
+        if self._is_streaming():
+            return self._stream_write(data, timeout)
+
+        self._data = data
+
+        # Without timing configuration the task is on demand, the voltages are applied immediately
+        if self.timing.samp_clk_rate is None:
+            device = self._device()
+            for name, voltage in zip(self.ao_channels.names, data[:, -1]):
+                device.output_voltages[name] = float(voltage)
+
+        return data.shape[1]
+
+    def _stream_write(self, data, timeout):
+        """
+        Appends samples to the ring buffer of a generation without regeneration, waiting for enough free space.
+        """
+
+        size = self._buffer_size()
+        number_of_samples = data.shape[1]
+        if self._data is None:
+            self._data = np.zeros((data.shape[0], size))
+            self._written = 0
+            self._consumed = 0
+
+        if number_of_samples > size:
+            raise Exception("Simulated write is larger than the output buffer")
+        if self._is_finite() and self._written + number_of_samples > self._last_sample():
+            raise Exception("Simulated write exceeds the number of samples of the finite generation")
+
+        if self._running and not self._backend.realtime:
+            # An unpaced generation only generates the samples needed to make room for the new ones
+            self._consumed = max(self._consumed, self._written + number_of_samples - size)
+
+        elif self._running:
+            deadline = time.perf_counter() + timeout
+            while True:
+                if self._underflowed():
+                    raise Exception(f"Simulated generation stopped after {self._written} samples, the output buffer "
+                                    f"underflowed")
+                if self._space_available() >= number_of_samples:
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise Exception("Simulated write timed out, the output buffer is full")
+                time.sleep(min(remaining, 0.001))
+
+        elif self._written + number_of_samples > size:
+            raise Exception("Simulated write before the start is larger than the output buffer")
+
+        positions = (self._written + np.arange(number_of_samples)) % size
+        self._data[:, positions] = data
+        self._written += number_of_samples
+
+        return number_of_samples
+
+    def write(self, data, auto_start=False, timeout=10.0):
+        return self._write(data, timeout)
+
+    # Reading
+    def _acquire(self, number_of_samples, timeout):
+        """
+        Waits until the requested samples are acquired and computes them from the output waveform.
+        """
+
+        self._check_open()
+        if self._read_position + number_of_samples > self._last_sample():
+            raise Exception("Simulated read requested more samples than the finite acquisition contains")
+
+        deadline = time.perf_counter() + timeout
+        while self._clock_samples() < self._read_position + number_of_samples:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise Exception("Simulated read timed out")
+            time.sleep(min(remaining, 0.001))
+
+        indices = np.arange(self._read_position, self._read_position + number_of_samples)
+        self._read_position += number_of_samples
+        return self._backend.detector(self, indices)
+
+    def read(self, number_of_samples_per_channel=1, timeout=10.0):
+        data = self._acquire(number_of_samples_per_channel, timeout)
+        if number_of_samples_per_channel == 1:
+            return float(data[0])
+        return data.tolist()
+
+    # Additional nidaqmx.Task helpers used by the application
+    def control(self, action):
+        self._check_open()
+
+
+class AnalogMultiChannelWriter:
+    """
+    Simulated version of nidaqmx.stream_writers.AnalogMultiChannelWriter.
+    """
+
+    def __init__(self, task_out_stream, auto_start=False):
+        self._task = task_out_stream._task
+
+    def write_many_sample(self, data, timeout=10.0):
+        return self._task._write(data, timeout)
+
+
+class AnalogSingleChannelReader:
+    """
+    Simulated version of nidaqmx.stream_readers.AnalogSingleChannelReader.
+    """
+
+    def __init__(self, task_in_stream):
+        self._task = task_in_stream._task
+
+    def read_many_sample(self, data, number_of_samples_per_channel=-1, timeout=10.0):
+        if number_of_samples_per_channel == -1:
+            number_of_samples_per_channel = len(data)
+        data[:number_of_samples_per_channel] = self._task._acquire(number_of_samples_per_channel, timeout)
+        return number_of_samples_per_channel
+
+
+class AnalogUnscaledReader:
+    """
+    Simulated version of nidaqmx.stream_readers.AnalogUnscaledReader, quantizing the detector voltages.
+    """
+
+    def __init__(self, task_in_stream):
+        self._task = task_in_stream._task
+
+    def read_int16(self, data, number_of_samples_per_channel=-1, timeout=10.0):
+        if number_of_samples_per_channel == -1:
+            number_of_samples_per_channel = data.shape[1]
+
+        volts_per_code = self._task.ai_channels[0].ai_dev_scaling_coeff[1]
+        codes = np.rint(self._task._acquire(number_of_samples_per_channel, timeout) / volts_per_code)
+        limit = 2 ** (SIMULATED_AI_RESOLUTION - 1)
+        data[0, :number_of_samples_per_channel] = np.clip(codes, -limit, limit - 1)
+        return number_of_samples_per_channel
+
+
+class SimulatedBackend:
+    """
+    Backend simulating an NI card, so that the whole scanning and writing stack runs without hardware.
+
+    The analog outputs are recorded and the analog inputs return the signal a detector would give when the beam
+    is deflected by those outputs over a specimen image, with a configurable lag between output and input and
+    gaussian detector noise.
+    """
+
+    name = "simulated"
+
+    def __init__(self, specimen=None, noise=0.02, lag_samples=2, realtime=False, seed=None,
+                 device_name=SIMULATED_DEVICE_NAME):
+        """
+        Parameters:
+            specimen (numpy.ndarray or str, optional): Image of the specimen, either as a 2D array or a path to an
+                                                       image file. A synthetic specimen is used by default.
+            noise (float): Standard deviation of the detector noise, in volts.
+            lag_samples (int): Number of samples between an output sample and the input sample it produces.
+            realtime (bool): If True the samples are produced at the configured sampling frequency, otherwise as
+                             fast as they are read, which is useful for benchmarks.
+            seed (int, optional): Seed of the noise generator, for reproducible acquisitions.
+            device_name (str): Name of the simulated device.
+        """
+
+        try:
+            if specimen is None:
+                specimen = synthetic_specimen()
+            elif isinstance(specimen, str):
+                from PIL import Image
+                specimen = np.asarray(Image.open(specimen).convert('L'), dtype=np.float32) / 255
+            self.specimen = np.asarray(specimen, dtype=np.float32)
+
+            self.noise = float(noise)
+            self.lag_samples = int(lag_samples)
+            self.realtime = bool(realtime)
+            self._rng = np.random.default_rng(seed)
+            self._lock = threading.Lock()
+            self.devices = {device_name: SimulatedDevice(device_name)}
+
+        except Exception as e:
+            raise Exception(f"\nSimulatedBackend initialisation returned : {e}")
+
+    AnalogMultiChannelWriter = AnalogMultiChannelWriter
+    AnalogSingleChannelReader = AnalogSingleChannelReader
+    AnalogUnscaledReader = AnalogUnscaledReader
+
+    def Task(self, new_task_name=""):
+        return Task(self, new_task_name)
+
+    def system(self):
+        return _SimulatedSystem(self)
+
+    def device(self, name):
+        return self.devices[name]
+
+    def detector(self, read_task, indices):
+        """
+        Computes the detector voltages read by an input task at the given sample indices.
+
+        Parameters:
+            read_task (Task): The simulated input task.
+            indices (numpy.ndarray): Indices of the input samples since the start of the task.
+
+        Returns:
+            numpy.ndarray: The simulated detector voltages.
+        """
+
+        height, width = self.specimen.shape
+        source = read_task._source_task
+
+        if source is not None and source._data is not None:
+            outputs = source._output_samples(indices - self.lag_samples)
+            min_val, max_val = source.ao_channels.min_val, source.ao_channels.max_val
+            x = outputs[0]
+            y = outputs[1] if len(outputs) > 1 else np.full_like(x, max_val)
+
+            # Deflection voltages to specimen pixels, the highest vertical voltage is the top of the specimen
+            columns = np.rint((x - min_val) / (max_val - min_val) * (width - 1)).astype(np.intp)
+            rows = np.rint((max_val - y) / (max_val - min_val) * (height - 1)).astype(np.intp)
+            values = self.specimen[np.clip(rows, 0, height - 1), np.clip(columns, 0, width - 1)]
+        else:
+            values = np.zeros(len(indices), dtype=np.float32)
+
+        with self._lock:
+            noise = self._rng.normal(0, self.noise, len(indices)) if self.noise else 0
+
+        return DETECTOR_MIN_VOLTAGE + values * (DETECTOR_MAX_VOLTAGE - DETECTOR_MIN_VOLTAGE) + noise
@@ -1,10 +1,22 @@
 from PyQt6 import QtCore
 from PyQt6.QtCore import QThread, pyqtSignal
 from Modules_FIB import Scanning
+from Modules_FIB import ImageProcessing
 from Modules_FIB import Visa_Dependencies
+import queue
+import threading
 import time
 import numpy as np
 
+# Number of raw frames waiting to be processed during the video, the oldest frame being dropped when it is full
+VIDEO_QUEUE_SIZE = 2
+
+# Number of processed frames of the video kept for the display, one being written, one displayed and the newest one
+FRAME_RING_SIZE = 3
+
+# Period of the latency reports of the video, in seconds
+LATENCY_PERIOD = 1.0
+
 
 #########################################################################################
 # Classes
@@ -20,13 +32,18 @@ class SweepThread(QThread):
     Attributes:
         errorOccurred (pyqtSignal): Signal emitted when an error occurs in the thread.
         image (pyqtSignal): Signal emitted with the image data once the sweep process is complete.
+        rows (pyqtSignal): Signal emitted with the index of the first row and the raw values of the rows
+                           completed during the sweep, so that the image can be displayed progressively.
+        raw_signal (numpy.ndarray): The raw samples of the sweep when 'record_signal' is True, None otherwise.
+        raw_samples_per_row (int): Number of raw samples of a row of the sweep, extra columns included.
     """
 
     errorOccurred = QtCore.pyqtSignal(str)  # Signal to handle possible errors
     image = QtCore.pyqtSignal(np.ndarray)
+    rows = QtCore.pyqtSignal(int, np.ndarray)
 
     def __init__(self, time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read, mode,
-                 parent=None):
+                 record_signal=False, parent=None):
         """
         Initializes the SweepThread with necessary parameters for the sweep process.
 
@@ -37,6 +54,7 @@ class SweepThread(QThread):
             channel_lr (str): The channel used for left-right movement.
             channel_ud (str): The channel used for up-down movement.
             channel_read (str): The channel used for reading the data.
+            record_signal (bool): If True, the raw samples are kept in 'raw_signal' to be inspected.
             parent (QObject): The parent object for this thread, if any.
         """
         try:
@@ -48,33 +66,234 @@ class SweepThread(QThread):
             self.channel_ud = channel_ud
             self.channel_read = channel_read
             self.mode = mode
+            self.aborted = False
+            self.record_signal = record_signal
+            self.raw_signal = None
+            self.raw_samples_per_row = None
 
         except Exception as e:
             self.errorOccurred.emit(f"__init__ in SweepThread returned : {str(e)}")
 
+    # Send the rows acquired so far, called from the acquisition
+    def send_rows(self, first_row, rows):
+        """
+        Emits the rows completed during the sweep, or stops the acquisition if the user aborted it.
+
+        Parameters:
+            first_row (int): Index of the first completed row in the image.
+            rows (numpy.ndarray): Raw values of the completed rows.
+        """
+
+        if self.aborted:
+            raise Exception("Sweep aborted by the user")
+
+        if len(rows):  # Chunks completing no row are only checked for the abort
+            self.rows.emit(first_row, rows.copy())  # The acquisition keeps writing in its own array
+
+    # Keep the raw samples, called from the acquisition
+    def record_samples(self, first_sample, samples, total_samples):
+        """
+        Copies a chunk of raw samples into 'raw_signal', allocated at the first chunk.
+
+        Parameters:
+            first_sample (int): Index of the first sample of the chunk.
+            samples (numpy.ndarray): The raw samples, only valid during the call.
+            total_samples (int): Number of samples of the whole sweep.
+        """
+
+        if self.raw_signal is None:
+            self.raw_signal = np.empty(total_samples, dtype=np.float32)
+            self.raw_samples_per_row = total_samples // (self.pixels_number + 2)
+
+        self.raw_signal[first_sample:first_sample + len(samples)] = samples
+
+    # Ask the acquisition to stop after the rows being acquired
+    def abort(self):
+        """
+        Aborts the sweep. The acquisition stops as soon as the rows being acquired are completed, and no image
+        is emitted.
+        """
+
+        self.aborted = True
+
     # Get the list of pixels and send it back
     def run(self):
         """
         Executes the sweep operation in a separate thread.
 
         This method is automatically called when the thread starts. It runs the sweep process and emits
-        the resulting image data or any errors encountered.
+        the completed rows while they are acquired, then the resulting image data or any errors encountered.
         """
 
         try:
+            record_samples = self.record_samples if self.record_signal else None
+
             # Scanning signal generation from "Scanning.py"
             if self.mode == "Triangle":
                 data = Scanning.triangle_scanning(self.time_per_pixel, self.sampling_frequency, self.pixels_number,
                                                   self.channel_lr,
-                                                  self.channel_ud, self.channel_read)
+                                                  self.channel_ud, self.channel_read, self.send_rows, record_samples)
             else:
                 data = Scanning.rise_scanning(self.time_per_pixel, self.sampling_frequency, self.pixels_number,
                                               self.channel_lr,
-                                              self.channel_ud, self.channel_read)
+                                              self.channel_ud, self.channel_read, self.send_rows, record_samples)
             self.image.emit(data)
 
         except Exception as e:
-            self.errorOccurred.emit(f"SweepThread returned : {str(e)}")
+            if not self.aborted:  # An aborted sweep isn't an error
+                self.errorOccurred.emit(f"SweepThread returned : {str(e)}")
+
+
+# Latency of the stages of the video
+class VideoLatency:
+    """
+    Accumulates the time spent by the frames of the video in every stage of the pipeline, from the threads of the
+    stages, and reports the averages over the last period.
+
+    Stages:
+        acquisition: Reading the samples of a frame from the card.
+        processing: From the end of the acquisition to the processed image, waiting in the queue included.
+        display: From the processed image to its display in the interface.
+    """
+
+    STAGES = ("acquisition", "processing", "display")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.durations = {stage: 0.0 for stage in self.STAGES}
+        self.frames = {stage: 0 for stage in self.STAGES}
+        self.dropped = 0
+
+    def add(self, stage, duration):
+        """
+        Adds the time spent by a frame in a stage, in seconds.
+        """
+
+        with self.lock:
+            self.durations[stage] += duration
+            self.frames[stage] += 1
+
+    def drop(self):
+        """
+        Counts a frame dropped because the next stage didn't keep up.
+        """
+
+        with self.lock:
+            self.dropped += 1
+
+    def report(self):
+        """
+        Returns the averages since the last report and starts a new period.
+
+        Returns:
+            dict: The average latency of every stage in milliseconds (None without frame), the number of frames
+                  displayed per second ("fps") and the number of frames dropped ("dropped").
+        """
+
+        with self.lock:
+            now = time.perf_counter()
+            report = {stage: 1000 * self.durations[stage] / self.frames[stage] if self.frames[stage] else None
+                      for stage in self.STAGES}
+            report["fps"] = self.frames["display"] / (now - self.start)
+            report["dropped"] = self.dropped
+
+            self.start = now
+            self.durations = {stage: 0.0 for stage in self.STAGES}
+            self.frames = {stage: 0 for stage in self.STAGES}
+            self.dropped = 0
+
+        return report
+
+
+# Processed frames of the video, between the processing thread and the display
+class FrameRing:
+    """
+    A fixed number of preallocated frames, written by the processing thread and pulled by the display.
+
+    The processing thread writes every frame into a free slot, the display pulls the newest frame when the screen
+    is refreshed and paints it from its slot. A frame replaced by a newer one before being pulled is dropped, so the
+    display is never more than one frame late whatever its speed, and the memory is allocated once when the video
+    starts.
+
+    Attributes:
+        frames (numpy.ndarray): The slots, one 8-bit image each.
+        times (numpy.ndarray): The time every slot was written (time.perf_counter).
+        newest (int): The slot of the last frame written, None before the first frame.
+        pulled (bool): True if the newest frame was already pulled.
+        displayed (int): The slot shown by the display, None before the first 'pull' and after 'release'.
+        dropped (int): Number of frames replaced before being pulled.
+    """
+
+    def __init__(self, shape, size=FRAME_RING_SIZE):
+        """
+        Parameters:
+            shape (tuple of int): The shape of a frame.
+            size (int): Number of slots, at least 3 so that a slot is always free to be written.
+        """
+
+        self.lock = threading.Lock()
+        self.frames = np.zeros((max(3, size),) + tuple(shape), dtype=np.uint8)
+        self.times = np.zeros(len(self.frames))
+        self.newest = None
+        self.pulled = True
+        self.displayed = None
+        self.dropped = 0
+
+    def free_slot(self):
+        """
+        Returns:
+            int: A slot neither holding the newest frame nor being displayed, to write the next frame into.
+        """
+
+        with self.lock:
+            busy = (self.newest, self.displayed)
+            return next(slot for slot in range(len(self.frames)) if slot not in busy)
+
+    def commit(self, slot, written):
+        """
+        Makes the frame written into 'slot' the newest frame.
+
+        Parameters:
+            slot (int): The slot returned by 'free_slot'.
+            written (float): The time the frame was written.
+
+        Returns:
+            bool: True if the previous frame was dropped, never pulled by the display.
+        """
+
+        with self.lock:
+            dropped = not self.pulled
+            self.dropped += dropped
+            self.times[slot] = written
+            self.newest = slot
+            self.pulled = False
+            return dropped
+
+    def pull(self):
+        """
+        Gives the newest frame to the display, which keeps its slot until the next frame is pulled or 'release'
+        is called, so the frame can be painted from the slot without copy.
+
+        Returns:
+            tuple: The slot of the frame (int) and the time it was written, None if no new frame was written since
+                   the last call.
+        """
+
+        with self.lock:
+            if self.pulled:
+                return None
+            self.pulled = True
+            self.displayed = self.newest
+            return self.newest, self.times[self.newest]
+
+    def release(self):
+        """
+        Lets the processing thread write again into the slot of the frame displayed.
+        """
+
+        with self.lock:
+            self.displayed = None
 
 
 # Thread class for close in time acquisition (video scanning)
@@ -83,22 +302,36 @@ class VideoThread(QThread):
     A specialized QThread for handling video acquisition and processing. This thread is responsible for initiating,
     capturing, and stopping video data based on given parameters. It communicates with NI hardware for video data
     acquisition, utilizing specified channels for control and data capture,
-    and operates continuously until explicitly stopped.
+    and operates continuously until explicitly stopped. The hardware tasks run in continuous mode, so frames are
+    sliced out of the input stream without starting or stopping any task between them.
+
+    The video is a pipeline of three stages: this thread only reads the raw frames from the card, a processing
+    thread turns them into images, and the interface displays them. The stages are linked by bounded buffers, so
+    the card acquires the next frame while the previous ones are processed and displayed. When a stage doesn't
+    keep up, the oldest frame waiting for it is dropped: the reads never wait, which would overflow the buffer of
+    the card, and the display always pulls the newest frame from 'frames' at the refresh rate of the screen.
 
     Attributes:
         write_task: Task handle for writing to the hardware, used to control the scanning process.
         read_task: Task handle for reading from the hardware, used to acquire the video data.
-        timeout: The maximum time in seconds to wait for a read operation to complete.
-        total_samples_to_read: The total number of samples to read in each acquisition cycle.
+        timeout: The maximum time in seconds to wait for a frame to be read.
+        total_samples_to_read: The number of samples making up one frame.
         running: A flag indicating whether the video acquisition should continue running.
+        raw_frames (queue.Queue): The raw frames waiting to be processed, with the time they were acquired.
+        free_buffers (queue.Queue): The preallocated int16 buffers the raw frames are read into, one more than the
+                                    frames that can be queued, read and processed at once.
+        frames (FrameRing): The processed frames, pulled by the display.
+        normalizer (ImageProcessing.Normalizer): The contrast of the frames, measured once every
+                                                 CONTRAST_REFRESH_FRAMES frames.
+        latency (VideoLatency): The time spent by the frames in every stage.
 
     Signals:
-        image: Emitted with the captured image data for each frame.
+        latencyUpdated: Emitted every LATENCY_PERIOD seconds with the report of 'VideoLatency'.
         errorOccurred: Emitted with an error message if an exception occurs during acquisition.
     """
 
     errorOccurred = QtCore.pyqtSignal(str)
-    image = QtCore.pyqtSignal(np.ndarray)
+    latencyUpdated = QtCore.pyqtSignal(dict)
 
     # Configures the card for the video acquisition
     def __init__(self, time_per_pixel, sampling_frequency, pixels_number, channel_lr, channel_ud, channel_read,
@@ -129,6 +362,13 @@ class VideoThread(QThread):
             self.timeout = init[2]
             self.total_samples_to_read = init[3]
             self.running = True
+            self.raw_frames = queue.Queue(maxsize=VIDEO_QUEUE_SIZE)
+            self.free_buffers = queue.Queue()
+            for _ in range(VIDEO_QUEUE_SIZE + 3):
+                self.free_buffers.put(np.empty(self.total_samples_to_read, dtype=np.int16))
+            self.frames = FrameRing((pixels_number, pixels_number))
+            self.normalizer = ImageProcessing.Normalizer(refresh_frames=ImageProcessing.CONTRAST_REFRESH_FRAMES)
+            self.latency = VideoLatency()
 
         except Exception as e:
             self.errorOccurred.emit(f"__init__ in VideoThread returned : {str(e)}")
@@ -136,20 +376,89 @@ class VideoThread(QThread):
     # Continuously running
     def run(self):
         """
-        The main loop of the thread, responsible for continuously acquiring video data until stopped. Captured
-        data is emitted through the `image` signal. If an error occurs during acquisition, the error is emitted
-        through the `errorOccurred` signal.
+        The acquisition stage, reading the raw frames from the card until stopped and queuing them for the
+        processing thread, started with it. The latency of the stages is reported every LATENCY_PERIOD seconds.
+        If an error occurs during acquisition, the error is emitted through the `errorOccurred` signal.
         """
+
+        processing = threading.Thread(target=self.process, daemon=True)
         try:
+            # Starts the continuous tasks, the card then scans frame after frame on its own
+            Scanning.video_start(self.write_task, self.read_task)
+            processing.start()
+            last_report = time.perf_counter()
+
             while self.running:  # While the user didn't ask to stop
 
-                # Get a new image
-                data = Scanning.video_instance(self.write_task, self.read_task,
-                                               self.timeout, self.pixels_number, self.total_samples_to_read)
-                self.image.emit(data)
+                # Get the samples of a new frame
+                start = time.perf_counter()
+                raw_data = Scanning.video_read(self.read_task, self.timeout, self.total_samples_to_read,
+                                               self.free_buffers.get())
+                acquired = time.perf_counter()
+                self.latency.add("acquisition", acquired - start)
+
+                # Drop the oldest frame if the processing is late, the next read can't wait
+                while True:
+                    try:
+                        self.raw_frames.put_nowait((raw_data, acquired))
+                        break
+                    except queue.Full:
+                        try:
+                            self.free_buffers.put(self.raw_frames.get_nowait()[0])
+                            self.latency.drop()
+                        except queue.Empty:
+                            pass
+
+                if acquired - last_report >= LATENCY_PERIOD:
+                    self.latencyUpdated.emit(self.latency.report())
+                    last_report = acquired
 
         except Exception as e:
-            self.errorOccurred.emit(f"VideoThread returned : {str(e)}")
+            if self.running:  # The tasks are closed while reading when the video is stopped
+                self.errorOccurred.emit(f"VideoThread returned : {str(e)}")
+
+        finally:
+            self.running = False
+            if processing.is_alive():
+                self.raw_frames.put(None)  # Wakes up the processing thread
+                processing.join()
+
+    # Processing stage, running in its own thread
+    def process(self):
+        """
+        The processing stage, turning the queued raw frames into images written into the frame ring, until the
+        acquisition queues None.
+        """
+
+        try:
+            while True:
+                frame = self.raw_frames.get()
+                if frame is None:
+                    return
+                raw_data, acquired = frame
+
+                slot = self.frames.free_slot()
+                Scanning.video_frame(raw_data, self.pixels_number, self.frames.frames[slot], self.normalizer)
+                self.free_buffers.put(raw_data)
+                processed = time.perf_counter()
+                self.latency.add("processing", processed - acquired)
+                if self.frames.commit(slot, processed):
+                    self.latency.drop()
+
+        except Exception as e:
+            self.running = False
+            self.errorOccurred.emit(f"VideoThread processing returned : {str(e)}")
+
+    # Display stage, called by the interface
+    def frame_displayed(self, processed):
+        """
+        Records the display of a frame, ending its way through the pipeline.
+
+        Parameters:
+            processed (float): The time the frame was processed, pulled with the frame.
+        """
+
+        self.latency.add("display", time.perf_counter() - processed)
 
     # Used to stop the video flux and erase the NI tasks
     def stop(self):
@@ -240,6 +549,7 @@ class ProgressBar(QThread):
             time_per_pixel = time_per_pixel / 1000000
             self.total_time = time_per_pixel * (pixels_number + 2) ** 2
             self.interval = time_per_pixel  # Update interval
+            self.running = True
 
         except Exception as e:
             self.errorOccurred.emit(f"__init__ in ProgressBar thread returned : {str(e)}")
@@ -256,6 +566,9 @@ class ProgressBar(QThread):
         try:
             start_time = time.time()
             while time.time() - start_time < self.total_time:
+                if not self.running:  # The operation has been aborted
+                    self.progressUpdated.emit(0)
+                    return
                 elapsed_time = time.time() - start_time
                 progress = int((elapsed_time / self.total_time) * 100)
                 self.progressUpdated.emit(progress)
@@ -264,3 +577,11 @@ class ProgressBar(QThread):
 
         except Exception as e:
             self.errorOccurred.emit(f"ProgressBar thread returned : {str(e)}")
+
+    # Stops the progression, used when the operation is aborted
+    def stop(self):
+        """
+        Stops the progress updates and brings the progress bar back to 0.
+        """
+
+        self.running = False
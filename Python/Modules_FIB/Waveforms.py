@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Scanning modes supported by the generator
+MODES = ("rise", "triangle")
+
+# Limits of the waveform cache, the most recent waveform is always kept even if it is larger
+CACHE_MAX_ENTRIES = 8
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Generated waveforms, from the least to the most recently used
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_scan_waveform(mode, pixels_number, samples_per_step, min_tension, max_tension, park_sample=True):
+    """
+    Generates the scanning signals of an image, ready to be written by an AnalogMultiChannelWriter.
+
+    Both staircases are written directly into one preallocated 2 x N array through reshaped views, instead of
+    building them with np.repeat / np.tile and stacking them with np.array, which copies the data several times.
+
+    Parameters:
+        mode (str): "rise" to scan every row from left to right, "triangle" to scan one row out of two from right
+                    to left.
+        pixels_number (int): Number of pixels per row and column.
+        samples_per_step (int): Number of samples per pixel.
+        min_tension (float): The minimum voltage of the staircases.
+        max_tension (float): The maximum voltage of the staircases.
+        park_sample (bool): If True, one last sample brings the beam back to the start of the scan, so that the
+                            outputs hold the start position once the scan is over.
+
+    Returns:
+        numpy.ndarray: A C-contiguous float64 array of shape (2, samples), the left-right signal in the first row
+                       and the up-down signal in the second one.
+    """
+
+    try:
+        if mode not in MODES:
+            raise ValueError(f"Unknown scanning mode '{mode}'")
+
+        samples_per_row = pixels_number * samples_per_step
+        total_samples = pixels_number * samples_per_row
+        waveform = np.empty((2, total_samples + int(park_sample)), dtype=np.float64)
+
+        # Left-right staircase, one step per pixel and one staircase per row
+        levels = np.linspace(min_tension, max_tension, pixels_number)
+        horizontal = waveform[0, :total_samples].reshape(pixels_number, pixels_number, samples_per_step)
+        if mode == "rise":
+            horizontal[...] = levels[None, :, None]
+        else:
+            horizontal[0::2] = levels[None, :, None]
+            horizontal[1::2] = levels[None, ::-1, None]
+
+        # Top-down staircase, one step per row (unique for the entire image)
+        vertical = waveform[1, :total_samples].reshape(pixels_number, samples_per_row)
+        vertical[...] = np.linspace(max_tension, min_tension, pixels_number)[:, None]
+
+        if park_sample:
+            waveform[:, -1] = waveform[:, 0]
+
+        return waveform
+
+    except Exception as e:
+        raise Exception(f"\nFunction build_scan_waveform returned : {e}")
+
+
+def scan_waveform(mode, pixels_number, samples_per_step, min_tension, max_tension, park_sample=True):
+    """
+    Returns the scanning signals of an image from a bounded LRU cache, generating them if needed.
+
+    The waveforms are keyed by all the parameters of 'build_scan_waveform'. The returned array is read-only, so
+    it can be shared between sweeps, and since the same object is returned for identical sweeps, the task pool
+    of 'Ni_Dependencies' knows without comparing the samples that the output buffer doesn't have to be rewritten.
+
+    Parameters:
+        See 'build_scan_waveform'.
+
+    Returns:
+        numpy.ndarray: A read-only, C-contiguous float64 array of shape (2, samples).
+    """
+
+    try:
+        key = (mode, pixels_number, samples_per_step, float(min_tension), float(max_tension), park_sample)
+
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+        waveform = build_scan_waveform(mode, pixels_number, samples_per_step, min_tension, max_tension, park_sample)
+        waveform.flags.writeable = False
+
+        with _cache_lock:
+            _cache[key] = waveform
+            _cache.move_to_end(key)
+
+            # Evict the least recently used waveforms
+            while len(_cache) > 1 and (len(_cache) > CACHE_MAX_ENTRIES or
+                                       sum(w.nbytes for w in _cache.values()) > CACHE_MAX_BYTES):
+                _cache.popitem(last=False)
+
+        return waveform
+
+    except Exception as e:
+        raise Exception(f"\nFunction scan_waveform returned : {e}")
+
+
+def clear_cache():
+    """
+    Empties the waveform cache to free its memory.
+    """
+
+    with _cache_lock:
+        _cache.clear()
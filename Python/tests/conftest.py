@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import pytest
+
+# The modules are imported from the Python directory, which is also the working directory of the application
+PYTHON_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("FIB_DAQ_BACKEND", "simulated")
+sys.path.insert(0, PYTHON_DIRECTORY)
+os.chdir(PYTHON_DIRECTORY)  # The windows load their .ui files from the working directory
+
+
+@pytest.fixture(autouse=True)
+def pattern_cache(tmp_path, monkeypatch):
+    """
+    Keeps the patterns computed by the tests out of the cache of the user.
+    """
+
+    monkeypatch.setenv("FIB_PATTERN_CACHE", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def simulated_backend():
+    """
+    Selects a noiseless simulated card, unpaced so the generations and the acquisitions end at once.
+    """
+
+    from Modules_FIB import Daq_Backend
+    from Modules_FIB import Ni_Dependencies as NID
+
+    backend = Daq_Backend.select_backend("simulated", {"noise": 0, "seed": 0, "realtime": False})
+    yield backend
+    NID.clear_task_pool()
+
+
+@pytest.fixture(scope="session")
+def application():
+    from PyQt6 import QtWidgets
+
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def write_window(application, simulated_backend):
+    """
+    An offscreen write window sending its signals to the simulated card, with a function waiting for the end of
+    its computation. The messages of the window are recorded in its 'messages' list instead of being shown.
+    """
+
+    from Draw import Write_Interface
+
+    # The channels and the sampling frequency are provided by the main window when the write window requests them
+    window = Write_Interface.WriteWindow()
+    window.request_data_signal.connect(lambda: window.receive_data(["SimDev1/ao0", "SimDev1/ao1", 100000]))
+    window.messages = []
+    window.message = lambda title, text: window.messages.append((title, text))
+
+    def wait(timeout=60):
+        deadline = time.perf_counter() + timeout
+        while window.compute_thread is not None:
+            assert time.perf_counter() < deadline, "The computation didn't end"
+            application.processEvents()
+            time.sleep(0.01)
+
+    yield window, wait
+    window.cancel_computation()
+    window.deleteLater()
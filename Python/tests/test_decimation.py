@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from Modules_FIB import Decimation
+
+
+def column_extremes(signal, columns):
+    # Minimum and maximum of every column, the columns splitting the samples like the envelope does
+    bounds = np.arange(columns + 1) * len(signal) // columns
+    chunks = [signal[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    return np.array([chunk.min() for chunk in chunks]), np.array([chunk.max() for chunk in chunks])
+
+
+@pytest.mark.parametrize("columns", [1, 7, 300])
+def test_envelope_keeps_every_peak(columns):
+    signal = np.random.default_rng(0).normal(size=10007)
+    minimums, maximums = Decimation.min_max_envelope(signal, columns)
+    expected_minimums, expected_maximums = column_extremes(signal, columns)
+
+    np.testing.assert_array_equal(minimums, expected_minimums)
+    np.testing.assert_array_equal(maximums, expected_maximums)
+
+
+def test_run_length_envelope_equals_the_expanded_signal():
+    rng = np.random.default_rng(1)
+    values, counts = rng.normal(size=500), rng.integers(0, 9, 500)
+    expanded = np.repeat(values, counts)
+
+    for start, stop in ((0, None), (123, 1500)):
+        envelope = Decimation.min_max_envelope(values, 50, counts, start, stop)
+        expected = column_extremes(expanded[start:stop], 50)
+        np.testing.assert_array_equal(envelope[0], expected[0])
+        np.testing.assert_array_equal(envelope[1], expected[1])
+
+
+def test_short_signals_have_fewer_columns():
+    minimums, maximums = Decimation.min_max_envelope(np.arange(5.0), 100)
+
+    assert minimums.tolist() == maximums.tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from Draw import Dose_Simulation
+from Draw import Image_to_Signals
+
+STEP = 20 / 2 ** 16
+
+
+def pattern():
+    # Neighbouring points and jumps, held between 1 and 7 samples
+    rng = np.random.default_rng(0)
+    codes = np.cumsum(rng.integers(-1, 2, (300, 2)), axis=0)
+    codes[100:] += 40  # A jump in the middle of the path
+    return codes * STEP, rng.integers(1, 8, 300)
+
+
+def assert_same_map(dose_map, expected):
+    assert dose_map.extent() == pytest.approx(expected.extent())
+    assert dose_map.samples == expected.samples
+    np.testing.assert_allclose(dose_map.dose, expected.dose, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("chunk_samples", [1, 5, 64, 1000])
+def test_chunks_give_the_dose_of_a_single_chunk(chunk_samples):
+    voltage_pairs, dwell = pattern()
+    signals = Image_to_Signals.pairs_to_signals(voltage_pairs, dwell)
+    single = Dose_Simulation.simulate_signals(signals, STEP, chunk_samples=signals.shape[1])
+
+    # Chunks of 5 samples split the runs of up to 7 samples between two chunks
+    chunked = Dose_Simulation.simulate_signals(signals, STEP, chunk_samples=chunk_samples)
+
+    assert_same_map(chunked, single)
+    assert single.dose.sum() > dwell.sum()  # The jump delivers its transit dose
+
+
+def test_path_chunks_give_the_dose_of_a_single_chunk(monkeypatch):
+    voltage_pairs, dwell = pattern()
+    single = Dose_Simulation.simulate_path(voltage_pairs, dwell, STEP)
+
+    # The jump in the middle of the path is between two chunks
+    monkeypatch.setattr(Dose_Simulation, "CHUNK_SAMPLES", 100)
+    assert_same_map(Dose_Simulation.simulate_path(voltage_pairs, dwell, STEP), single)
+
+
+def test_lazy_signals_give_the_dose_of_their_samples():
+    voltage_pairs, dwell = pattern()
+    lazy = Image_to_Signals.pairs_to_signals(voltage_pairs, dwell, lazy=True)
+    materialized = lazy.materialize()
+
+    expected = Dose_Simulation.simulate_signals(materialized, STEP, chunk_samples=7)
+    assert_same_map(Dose_Simulation.simulate_signals(lazy, STEP), expected)
+    assert_same_map(Dose_Simulation.simulate_signals((materialized[0], materialized[1]), STEP), expected)
+
+
+def test_dwell_of_every_point_is_delivered():
+    voltage_pairs = np.array([[0, 0], [1, 0], [1, 1]]) * STEP
+    dose_map = Dose_Simulation.simulate_path(voltage_pairs, [2, 3, 4], STEP)
+
+    assert dose_map.dose.tolist() == [[0, 4], [2, 3]]  # The first row at the highest voltage_y
+    assert dose_map.samples == 9
+
+
+def test_large_patterns_are_binned():
+    voltage_pairs = np.array([[0, 0], [999, 999]]) * STEP
+    dose_map = Dose_Simulation.simulate_path(voltage_pairs, 1, STEP, max_size=100)
+
+    assert dose_map.binning == 10
+    assert dose_map.dose.shape == (100, 100)
+    assert dose_map.dose.sum() == pytest.approx(2 + Dose_Simulation.TRANSIT_SAMPLES)
+
+
+@pytest.mark.parametrize("sigma", [0.5, 3, 20])
+def test_gaussian_blur_keeps_the_total_dose(sigma):
+    voltage_pairs, dwell = pattern()
+    dose_map = Dose_Simulation.simulate_path(voltage_pairs, dwell, STEP)
+
+    blurred = Dose_Simulation.gaussian_blur(dose_map, sigma * STEP)
+
+    pad = int(np.ceil(Dose_Simulation.GAUSSIAN_EXTENT * sigma))
+    assert blurred.dose.shape == (dose_map.dose.shape[0] + 2 * pad, dose_map.dose.shape[1] + 2 * pad)
+    assert blurred.dose.sum() == pytest.approx(dose_map.dose.sum(), rel=1e-6)
+    assert blurred.peak() < dose_map.peak()
+    assert blurred.extent()[0] == pytest.approx(dose_map.extent()[0] - pad * STEP)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from Modules_FIB import ImageProcessing
+
+
+def assert_interpolated(grey, raw_image, low, high):
+    # Every grey value is the one np.interp gave before the lookup tables, rounded to the nearest integer
+    expected = np.interp(raw_image, (low, high), (0, 255))
+    assert grey.dtype == np.uint8
+    assert np.abs(grey - expected).max() <= 0.5 + 1e-3
+
+
+def test_int16_lookup_matches_interp():
+    raw_image = np.random.default_rng(0).integers(-32768, 32768, (64, 64)).astype(np.int16)
+    raw_image[0, :3] = (-32768, 0, 32767)
+
+    grey = ImageProcessing.normalize(raw_image)
+
+    assert_interpolated(grey, raw_image, raw_image.min(), raw_image.max())
+
+
+def test_negative_levels_go_through_the_lookup_table():
+    normalizer = ImageProcessing.Normalizer()
+    normalizer.set_levels(-1000, -200)
+    raw_image = np.array([[-2000, -1000, -600], [-200, 0, 5000]], dtype=np.int16)
+
+    grey = normalizer(raw_image)
+
+    assert normalizer.lut is not None
+    assert_interpolated(grey, raw_image, -1000, -200)
+
+
+def test_float_images_match_interp():
+    raw_image = np.random.default_rng(1).normal(1.5, 0.3, (50, 70))
+    out = np.empty(raw_image.shape, dtype=np.uint8)
+
+    grey = ImageProcessing.normalize(raw_image, out)
+
+    assert grey is out
+    assert_interpolated(grey, raw_image, raw_image.min(), raw_image.max())
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.int16, np.uint8])
+def test_flat_images_are_white(dtype):
+    grey = ImageProcessing.normalize(np.full((8, 8), 3, dtype=dtype))
+
+    assert (grey == 255).all()
+
+
+def test_percentiles_clip_the_outliers():
+    raw_image = np.linspace(0, 100, 9999).reshape(101, 99)
+    normalizer = ImageProcessing.Normalizer(low_percentile=10, high_percentile=90)
+
+    grey = normalizer(raw_image)
+
+    assert normalizer.levels == pytest.approx((10, 90))
+    assert (grey[raw_image <= 10] == 0).all()
+    assert (grey[raw_image >= 90] == 255).all()
+    assert grey[np.isclose(raw_image, 50)] == 128
+
+
+def test_gamma_brightens_the_middle_values():
+    raw_image = np.array([[0, 25, 100]], dtype=np.uint8)
+    normalizer = ImageProcessing.Normalizer(gamma=0.5)
+
+    assert normalizer(raw_image).tolist() == [[0, 128, 255]]  # sqrt(0.25) of 255
+
+
+def test_refresh_frames_reuse_the_levels():
+    normalizer = ImageProcessing.Normalizer(refresh_frames=3)
+    dark, bright = np.array([[0.0, 1.0]]), np.array([[0.0, 4.0]])
+
+    assert normalizer(dark).tolist() == [[0, 255]]
+    assert normalizer(bright).tolist() == [[0, 255]]  # Clipped by the levels of the first frame
+    assert normalizer.levels == (0, 1)
+    normalizer(bright)
+    assert normalizer(bright).tolist() == [[0, 255]]  # Measured again at the fourth frame
+    assert normalizer.levels == (0, 4)
+
+    normalizer.reset()
+    normalizer(dark)
+    assert normalizer.levels == (0, 1)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from PIL import Image
+from Draw import Image_to_Signals
+
+
+def baseline_voltage_pairs(image_path, voltage_range, sensitivity):
+    # The pixel by pixel conversion the vectorized one replaced
+    image = Image.open(image_path)
+    width, height = image.size
+    aspect_ratio = width / height
+
+    if width > height:
+        voltage_range_x = voltage_range
+        voltage_range_y = voltage_range / aspect_ratio
+    else:
+        voltage_range_y = voltage_range
+        voltage_range_x = voltage_range * aspect_ratio
+
+    x_coords = np.arange(-voltage_range_x/2, voltage_range_x/2, sensitivity)[:width]
+    y_coords = np.arange(voltage_range_y/2, -voltage_range_y/2, -sensitivity)[:height]
+    x_coords += (voltage_range_x - (width - 1) * sensitivity) / 2
+    y_coords -= (voltage_range_y - (height - 1) * sensitivity) / 2
+
+    non_transparent_coords = []
+    for y in range(height):
+        for x in range(width):
+            pixel = image.getpixel((x, y))
+            if len(pixel) == 4 and pixel[3] > 0:
+                non_transparent_coords.append((x_coords[x], y_coords[y]))
+    non_transparent_coords.sort(key=lambda coord: (-coord[1], coord[0]))
+
+    return non_transparent_coords
+
+
+@pytest.mark.parametrize("size", [(40, 40), (64, 23), (17, 50)])
+def test_voltage_pairs_match_the_baseline(tmp_path, size):
+    pixels = np.random.default_rng(0).integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    pixels[..., 3] *= pixels[..., 3] > 128  # Half of the pixels are transparent
+    image_path = tmp_path / "pattern.png"
+    Image.fromarray(pixels, "RGBA").save(image_path)
+
+    pairs = Image_to_Signals.Image_to_voltage_pairs(str(image_path), 20, 20 / 2 ** 16)
+    expected = np.array(baseline_voltage_pairs(image_path, 20, 20 / 2 ** 16))
+
+    assert pairs.shape == expected.shape
+    np.testing.assert_allclose(pairs, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("samples_per_pixel", [1, 3])
+def test_lazy_chunks_equal_the_materialized_signals(samples_per_pixel):
+    pairs = np.random.default_rng(1).uniform(-10, 10, (10, 2))
+    signals = Image_to_Signals.pairs_to_signals(pairs, samples_per_pixel, lazy=True)
+    materialized = signals.materialize()
+
+    assert materialized.shape == signals.shape
+    assert materialized.flags.c_contiguous
+    np.testing.assert_array_equal(materialized, Image_to_Signals.pairs_to_signals(pairs, samples_per_pixel))
+    np.testing.assert_array_equal(materialized, np.repeat(pairs.T, samples_per_pixel, axis=1))
+
+    for chunk_samples in (1, 4, 7, len(signals)):
+        chunks = [signals.chunk(start, start + chunk_samples) for start in range(0, len(signals), chunk_samples)]
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1), materialized)
+
+    sample = len(signals) - 1
+    np.testing.assert_array_equal(pairs[signals.point_at(sample)], materialized[:, sample])
+
+
+def test_dose_map_follows_the_intensity(tmp_path):
+    pixels = np.array([[0, 255, 51], [102, 0, 204]], dtype=np.uint8)
+    image_path = tmp_path / "relief.png"
+    Image.fromarray(pixels, "L").save(image_path)
+
+    coordinates, doses = Image_to_Signals.Image_to_dose_map(str(image_path), 20, 20 / 2 ** 16)
+    x_coords, y_coords = Image_to_Signals.voltage_coordinates(3, 2, 20, 20 / 2 ** 16)
+
+    # The black pixels receive no dose and are left out
+    np.testing.assert_allclose(doses, [1, 0.2, 0.4, 0.8])
+    np.testing.assert_array_equal(coordinates, [[x_coords[1], y_coords[0]], [x_coords[2], y_coords[0]],
+                                                [x_coords[0], y_coords[1]], [x_coords[2], y_coords[1]]])
+
+
+def test_dwell_counts_round_the_doses():
+    counts = Image_to_Signals.dwell_counts(np.array([0, 0.24, 0.26, 0.5, 1]), 4)
+
+    assert counts.dtype == np.int64
+    assert counts.tolist() == [0, 1, 1, 2, 4]
+
+
+def test_variable_dwell_chunks_equal_the_materialized_signals():
+    pairs = np.random.default_rng(2).uniform(-10, 10, (10, 2))
+    counts = np.array([2, 0, 5, 1, 0, 7, 3, 1, 4, 2])
+    signals = Image_to_Signals.pairs_to_signals(pairs, counts, lazy=True)
+    materialized = signals.materialize()
+
+    np.testing.assert_array_equal(materialized, np.repeat(pairs.T, counts, axis=1))
+    for chunk_samples in (1, 3, 6):
+        chunks = [signals.chunk(start, start + chunk_samples) for start in range(0, len(signals), chunk_samples)]
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1), materialized)
+
+    # The coordinates held during no sample are never output
+    points = [signals.point_at(sample) for sample in range(len(signals))]
+    assert np.array_equal(np.unique(points), np.flatnonzero(counts))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from Draw import Path_Ordering
+
+STEP = 20 / 2 ** 16
+
+
+def random_pattern(points, size, seed):
+    # Distinct random positions of a size x size grid, like the pixels of a sparse image
+    cells = np.random.default_rng(seed).choice(size * size, points, replace=False)
+    return np.column_stack([cells % size, -(cells // size)]) * STEP
+
+
+@pytest.mark.parametrize("strategy", list(Path_Ordering.PATH_STRATEGIES))
+@pytest.mark.parametrize("seed", [0, 1])
+def test_orders_are_permutations(strategy, seed):
+    pairs = random_pattern(2000, 100, seed)
+    order = Path_Ordering.path_order(pairs, strategy, STEP)
+
+    assert np.array_equal(np.sort(order), np.arange(len(pairs)))
+
+
+def test_serpentine_follows_the_rows():
+    pairs = random_pattern(100, 10, 0)  # Every position of the grid
+    order = Path_Ordering.path_order(pairs, "serpentine", STEP)
+
+    assert Path_Ordering.jump_length(pairs[order], STEP) == (0.0, 0)
+
+
+def test_comparison_only_runs_the_quick_strategies():
+    jumps = Path_Ordering.compare_strategies(random_pattern(500, 50, 2), STEP)
+
+    assert set(jumps) == set(Path_Ordering.QUICK_STRATEGIES)
+    assert "nearest_neighbour" not in jumps
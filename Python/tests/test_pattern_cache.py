@@ -0,0 +1,87 @@
+import os
+import numpy as np
+import pytest
+from Draw import Pattern_Cache
+
+
+def entry_path(key):
+    return os.path.join(Pattern_Cache.cache_directory(), key)
+
+
+def store_at(key, size, mtime):
+    # Stores an entry of about 'size' bytes, last used at 'mtime'
+    Pattern_Cache.store(key, {"data": np.zeros(size // 8)})
+    os.utime(entry_path(key), (mtime, mtime))
+
+
+def test_round_trip_returns_read_only_memory_maps():
+    voltage_pairs = np.random.default_rng(0).uniform(-10, 10, (100, 2))
+    dwell = np.arange(100)
+    Pattern_Cache.store("entry", {"pairs": voltage_pairs, "dwell": dwell, "dose": None}, {"strategy": "raster"})
+
+    arrays, values = Pattern_Cache.load("entry")
+
+    assert set(arrays) == {"pairs", "dwell"}  # The None arrays are skipped
+    assert values == {"strategy": "raster"}
+    assert isinstance(arrays["pairs"], np.memmap)
+    assert not arrays["pairs"].flags.writeable
+    np.testing.assert_array_equal(arrays["pairs"], voltage_pairs)
+    np.testing.assert_array_equal(arrays["dwell"], dwell)
+    assert Pattern_Cache.load("missing") is None
+
+
+def test_keys_follow_the_parameters(tmp_path):
+    image = tmp_path / "image.png"
+    image.write_bytes(b"pixels")
+    key = Pattern_Cache.voltage_map_key(str(image), 20, 16, False)
+
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(b"pixels")
+    assert Pattern_Cache.voltage_map_key(str(copy), 20, 16, False) == key  # The content, not the name
+    assert Pattern_Cache.voltage_map_key(str(image), 20, 16, True) != key
+    assert Pattern_Cache.signals_key(key, "raster", 2) != Pattern_Cache.signals_key(key, "raster", 3)
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    for index, key in enumerate(("old", "middle", "new")):
+        store_at(key, 10000, 1000 + index)
+
+    # Loading an entry marks it as recently used
+    Pattern_Cache.load("old")
+    total = Pattern_Cache.evict(25000)
+
+    assert not os.path.isdir(entry_path("middle"))
+    assert os.path.isdir(entry_path("old")) and os.path.isdir(entry_path("new"))
+    assert total <= 25000
+
+
+def test_eviction_keeps_the_entry_just_stored():
+    store_at("other", 10000, 1000)
+    store_at("stored", 10000, 999)  # Older than the other one, but kept
+
+    total = Pattern_Cache.evict(5000, keep="stored")
+
+    assert os.listdir(Pattern_Cache.cache_directory()) == ["stored"]
+    assert total > 5000
+
+
+def test_store_evicts_above_the_size_limit(monkeypatch):
+    monkeypatch.setattr(Pattern_Cache, "CACHE_MAX_BYTES", 25000)
+    store_at("first", 10000, 1000)
+    store_at("second", 10000, 1001)
+    Pattern_Cache.store("third", {"data": np.zeros(10000 // 8)})
+
+    assert sorted(os.listdir(Pattern_Cache.cache_directory())) == ["second", "third"]
+
+
+@pytest.mark.parametrize("damage", ["metadata", "array"])
+def test_damaged_entries_are_removed(damage):
+    Pattern_Cache.store("entry", {"data": np.arange(10)})
+    if damage == "metadata":
+        with open(os.path.join(entry_path("entry"), Pattern_Cache.METADATA_FILE), "w") as file:
+            file.write("{")
+    else:
+        os.remove(os.path.join(entry_path("entry"), "data.npy"))
+
+    assert Pattern_Cache.load("entry") is None
+    assert not os.path.exists(entry_path("entry"))
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from Draw import Pattern_Library
+from Draw import Path_Ordering
+
+STEP = 20 / 2 ** 16
+
+
+def grid(voltage_pairs):
+    # Positions of the coordinates on the grid of the DAC, which must be whole steps
+    codes = np.asarray(voltage_pairs) / STEP
+    np.testing.assert_allclose(codes, np.rint(codes), rtol=0, atol=1e-6)
+    return np.rint(codes).astype(np.int64)
+
+
+def test_dot_snaps_to_the_grid():
+    voltage_pairs, dwell = Pattern_Library.dot((3.4 * STEP, -2.6 * STEP), STEP, dwell=5)
+
+    assert grid(voltage_pairs).tolist() == [[3, -3]]
+    assert dwell.tolist() == [5]
+
+
+def test_line_moves_one_step_at_a_time():
+    voltage_pairs, dwell = Pattern_Library.line((0, 0), (10 * STEP, 3.2 * STEP), STEP, dwell=2)
+    codes = grid(voltage_pairs)
+
+    assert codes[0].tolist() == [0, 0] and codes[-1].tolist() == [10, 3]
+    assert len(codes) == 11
+    assert np.abs(np.diff(codes, axis=0)).max() == 1
+    assert dwell.tolist() == [2] * 11
+
+
+def test_filled_rectangle_is_scanned_row_by_row_from_the_top():
+    voltage_pairs, dwell = Pattern_Library.rectangle((0, 0), 4 * STEP, 3 * STEP, STEP)
+    codes = grid(voltage_pairs)
+
+    assert len(codes) == 12
+    assert codes[:, 1].tolist() == [1] * 4 + [0] * 4 + [-1] * 4
+    assert codes[:4, 0].tolist() == [-1, 0, 1, 2]
+    assert dwell.tolist() == [1] * 12
+
+
+def test_rectangle_outline_starts_at_the_top_left_corner():
+    voltage_pairs, _ = Pattern_Library.rectangle((0, 0), 4 * STEP, 3 * STEP, STEP, filled=False)
+    codes = grid(voltage_pairs)
+
+    assert codes[0].tolist() == [-1, 1]
+    assert codes[1].tolist() == [0, 1]  # Clockwise, to the right first
+    assert len(codes) == len(np.unique(codes, axis=0)) == 2 * (4 + 3) - 4
+    assert np.abs(np.diff(np.vstack([codes, codes[:1]]), axis=0)).max() == 1
+
+
+def test_disk_holds_the_points_within_the_radius():
+    voltage_pairs, _ = Pattern_Library.circle((0, 0), 5 * STEP, STEP)
+    codes = grid(voltage_pairs)
+
+    x, y = np.mgrid[-5:6, -5:6]
+    assert len(codes) == np.count_nonzero(x ** 2 + y ** 2 <= 25)
+    assert (np.hypot(codes[:, 0], codes[:, 1]) <= 5).all()
+    assert np.all(np.diff(codes[:, 1]) <= 0)  # Row by row from the top
+
+
+def test_circle_outline_follows_the_radius():
+    voltage_pairs, _ = Pattern_Library.circle((0, 0), 50 * STEP, STEP, filled=False)
+    codes = grid(voltage_pairs)
+
+    assert codes[0].tolist() == [50, 0]
+    assert np.abs(np.hypot(codes[:, 0], codes[:, 1]) - 50).max() < 1
+    assert np.abs(np.diff(codes, axis=0)).max() == 1
+
+
+def test_step_and_repeat_is_a_serpentine_on_the_grid():
+    feature = Pattern_Library.dot((0, 0), STEP, dwell=3)
+    voltage_pairs, dwell = Pattern_Library.step_and_repeat(feature, 3, 2, 10.4 * STEP, 7 * STEP, sensitivity=STEP)
+
+    assert grid(voltage_pairs).tolist() == [[-10, 4], [0, 4], [10, 4], [10, -4], [0, -4], [-10, -4]]
+    assert dwell.tolist() == [3] * 6
+
+    raster, _ = Pattern_Library.step_and_repeat(feature, 3, 2, 10 * STEP, serpentine=False)
+    assert grid(raster)[3].tolist() == [-10, -5]
+
+
+def test_combine_keeps_the_order_and_the_dwell():
+    first = Pattern_Library.dot((0, 0), STEP, dwell=4)
+    second = Pattern_Library.line((STEP, 0), (3 * STEP, 0), STEP, dwell=np.array([1, 2, 3]))
+    voltage_pairs, dwell = Pattern_Library.combine(first, second)
+
+    assert grid(voltage_pairs)[:, 0].tolist() == [0, 1, 2, 3]
+    assert dwell.tolist() == [4, 1, 2, 3]
+    assert Pattern_Library.combine()[0].shape == (0, 2)
+
+
+def test_negative_dwell_is_refused():
+    with pytest.raises(Exception, match="negative"):
+        Pattern_Library.dot((0, 0), STEP, dwell=-1)
+
+
+def test_window_writes_a_loaded_pattern(write_window):
+    window, wait = write_window
+    pattern = Pattern_Library.combine(
+        Pattern_Library.step_and_repeat(Pattern_Library.circle((0, 0), 4 * STEP, STEP, dwell=2), 5, 4, 15 * STEP,
+                                        sensitivity=STEP),
+        Pattern_Library.rectangle((0, -200 * STEP), 200 * STEP, 10 * STEP, STEP, filled=False))
+
+    window.load_pattern(pattern, "Array")
+    wait()
+    assert len(window.Objects) == len(pattern[0])
+    assert window.comboBox_path.currentData() == "drawing"  # Written in the order it was generated
+    assert not window.map_preview.isNull()
+
+    window.spinBox_iterations.setValue(3)
+    window.Compute_Signals()
+    wait()
+    np.testing.assert_array_equal(window.Path, pattern[0])
+    assert window.Signals.shape[1] == 3 * pattern[1].sum()
+    np.testing.assert_array_equal(window.Signals.materialize(),
+                                  np.repeat(pattern[0].T, 3 * pattern[1], axis=1))
+    assert window.pushButton_Go.isEnabled()
+    assert Path_Ordering.jump_length(window.Path, STEP)[1] == window.jumps["drawing"][1]
+    assert window.messages == []
+
+
+def test_window_refuses_a_pattern_out_of_the_field(write_window):
+    window, wait = write_window
+
+    window.load_pattern((np.array([[window.voltageRange, 0.0]]), None))
+
+    assert window.pattern is None
+    assert "exceeds the voltage range" in window.messages[0][1]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from Modules_FIB import Ni_Dependencies as NID
+from Modules_FIB import Scanning
+
+CHANNELS = ("SimDev1/ao0", "SimDev1/ao1", "SimDev1/ai0")
+SCANS = {"rise": Scanning.rise_scanning, "triangle": Scanning.triangle_scanning}
+
+
+@pytest.mark.parametrize("mode", list(SCANS))
+def test_scan_reduces_the_samples_chunk_by_chunk(simulated_backend, monkeypatch, mode):
+    monkeypatch.setattr(NID, "STREAM_CHUNK_SAMPLES", 1000)  # Chunks of a few rows
+    pixels = 64
+    chunks = []
+
+    def receive(first_sample, samples, total_samples):
+        chunks.append((first_sample, len(samples), total_samples))
+
+    image = SCANS[mode](2, 1000000, pixels, *CHANNELS, samples_callback=receive)
+
+    assert image.shape == (pixels, pixels)
+    assert image.dtype == np.uint8
+    assert image.min() < image.max()  # The synthetic specimen isn't flat
+
+    # Every raw sample is read once, in order, in several chunks
+    first_samples, lengths, totals = (list(values) for values in zip(*chunks))
+    assert len(chunks) > 1
+    assert first_samples == np.cumsum([0] + lengths[:-1]).tolist()
+    assert sum(lengths) == totals[0]
+
+
+@pytest.mark.parametrize("mode", list(SCANS))
+def test_scan_sends_every_row_once(simulated_backend, monkeypatch, mode):
+    monkeypatch.setattr(NID, "STREAM_CHUNK_SAMPLES", 1000)
+    pixels = 64
+    received = []
+
+    def receive(first_row, rows):
+        if len(rows):
+            received.append((first_row, rows.copy()))
+
+    SCANS[mode](2, 1000000, pixels, *CHANNELS, receive)
+
+    first_rows = [first_row for first_row, _ in received]
+    lengths = [len(rows) for _, rows in received]
+    assert len(received) > 1
+    assert first_rows == np.cumsum([0] + lengths[:-1]).tolist()
+    assert sum(lengths) == pixels
+    assert all(rows.shape[1] == pixels for _, rows in received)
+
+
+@pytest.mark.parametrize("mode", list(SCANS))
+def test_callback_aborts_the_scan_from_the_first_chunk(simulated_backend, monkeypatch, mode):
+    monkeypatch.setattr(NID, "STREAM_CHUNK_SAMPLES", 100)  # The first chunk is within the two extra rows
+    chunks = []
+
+    def abort(first_row, rows):
+        raise Exception("Sweep aborted by the user")
+
+    with pytest.raises(Exception, match="Sweep aborted by the user"):
+        SCANS[mode](2, 1000000, 64, *CHANNELS, abort, lambda first_sample, samples, total: chunks.append(first_sample))
+    assert chunks == [0]
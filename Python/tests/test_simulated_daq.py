@@ -0,0 +1,48 @@
+import numpy as np
+from nidaqmx.constants import AcquisitionType
+from Modules_FIB import Daq_Backend
+from Modules_FIB import Simulated_Daq
+
+# Corners of the field, from the top left one row by row, and the detector value of the specimen at each of them
+CORNERS = np.array([[-10.0, 10.0], [10.0, 10.0], [-10.0, -10.0], [10.0, -10.0]])
+SPECIMEN = np.array([[0.0, 0.25], [0.5, 1.0]])
+
+
+def test_detector_reads_the_specimen_under_the_beam():
+    backend = Daq_Backend.select_backend("simulated", {"specimen": SPECIMEN, "noise": 0, "lag_samples": 2})
+    samples_per_corner, lag = 4, 2
+    waveform = np.repeat(CORNERS.T, samples_per_corner, axis=1)
+    total_samples = waveform.shape[1]
+
+    with backend.Task() as write_task, backend.Task() as read_task:
+        write_task.ao_channels.add_ao_voltage_chan("SimDev1/ao0:1", min_val=-10, max_val=10)
+        write_task.timing.cfg_samp_clk_timing(rate=100000, sample_mode=AcquisitionType.FINITE,
+                                              samps_per_chan=total_samples)
+        read_task.ai_channels.add_ai_voltage_chan("SimDev1/ai0")
+        read_task.timing.cfg_samp_clk_timing(rate=100000, sample_mode=AcquisitionType.FINITE,
+                                             samps_per_chan=total_samples)
+        read_task.triggers.start_trigger.cfg_dig_edge_start_trig("/SimDev1/ao/StartTrigger")
+
+        backend.AnalogMultiChannelWriter(write_task.out_stream).write_many_sample(waveform)
+        read_task.start()  # Armed until the output starts
+        write_task.start()
+        samples = np.array(read_task.read(number_of_samples_per_channel=total_samples))
+
+    expected = np.repeat(SPECIMEN.ravel(), samples_per_corner) * Simulated_Daq.DETECTOR_MAX_VOLTAGE
+    np.testing.assert_allclose(samples[lag:], expected[:-lag])
+
+
+def test_outputs_hold_the_last_voltage_until_reset():
+    backend = Daq_Backend.select_backend("simulated", {"noise": 0})
+
+    with backend.Task() as task:
+        task.ao_channels.add_ao_voltage_chan("SimDev1/ao0:1", min_val=-10, max_val=10)
+        task.timing.cfg_samp_clk_timing(rate=100000, sample_mode=AcquisitionType.FINITE, samps_per_chan=4)
+        backend.AnalogMultiChannelWriter(task.out_stream).write_many_sample(CORNERS.T.copy())
+        task.start()
+        task.wait_until_done()
+
+    device = backend.device("SimDev1")
+    assert device.output_voltages == {"SimDev1/ao0": 10.0, "SimDev1/ao1": -10.0}
+    device.reset_device()
+    assert set(device.output_voltages.values()) == {0.0}
@@ -0,0 +1,57 @@
+import numpy as np
+from Draw import Path_Ordering
+from Draw import Vector_Patterns
+from Draw import Write_Interface
+
+# The field of a 16-bit DAC over 20 V, one drawing unit being one DAC step
+VOLTAGE_RANGE = 20
+BITS_NUMBER = 16
+SENSITIVITY = VOLTAGE_RANGE / 2 ** BITS_NUMBER
+
+
+def test_outline_moves_one_step_at_a_time():
+    codes = Vector_Patterns.outline_codes([np.array([[0.0, 0.0], [10.0, 3.0], [4.0, 8.0]])], [True])
+
+    assert np.abs(np.diff(codes, axis=0)).max() == 1
+    assert np.abs(codes[0] - codes[-1]).max() == 1  # The last position leads back to the first one
+    assert len(np.unique(codes, axis=0)) == len(codes)
+
+
+def test_fill_rules():
+    outer = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+    inner = np.array([[3.0, 3.0], [7.0, 3.0], [7.0, 7.0], [3.0, 7.0]])
+
+    # The inner square turns the same way, it is a hole only for the even-odd rule
+    nonzero = Vector_Patterns.fill_codes([outer, inner], [0, 0], np.array([False]))
+    even_odd = Vector_Patterns.fill_codes([outer, inner], [0, 0], np.array([True]))
+
+    assert len(nonzero) == 100
+    assert len(even_odd) == 100 - 16
+    assert np.array_equal(nonzero[0], [0, 9])  # Row by row from the top, left to right
+
+
+def test_field_wide_outline_compiles_and_previews(tmp_path):
+    # A square of 60000 steps around the center of the field, about 240000 points once outlined
+    polygon = tmp_path / "square.txt"
+    polygon.write_text("polygon 0 0 60000 0 60000 60000 0 60000\n")
+
+    parameters = {"file_path": str(polygon), "pattern": None, "voltage_range": VOLTAGE_RANGE,
+                  "bits_number": BITS_NUMBER, "sensitivity": SENSITIVITY, "dose": False,
+                  "vector_mode": Vector_Patterns.OUTLINE, "preview_width": 299, "preview_height": 299}
+    result = Write_Interface.Compute(Write_Interface.Compute.VOLTAGE_MAP, parameters).compute_voltage_map()
+
+    objects = result["objects"]
+    assert len(objects) == 4 * 60000
+    assert np.abs(objects).max() <= VOLTAGE_RANGE / 2
+    assert result["drawn"]
+    assert set(result["jumps"]) == set(Path_Ordering.QUICK_STRATEGIES)
+    assert result["jumps"]["drawing"][1] == 0  # The outline is followed one DAC step at a time
+    assert not result["preview"].isNull()
+
+
+def test_sparse_nearest_neighbour_tour():
+    # Two points at both ends of the field and a line between them, far too wide for a dense index
+    pairs = np.vstack([[[-30000, -30000], [30000, 30000]], np.column_stack([np.arange(-100, 100), np.zeros(200)])])
+    order = Path_Ordering.path_order(pairs * SENSITIVITY, "nearest_neighbour", SENSITIVITY)
+
+    assert np.array_equal(np.sort(order), np.arange(len(pairs)))
@@ -0,0 +1,100 @@
+import threading
+import time
+import numpy as np
+from Modules_FIB import Thread
+
+
+def test_free_slot_is_never_the_newest_or_the_displayed_frame():
+    ring = Thread.FrameRing((4, 4))
+    rng = np.random.default_rng(0)
+
+    # Random interleavings of the processing thread and of the display
+    for written in range(1000):
+        slot = ring.free_slot()
+        assert slot not in (ring.newest, ring.displayed)
+        ring.frames[slot] = written % 256
+        ring.commit(slot, float(written))
+
+        action = rng.integers(3)
+        if action == 1:
+            pulled_slot, pulled_time = ring.pull()
+            assert pulled_slot == slot and pulled_time == written
+            assert (ring.frames[pulled_slot] == written % 256).all()
+        elif action == 2:
+            ring.release()
+
+
+def test_frames_never_pulled_are_dropped():
+    ring = Thread.FrameRing((2, 2))
+
+    assert not ring.commit(ring.free_slot(), 1.0)  # Nothing was waiting
+    assert ring.commit(ring.free_slot(), 2.0)  # The first frame was never pulled
+    assert ring.dropped == 1
+
+    slot, written = ring.pull()
+    assert written == 2.0
+    assert ring.pull() is None  # No new frame since
+    assert not ring.commit(ring.free_slot(), 3.0)
+    assert ring.dropped == 1
+
+
+def test_displayed_slot_is_kept_until_released():
+    ring = Thread.FrameRing((2, 2))
+    ring.commit(ring.free_slot(), 1.0)
+    displayed, _ = ring.pull()
+
+    for written in range(2, 10):
+        slot = ring.free_slot()
+        assert slot != displayed
+        ring.commit(slot, float(written))
+    assert ring.displayed == displayed
+
+    ring.release()
+    assert ring.displayed is None
+
+
+def test_ring_has_room_for_a_frame_being_written():
+    ring = Thread.FrameRing((3, 5), size=1)
+
+    assert ring.frames.shape == (3, 3, 5)
+    assert ring.frames.dtype == np.uint8
+
+
+def test_slow_processing_drops_the_oldest_frames(simulated_backend, monkeypatch):
+    monkeypatch.setattr(Thread, "LATENCY_PERIOD", 1e9)  # The drops are counted over the whole video
+    video_frame = Thread.Scanning.video_frame
+    processed = []
+
+    def slow_frame(raw_data, *args, **kwargs):
+        time.sleep(0.02)
+        processed.append(raw_data[:8].copy())
+        return video_frame(raw_data, *args, **kwargs)
+
+    monkeypatch.setattr(Thread.Scanning, "video_frame", slow_frame)
+    video = Thread.VideoThread(1, 1000000, 32, "SimDev1/ao0", "SimDev1/ao1", "SimDev1/ai0")
+    acquisition = threading.Thread(target=video.run)
+    acquisition.start()
+
+    # The queue is full while the acquisition keeps reading
+    deadline = time.perf_counter() + 10
+    while len(processed) < 10 and time.perf_counter() < deadline:
+        assert video.raw_frames.qsize() <= Thread.VIDEO_QUEUE_SIZE
+        time.sleep(0.005)
+    video.stop()
+    acquisition.join(10)
+
+    assert not acquisition.is_alive()
+    frames = video.latency.frames
+    assert frames["processing"] == len(processed) >= 10
+    assert frames["acquisition"] > frames["processing"] + Thread.VIDEO_QUEUE_SIZE  # The reads never waited
+
+    # Each frame acquired is processed or dropped from the queue, and each frame processed but the last one is
+    # dropped from the ring, which is never pulled here
+    queue_drops = frames["acquisition"] - frames["processing"]
+    assert video.latency.dropped == queue_drops + frames["processing"] - 1
+    assert video.frames.dropped == frames["processing"] - 1
+    assert video.raw_frames.empty()
+    assert video.frames.newest is not None
+
+    # Every buffer went back to the free ones, except the one of a read interrupted by the stop
+    assert video.free_buffers.qsize() >= Thread.VIDEO_QUEUE_SIZE + 2
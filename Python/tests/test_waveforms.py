@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from Modules_FIB import Waveforms
+
+
+@pytest.mark.parametrize("mode", Waveforms.MODES)
+def test_waveform_matches_the_staircases(mode):
+    pixels, samples = 5, 3
+    waveform = Waveforms.scan_waveform(mode, pixels, samples, -10, 10)
+
+    levels = np.linspace(-10, 10, pixels)
+    rows = np.tile(levels, (pixels, 1))
+    if mode == "triangle":
+        rows[1::2] = rows[1::2, ::-1]
+    horizontal = np.repeat(rows.ravel(), samples)
+    vertical = np.repeat(levels[::-1], pixels * samples)
+
+    assert waveform.shape == (2, pixels * pixels * samples + 1)
+    np.testing.assert_array_equal(waveform[0, :-1], horizontal)
+    np.testing.assert_array_equal(waveform[1, :-1], vertical)
+    np.testing.assert_array_equal(waveform[:, -1], waveform[:, 0])  # Parked at the start of the scan
+
+
+def test_waveforms_are_shared_and_read_only():
+    waveform = Waveforms.scan_waveform("rise", 8, 2, -10, 10)
+
+    assert Waveforms.scan_waveform("rise", 8, 2, -10, 10) is waveform
+    assert not waveform.flags.writeable
+    assert Waveforms.scan_waveform("rise", 8, 2, -10, 10, park_sample=False) is not waveform
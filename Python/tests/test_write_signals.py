@@ -0,0 +1,127 @@
+import threading
+import time
+import numpy as np
+import pytest
+from Draw import Image_to_Signals
+from Draw import Write_Interface
+from Draw import Write_Signals
+
+CHANNELS = ("SimDev1/ao0", "SimDev1/ao1")
+SAMPLING_FREQUENCY = 100000
+
+
+@pytest.fixture
+def written(simulated_backend, monkeypatch):
+    """
+    Records every block of samples written to the output buffer of the simulated card.
+    """
+
+    blocks = []
+
+    class RecordingWriter(simulated_backend.AnalogMultiChannelWriter):
+        def write_many_sample(self, data, timeout=10.0):
+            blocks.append(np.array(data))
+            return super().write_many_sample(data, timeout)
+
+    monkeypatch.setattr(simulated_backend, "AnalogMultiChannelWriter", RecordingWriter)
+    return blocks
+
+
+def pattern():
+    rng = np.random.default_rng(0)
+    return Image_to_Signals.pairs_to_signals(rng.uniform(-10, 10, (500, 2)), rng.integers(0, 8, 500), lazy=True)
+
+
+@pytest.mark.parametrize("first_sample", [0, 1234])
+def test_streamed_write_delivers_the_signals(written, first_sample):
+    signals = pattern()
+    expected = signals.materialize()[:, first_sample:]
+
+    statistics = Write_Signals.stream_signals_to_NI(*CHANNELS, signals, SAMPLING_FREQUENCY, 10, chunk_samples=64,
+                                                    first_sample=first_sample)
+
+    assert len(written) > Write_Signals.STREAM_BUFFER_CHUNKS
+    assert max(block.shape[1] for block in written) <= 64
+    assert statistics["generated"] == signals.shape[1]
+    assert statistics["written"] == expected.shape[1]
+    assert statistics["underflows"] == 0
+    np.testing.assert_array_equal(np.concatenate(written, axis=1), expected)
+
+
+def test_stopped_stream_writes_nothing(written):
+    stop_event = threading.Event()
+    stop_event.set()
+
+    statistics = Write_Signals.stream_signals_to_NI(*CHANNELS, pattern(), SAMPLING_FREQUENCY, 10, chunk_samples=64,
+                                                    stop_event=stop_event)
+
+    assert statistics["written"] == 0
+    assert written == []
+
+
+def test_failing_write_releases_the_producer(written, simulated_backend, monkeypatch):
+    class FailingWriter(simulated_backend.AnalogMultiChannelWriter):
+        def write_many_sample(self, data, timeout=10.0):
+            raise Exception("Simulated write failure")
+
+    monkeypatch.setattr(simulated_backend, "AnalogMultiChannelWriter", FailingWriter)
+
+    with pytest.raises(Exception, match="Simulated write failure"):
+        Write_Signals.stream_signals_to_NI(*CHANNELS, pattern(), SAMPLING_FREQUENCY, 10, chunk_samples=64)
+
+    producers = [thread for thread in threading.enumerate() if thread.name == "Pattern producer"]
+    for producer in producers:
+        producer.join(1)
+    assert not any(producer.is_alive() for producer in producers)
+
+
+@pytest.mark.parametrize("first_sample", [0, 1234])
+def test_regenerated_and_streamed_writes_deliver_the_same_samples(written, first_sample):
+    signals, passes = pattern(), 3
+    expected = np.tile(signals.materialize(), passes)[:, first_sample:]
+
+    # The card regenerates the single buffer written until the passes are over
+    reached = Write_Signals.regenerate_signals_to_NI(*CHANNELS, signals, SAMPLING_FREQUENCY, 10, passes,
+                                                     first_sample=first_sample)
+    (buffer,) = written
+    assert buffer.shape[1] == signals.shape[1]
+    regenerated = np.tile(buffer, -(-expected.shape[1] // buffer.shape[1]))[:, :expected.shape[1]]
+
+    written.clear()
+    statistics = Write_Signals.stream_signals_to_NI(*CHANNELS, signals, SAMPLING_FREQUENCY, 10, chunk_samples=64,
+                                                    passes=passes, first_sample=first_sample)
+    streamed = np.concatenate(written, axis=1)
+
+    assert reached == statistics["generated"] == signals.shape[1] * passes
+    np.testing.assert_array_equal(regenerated, expected)
+    np.testing.assert_array_equal(streamed, expected)
+
+
+def test_beam_is_parked_at_the_configured_voltages(simulated_backend, monkeypatch):
+    monkeypatch.setattr(Write_Signals, "park_voltages", Write_Signals.DEFAULT_PARK_VOLTAGES)
+    device = simulated_backend.system().devices["SimDev1"]
+
+    Write_Signals.set_park_voltages([2.5, -7])
+    Write_Signals.park_beam(*CHANNELS)
+    assert [device.output_voltages[channel] for channel in CHANNELS] == [2.5, -7.0]
+
+    with pytest.raises(Exception, match="outside of the range"):
+        Write_Signals.set_park_voltages([0, 12])
+    assert Write_Signals.park_voltages == (2.5, -7.0)
+
+
+def test_shutdown_waits_for_the_writing_to_stop(write_window, written, simulated_backend):
+    window, _ = write_window
+    device = simulated_backend.system().devices["SimDev1"]
+
+    # Endless writing, until it is stopped
+    window.run_Thread = Write_Interface.Send(*CHANNELS, pattern(), SAMPLING_FREQUENCY, 10, passes=None)
+    window.run_Thread.start()
+    while not written:
+        time.sleep(0.01)
+
+    window.Shutdown_Signals()
+
+    assert window.run_Thread.isFinished()
+    assert [device.output_voltages[channel] for channel in CHANNELS] == list(Write_Signals.park_voltages)
+    assert window.messages == []